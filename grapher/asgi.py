@@ -0,0 +1,178 @@
+import asyncio
+import inspect
+import sys
+import tempfile
+
+from flask import request
+
+from . import settings
+
+
+class ASGIApplication:
+    """Serve a :Grapher environment through the ASGI protocol.
+
+    Requests are handled in the event loop. Handlers which are coroutines,
+    such as the ones in :AsyncSchematicResource, are awaited directly.
+    All other views are dispatched by Flask in a worker thread.
+
+    Request bodies are received in full before the request is dispatched.
+    Bodies larger than :spooled_body_size bytes are spooled to a temporary
+    file instead of being held in memory.
+
+    Usage:
+        uvicorn my_api:grapher.asgi
+    """
+
+    spooled_body_size = settings.effective.ASGI_SPOOLED_BODY_SIZE
+
+    def __init__(self, grapher):
+        self.grapher = grapher
+
+    @property
+    def app(self):
+        return self.grapher.app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope %s.' % scope['type'])
+
+        with await self.read_body(receive) as body, \
+                self.app.request_context(self.environ(scope, body)):
+            response = await self.dispatch()
+
+            await send({
+                'type': 'http.response.start',
+                'status': response.status_code,
+                'headers': [(k.lower().encode('latin1'), v.encode('latin1'))
+                            for k, v in response.headers.items()],
+            })
+
+            async for chunk in self.body(response):
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+
+            await send({'type': 'http.response.body', 'body': b''})
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Receive the body of a request into a file, which is only written
+        to the disk if it is longer than :spooled_body_size bytes.
+        """
+        body = tempfile.SpooledTemporaryFile(max_size=self.spooled_body_size)
+        more = True
+
+        while more:
+            message = await receive()
+            body.write(message.get('body', b''))
+            more = message.get('more_body', False)
+
+        body.seek(0)
+
+        return body
+
+    @staticmethod
+    def environ(scope, body):
+        """Build the WSGI environment of an ASGI http :scope, whose :body
+        was received into a file.
+        """
+        server = scope.get('server') or ('localhost', 80)
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '')
+                .encode('utf8').decode('latin1'),
+            'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            # The body was received in full, so it can be read to its end
+            # even if it was sent without a Content-Length.
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1').upper().replace('-', '_')
+            value = value.decode('latin1')
+
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = 'HTTP_' + name
+
+            environ[name] = environ[name] + ',' + value \
+                if name in environ else value
+
+        return environ
+
+    def handler(self):
+        """Retrieve the coroutine that handles the current request, if the
+        resource it was routed to has one.
+        """
+        if request.routing_exception is not None:
+            return None
+
+        resource = self.grapher.endpoints.get(request.url_rule.endpoint)
+        method = request.method.lower()
+
+        if method == 'head' and not hasattr(resource, 'head'):
+            method = 'get'
+
+        handler = getattr(resource, method, None)
+
+        return handler if inspect.iscoroutinefunction(handler) else None
+
+    @staticmethod
+    async def body(response):
+        """Iterate over the encoded chunks of a :response, whose body may
+        be an asynchronous iterable, such as streamed collections.
+        """
+        if hasattr(response.response, '__aiter__'):
+            async for chunk in response.response:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) \
+                    else chunk
+        else:
+            for chunk in response.iter_encoded():
+                yield chunk
+
+    async def dispatch(self):
+        try:
+            return await self._dispatch()
+        except Exception as e:
+            # Errors without a handler become 500s, as in Flask's wsgi_app.
+            return self.app.handle_exception(e)
+
+    async def _dispatch(self):
+        handler = self.handler()
+
+        if handler is None:
+            # Flask takes care of synchronous views and routing errors.
+            return await asyncio.to_thread(self.app.full_dispatch_request)
+
+        try:
+            rv = self.app.preprocess_request()
+
+            if rv is None:
+                rv = await handler(**request.view_args)
+        except Exception as e:
+            rv = self.app.handle_user_exception(e)
+
+        return self.app.process_response(self.app.make_response(rv))
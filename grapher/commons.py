@@ -1,4 +1,8 @@
+import collections
 import inspect
+import itertools
+import threading
+import time
 
 from cerberus import SchemaError
 
@@ -64,6 +68,87 @@ class CollectionHelper(metaclass=abc.ABCMeta):
 
         return cls.restore(item, previously_transformed)
 
+    @classmethod
+    def chunks(cls, item, size=None):
+        """Split an iterable into lists of, at most, :size elements.
+
+        :param item: the iterable to be split.
+        :param size: the maximum length of each chunk. If None, a single
+            chunk containing all elements is yielded.
+        :return: a generator of :lists.
+        """
+        item = iter(item)
+        chunk = list(itertools.islice(item, size or None))
+
+        while chunk:
+            yield chunk
+            chunk = list(itertools.islice(item, size or None))
+
+
+class LRUCache:
+    """Bounded mapping that evicts its least recently used entries.
+
+    Entries expire :ttl seconds after being set. Hits, misses and
+    evictions are counted, so the cache can be tuned.
+    """
+
+    def __init__(self, size, ttl=0):
+        """
+        :param size: the maximum number of entries held.
+        :param ttl: seconds for which an entry is valid. If 0, entries
+            only leave the cache when evicted or popped.
+        """
+        self.size = size
+        self.ttl = ttl
+
+        self.hits = self.misses = self.evictions = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[1] and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'size': len(self._entries), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
 
 class SchemaNavigator(metaclass=abc.ABCMeta):
     @classmethod
@@ -83,6 +168,22 @@ class SchemaNavigator(metaclass=abc.ABCMeta):
 
         return identity or '_id'
 
+    @classmethod
+    def indexes_from(cls, model):
+        """Retrieve the indexes declared by a :model.
+
+        Fields flagged with 'index' or 'unique' are indexed. The identity
+        is left out, as databases index it implicitly.
+
+        :return: :dict (field)->(unique).
+        """
+        identity = cls.identity_from(model)
+
+        return {field: bool(desc.get('unique'))
+                for field, desc in model.items()
+                if field != identity and
+                (desc.get('index') or desc.get('unique'))}
+
     @classmethod
     def add_identity(cls, schema):
         identity = cls.identity_from(schema)
@@ -1,4 +1,5 @@
 from . import commons
+from .asgi import ASGIApplication
 from .commons import Debug
 from .environment import Environment
 from .managers import Manager
@@ -20,12 +21,22 @@ class Grapher(Environment):
     def __init__(self, name='Grapher'):
         super().__init__(name)
 
+        # Resources registered, by their end-point names.
+        self.endpoints = {}
+
+        # ASGI entry point, which serves the same resources.
+        self.asgi = ASGIApplication(self)
+
         for name, _, module in self.components:
             self.collect_user_artifacts(name, module)
 
         for name, schema in self.user_artifacts['schemas'].items():
             self.gather_components(name, schema)
 
+        if self.settings.INDEXES['reconcile']:
+            for name, schema in self.schemas.items():
+                self.reconcile_indexes(name, schema)
+
         self.register_resources()
 
         Grapher.instance = self
@@ -79,6 +90,44 @@ class Grapher(Environment):
 
         Debug.message('Done.')
 
+    def reconcile_indexes(self, name, schema):
+        Debug.info('Reconciling %s indexes...' % name, end=' ')
+
+        options = self.settings.INDEXES
+
+        try:
+            created, missing, undeclared = \
+                schema.repository.reconcile_indexes(create=options['create'])
+        except NotImplementedError:
+            missing = commons.SchemaNavigator.indexes_from(schema.model)
+            created, undeclared = {}, {}
+        except schema.repository.database_errors as e:
+            Debug.message('Failed.')
+
+            if options['required']:
+                raise
+
+            # The database may not be up yet, which does not prevent the
+            # schema from being served.
+            Debug.warning('Indexes of %s could not be reconciled: %s'
+                          % (name, e))
+            return
+
+        Debug.message('Done.')
+
+        if created:
+            Debug.info('Created indexes %s on %s.' % (sorted(created), name))
+        if undeclared:
+            Debug.warning('Indexes %s exist on %s, but are not declared in '
+                          'its model.' % (sorted(undeclared), name))
+        if missing:
+            Debug.warning('Indexes %s are declared in %s, but are missing '
+                          'from the database.' % (sorted(missing), name))
+
+            if options['required']:
+                raise RuntimeError('Schema %s is missing the required '
+                                   'indexes %s.' % (name, sorted(missing)))
+
     def register_resources(self):
         user_resources = set(self.user_artifacts['resources'])
 
@@ -93,6 +142,11 @@ class Grapher(Environment):
 
             view_func = r.as_view('%s_schema_api' % name, schema=schema)
             self.app.add_url_rule(end_point, view_func=view_func)
+            # Single entities are served by the same view, by identity.
+            self.app.add_url_rule(end_point + '/<identity>',
+                                  view_func=view_func,
+                                  methods=r.item_methods)
+            self.endpoints[view_func.__name__] = r
 
             Debug.message('Done.')
 
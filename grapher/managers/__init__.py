@@ -1 +1,2 @@
 from .base import Manager, EntityManager, RelationshipManager
+from .base import AsyncManager, AsyncEntityManager, AsyncRelationshipManager
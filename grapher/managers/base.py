@@ -1,52 +1,308 @@
 import abc
-from .. import commons
+import time
+import uuid
+
+from .. import commons, parsers, settings
 
 
 class Manager(metaclass=abc.ABCMeta):
+    # Seconds for which the total count of the unfiltered collection
+    # is cached. If 0, totals are always counted by the repository.
+    total_cache_ttl = settings.effective.TOTAL_COUNT_CACHE_TTL
+
     def __init__(self, schema):
         self.schema = schema
 
+        self._total = None
+        self._total_expires_at = 0
+
+        # Bumped by every write through this manager.
+        self.version = 0
+        self._epoch = uuid.uuid4().hex
+
+        self.cache = self._cache(settings.effective.ENTITY_CACHE)
+        self.results = self._cache(settings.effective.QUERY_CACHE)
+
+    def _cache(self, options):
+        """Build the cache described by :options for this manager's schema.
+
+        :return: :LRUCache, or None if the cache is disabled.
+        """
+        options = dict(options)
+        options.update(options.pop('schemas', {}).get(self.schema.__name__,
+                                                      {}))
+
+        return commons.LRUCache(options['size'], options['ttl']) \
+            if options['size'] else None
+
+    @property
+    def version_tag(self):
+        """Identify the version of the schema's data seen by this manager.
+
+        Versions only count the writes made through this manager, so they
+        are not shared between processes, and the tag is also unique to
+        this manager's process. Writes made by other processes go unseen.
+        """
+        return '%s.%i' % (self._epoch, self.version)
+
+    def invalidate(self, entities=None):
+        """Invalidate what is cached by this manager about :entities.
+
+        Called after every write performed through this manager.
+
+        :param entities: :dict of the entities written. The cached total
+            and query results are always invalidated.
+        """
+        self._total = None
+        self.version += 1
+
+        self._evict(entities)
+
+    def _evict(self, entities):
+        if self.cache is not None and entities:
+            for e in entities.values():
+                if self.schema.Meta.identity in e:
+                    self.cache.pop(e[self.schema.Meta.identity])
+
     @property
     def repository(self):
         return self.schema.repository
 
-    def identify(self, entities):
+    def identify(self, entities, key=None):
+        """Split :entities into the ones that hold their :key field,
+        which defaults to the identity, and the ones that do not.
+        """
+        key = key or self.schema.Meta.identity
         identified, unidentified = {}, {}
 
         for i, entity in entities.items():
-            if self.schema.Meta.identity in entity:
+            if key in entity:
                 identified[i] = entity
             else:
                 unidentified[i] = entity
 
         return identified, unidentified
 
-    def all(self, skip=0, limit=None):
-        return self.repository.all(skip=skip, limit=limit)
+    def all(self, skip=0, limit=None, fields=None, after=None, before=None):
+        return self.repository.all(skip=skip, limit=limit, fields=fields,
+                                   after=after, before=before)
 
     def find(self, identities):
-        return self.repository.find(identities)
+        if self.cache is None:
+            return self.repository.find(identities)
+
+        identities = list(identities)
+        found, missing = self._find_cached(identities)
+
+        if missing:
+            self._cache_found(identities, found, missing, self.repository.find(
+                    [identities[p] for p in missing]))
+
+        return found
+
+    def _find_cached(self, identities):
+        """Retrieve the cached entities with :identities.
+
+        :return: :pair (found, missing): the entities found, indexed by
+            their position in :identities, and the positions not cached.
+        """
+        found, missing = {}, []
+
+        for position, identity in enumerate(identities):
+            e = self.cache.get(identity)
+
+            if e is None:
+                missing.append(position)
+            else:
+                # Copies are handed out, as callers may modify them.
+                found[position] = dict(e)
+
+        return found, missing
+
+    def _cache_found(self, identities, found, missing, retrieved):
+        """Cache the entities :retrieved by the repository, indexed by their
+        position in :missing, and add them to :found.
+        """
+        for position, e in retrieved.items():
+            found[missing[position]] = e
+            self.cache.set(identities[missing[position]], dict(e))
 
     def fetch(self, entities):
+        """Fetch the database version of :entities.
+
+        :return: :pair of dicts: (fetched, unidentified), indexed by the
+        order of :entities. Entities without an identity or whose identity
+        was not found are unidentified.
+        """
         entities, unidentified = self.identify(entities)
-        return self.find(
-                (e[self.schema.Meta.identity] for i, e in entities.items())), unidentified
 
-    def query(self, query, skip=0, limit=None):
-        return self.repository.where(skip=skip, limit=limit, **query)
+        return self._fetched(entities, unidentified,
+                             self.find(self._identities(entities)))
+
+    def _identities(self, entities):
+        return [e[self.schema.Meta.identity] for e in entities.values()]
+
+    @staticmethod
+    def _fetched(entities, unidentified, found):
+        """Re-index the entities :found, indexed by their position in
+        :entities, by the keys of :entities. Entities not found are moved
+        into :unidentified.
+        """
+        fetched = {}
+
+        for position, i in enumerate(entities):
+            if position in found:
+                fetched[i] = found[position]
+            else:
+                unidentified[i] = entities[i]
+
+        return fetched, unidentified
+
+    def stream(self, query, skip=0, limit=None, fields=None, chunk_size=None):
+        """Retrieve the entities that match :query in chunks, as yielded
+        by the repository. Entities streamed are not cached.
+        """
+        return self.repository.stream(chunk_size=chunk_size, fields=fields,
+                                      skip=skip, limit=limit, **query)
+
+    def query(self, query, skip=0, limit=None, fields=None, after=None,
+              before=None):
+        return self.repository.where(skip=skip, limit=limit, fields=fields,
+                                     after=after, before=before, **query)
+
+    def query_or_all(self, query, skip=0, limit=None, fields=None,
+                     after=None, before=None):
+        key = self._results_key(query, skip, limit, fields, after, before)
+        entries = self._cached_results(key)
+
+        if entries is None:
+            entries = self._query_or_all(query, skip, limit, fields, after,
+                                         before)
+            self._cache_results(key, entries)
+
+        return entries
+
+    def _query_or_all(self, query, skip, limit, fields, after, before):
+        """Retrieve the entries that match :query, or all of them if it is
+        empty. Returns whatever :query or :all return, so asynchronous
+        managers await it.
+        """
+        if query:
+            return self.query(query, skip, limit, fields, after, before)
+
+        return self.all(skip, limit, fields, after, before)
+
+    def _results_key(self, query, skip, limit, fields, after, before):
+        if self.results is None:
+            return None
+
+        return self.version, parsers.QueryParser.normalize(
+                {'query': query, 'skip': skip, 'limit': limit},
+                fields=fields, after=after, before=before)
+
+    def _cached_results(self, key):
+        entries = self.results.get(key) if key is not None else None
+
+        if entries is not None:
+            # Copies are handed out, as entries are projected in place.
+            entries = {i: dict(e) for i, e in entries.items()}
+
+        return entries
+
+    def _cache_results(self, key, entries):
+        if key is not None:
+            self.results.set(key, {i: dict(e) for i, e in entries.items()})
+
+    def count(self, query=None):
+        """Count the entities that match :query, or all of them.
+        """
+        if query:
+            return self.repository.count(**query)
+
+        total = self._cached_total()
+
+        if total is None:
+            total = self._cache_total(self.repository.count())
 
-    def query_or_all(self, query, skip=0, limit=None):
-        return self.query(query, skip, limit) if query else self.all(skip,
-                                                                     limit)
+        return total
 
-    def create(self, entities):
-        return self.repository.create(entities)
+    def _cached_total(self):
+        """Retrieve the cached total count, or None if it is not cached or
+        has expired.
+        """
+        if not self.total_cache_ttl or \
+                time.monotonic() >= self._total_expires_at:
+            return None
 
-    def update(self, entities):
-        return self.repository.update(entities)
+        return self._total
 
-    def delete(self, entities):
-        return self.repository.delete(entities)
+    def _cache_total(self, total):
+        if self.total_cache_ttl:
+            self._total = total
+            self._total_expires_at = time.monotonic() + self.total_cache_ttl
+
+        return total
+
+    def create(self, entities, raise_errors=False, ordered=None):
+        try:
+            return self.repository.create(entities, raise_errors=raise_errors,
+                                          ordered=ordered)
+        finally:
+            self.invalidate(entities)
+
+    def update(self, entities, raise_errors=False, ordered=None):
+        try:
+            return self.repository.update(entities, raise_errors=raise_errors,
+                                          ordered=ordered)
+        finally:
+            self.invalidate(entities)
+
+    def upsert(self, entities, key=None, raise_errors=False, ordered=None):
+        stored = None
+
+        try:
+            stored, failed = self.repository.upsert(
+                    entities, key=key, raise_errors=raise_errors,
+                    ordered=ordered)
+
+            return stored, failed
+        finally:
+            self._invalidate_upserted(entities, stored)
+
+    def delete(self, entities, raise_errors=False, ordered=None):
+        try:
+            return self.repository.delete(entities, raise_errors=raise_errors,
+                                          ordered=ordered)
+        finally:
+            self.invalidate(entities)
+
+    def delete_where(self, query, returning=False):
+        """Delete the entities that match :query in the database itself.
+
+        :return: :tuple (count, deleted, failed), as in
+            :Repository.delete_where.
+        """
+        deleted = None
+
+        try:
+            count, deleted, failed = self.repository.delete_where(
+                    returning=returning, **query)
+
+            return count, deleted, failed
+        finally:
+            self._invalidate_deleted(deleted)
+
+    def _invalidate_upserted(self, entities, stored):
+        self.invalidate(entities)
+        # Entities matched by a unique field are identified once stored.
+        self._evict(stored)
+
+    def _invalidate_deleted(self, deleted):
+        self.invalidate(deleted)
+
+        if deleted is None and self.cache is not None:
+            # The entities deleted are unknown.
+            self.cache.clear()
 
 
 class EntityManager(Manager):
@@ -55,3 +311,118 @@ class EntityManager(Manager):
 
 class RelationshipManager(Manager):
     pass
+
+
+class AsyncManager(Manager):
+    """Manager whose retrieval and persistence methods are coroutines.
+
+    Requires a repository that implements :AsyncRepository.
+    """
+
+    async def all(self, skip=0, limit=None, fields=None, after=None,
+                  before=None):
+        return await self.repository.all(skip=skip, limit=limit,
+                                         fields=fields, after=after,
+                                         before=before)
+
+    async def find(self, identities):
+        if self.cache is None:
+            return await self.repository.find(identities)
+
+        identities = list(identities)
+        found, missing = self._find_cached(identities)
+
+        if missing:
+            self._cache_found(identities, found, missing,
+                              await self.repository.find(
+                                      [identities[p] for p in missing]))
+
+        return found
+
+    async def fetch(self, entities):
+        entities, unidentified = self.identify(entities)
+
+        return self._fetched(entities, unidentified,
+                             await self.find(self._identities(entities)))
+
+    async def query(self, query, skip=0, limit=None, fields=None, after=None,
+                    before=None):
+        return await self.repository.where(skip=skip, limit=limit,
+                                           fields=fields, after=after,
+                                           before=before, **query)
+
+    async def query_or_all(self, query, skip=0, limit=None, fields=None,
+                           after=None, before=None):
+        key = self._results_key(query, skip, limit, fields, after, before)
+        entries = self._cached_results(key)
+
+        if entries is None:
+            entries = await self._query_or_all(query, skip, limit, fields,
+                                               after, before)
+            self._cache_results(key, entries)
+
+        return entries
+
+    async def count(self, query=None):
+        if query:
+            return await self.repository.count(**query)
+
+        total = self._cached_total()
+
+        if total is None:
+            total = self._cache_total(await self.repository.count())
+
+        return total
+
+    async def create(self, entities, raise_errors=False, ordered=None):
+        try:
+            return await self.repository.create(
+                    entities, raise_errors=raise_errors, ordered=ordered)
+        finally:
+            self.invalidate(entities)
+
+    async def update(self, entities, raise_errors=False, ordered=None):
+        try:
+            return await self.repository.update(
+                    entities, raise_errors=raise_errors, ordered=ordered)
+        finally:
+            self.invalidate(entities)
+
+    async def upsert(self, entities, key=None, raise_errors=False,
+                     ordered=None):
+        stored = None
+
+        try:
+            stored, failed = await self.repository.upsert(
+                    entities, key=key, raise_errors=raise_errors,
+                    ordered=ordered)
+
+            return stored, failed
+        finally:
+            self._invalidate_upserted(entities, stored)
+
+    async def delete(self, entities, raise_errors=False, ordered=None):
+        try:
+            return await self.repository.delete(
+                    entities, raise_errors=raise_errors, ordered=ordered)
+        finally:
+            self.invalidate(entities)
+
+    async def delete_where(self, query, returning=False):
+        deleted = None
+
+        try:
+            count, deleted, failed = await self.repository.delete_where(
+                    returning=returning, **query)
+
+            return count, deleted, failed
+        finally:
+            self._invalidate_deleted(deleted)
+
+
+class AsyncEntityManager(AsyncManager):
+    pass
+
+
+class AsyncRelationshipManager(AsyncManager):
+    pass
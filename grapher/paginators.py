@@ -1,6 +1,12 @@
 import abc
+import base64
+import json
+from urllib.parse import urlencode
+
 from flask_restful import request
 
+from . import errors
+
 
 class Paginator(metaclass=abc.ABCMeta):
     """Grapher's default paginator.
@@ -12,9 +18,83 @@ class Paginator(metaclass=abc.ABCMeta):
     # passed data, without actually slicing it.
     soft_pagination = True
 
+    # If true, the next and previous links carry opaque cursors instead
+    # of skip offsets. Cursors are also used whenever the user sends one.
+    keyset_pagination = False
+
+    @staticmethod
+    def encode_cursor(**cursor):
+        return base64.urlsafe_b64encode(
+                json.dumps(cursor).encode('utf-8')).decode('ascii')
+
     @classmethod
-    def paginate(cls, data, skip=None, limit=None):
-        skip = skip or request.args.get('skip') or 0
+    def cursor(cls):
+        """Decode the cursor sent by the user.
+
+        Usage:
+            curl localhost/user?cursor=eyJhZnRlciI6IDQyfQ==&limit=50
+
+        :return: :dict containing either the key 'after' or 'before',
+        mapped to an identity. Empty, if no cursor was sent.
+        """
+        cursor = request.args.get('cursor')
+
+        if not cursor:
+            return {}
+
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(
+                    cursor.encode('ascii')).decode('utf-8'))
+
+            if not isinstance(decoded, dict) or len(decoded) != 1 or \
+                    not decoded.keys() <= {'after', 'before'}:
+                raise ValueError
+
+            # Identities are either strings or integers.
+            identity, = decoded.values()
+
+            if isinstance(identity, bool) or \
+                    not isinstance(identity, (str, int)):
+                raise ValueError
+        except ValueError:
+            raise errors.BadRequestError(('INVALID_CURSOR', (cursor,)))
+
+        return decoded
+
+    @classmethod
+    def requests_total(cls):
+        """Check if the user has requested the total count of entities,
+        which is otherwise not computed.
+
+        Usage:
+            curl localhost/user?total=true
+        """
+        return request.args.get('total') in ('1', 'true')
+
+    @staticmethod
+    def link(**args):
+        """Build a link to the current end-point, keeping the arguments
+        sent by the user, such as the query and the fields projected,
+        but replacing the ones in :args. Arguments set to None are removed.
+        """
+        kept = [(k, v) for k, v in request.args.items(multi=True)
+                if k not in args]
+        replaced = [(k, v) for k, v in args.items() if v is not None]
+
+        return request.base_url + '?' + urlencode(kept + replaced)
+
+    @classmethod
+    def paginate(cls, data, skip=None, limit=None, total=None, identity=None):
+        """Paginate :data and build the page's metadata.
+
+        :param identity: the identity field of the entries in :data. Required
+        for the next and previous links to carry cursors.
+        """
+        cursor = request.args.get('cursor')
+        keyset = identity is not None and (cls.keyset_pagination or
+                                           cursor is not None)
+
+        skip = 0 if keyset else skip or request.args.get('skip') or 0
         skip = isinstance(skip, int) and skip or int(skip)
 
         limit = limit or request.args.get('limit') or len(data)
@@ -25,12 +105,30 @@ class Paginator(metaclass=abc.ABCMeta):
 
         count = len(data)
 
-        return data, {
+        if keyset:
+            entries = list(data.values())
+
+            previous_page = cls.link(
+                    cursor=cls.encode_cursor(before=entries[0][identity]),
+                    limit=limit, skip=None) if cursor and entries else None
+            next_page = cls.link(
+                    cursor=cls.encode_cursor(after=entries[-1][identity]),
+                    limit=limit, skip=None) if entries else None
+        else:
+            previous_page = cls.link(skip=max(0, skip - limit), limit=limit) \
+                if skip else None
+            next_page = cls.link(skip=skip + count, limit=limit)
+
+        page = {
             'current': request.url,
-            'previous': request.base_url + '?skip=%s&limit=%s' % (
-                max(0, skip - limit), limit) if skip else None,
-            'next': request.base_url + '?skip=%s&limit=%s' % (skip + count, limit),
+            'previous': previous_page,
+            'next': next_page,
             'skip': skip,
             'limit': limit,
             'count': count,
         }
+
+        if total is not None:
+            page['total'] = total
+
+        return data, page
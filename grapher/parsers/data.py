@@ -1,4 +1,8 @@
 import abc
+import codecs
+import json
+import re
+
 from flask_restful import request
 
 from .base import Parser
@@ -6,6 +10,21 @@ from .. import errors, commons
 
 
 class DataParser(Parser, metaclass=abc.ABCMeta):
+    # Media type of bodies sent as newline-delimited JSON.
+    stream_mimetype = 'application/x-ndjson'
+
+    # The number of bytes read from the body at once by :stream.
+    read_size = 2 ** 16
+
+    # The maximum length of a single entry, which is held in memory until
+    # it is read whole.
+    max_entry_size = 64 * read_size
+
+    _whitespace = re.compile(r'[ \t\n\r]*')
+    _structural = re.compile(r'[\[\]{}"]')
+    _string_end = re.compile(r'["\\]')
+    _scalar_end = re.compile(r'[^0-9A-Za-z.+\-]')
+
     @classmethod
     def parse(cls):
         d, _ = commons.CollectionHelper.enumerate(request.get_json())
@@ -20,3 +39,219 @@ class DataParser(Parser, metaclass=abc.ABCMeta):
             raise errors.BadRequestError('DATA_CANNOT_BE_EMPTY')
 
         return d
+
+    @classmethod
+    def stream(cls):
+        """Parse the entries in the body incrementally, as it is read.
+
+        The body is either a JSON array, a single JSON object or, if sent
+        as `application/x-ndjson`, an entry per line.
+
+        Usage:
+            curl -X POST -H 'Content-Type: application/x-ndjson' \
+                 localhost/user --data-binary @users.ndjson
+
+        :return: a generator of entries.
+        """
+        blocks = cls._blocks(request.stream)
+
+        if request.mimetype == cls.stream_mimetype:
+            return cls._lines(blocks)
+
+        return cls._array(blocks)
+
+    @classmethod
+    def _blocks(cls, stream):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+
+        while True:
+            data = stream.read(cls.read_size)
+
+            if not data:
+                break
+
+            yield decoder.decode(data)
+
+        yield decoder.decode(b'', final=True)
+
+    @classmethod
+    def _lines(cls, blocks):
+        buffer = ''
+
+        for block in blocks:
+            lines = (buffer + block).split('\n')
+            buffer = lines.pop()
+
+            for line in lines:
+                if line.strip():
+                    yield cls._decode(line)
+
+            cls._check_size(buffer)
+
+        if buffer.strip():
+            yield cls._decode(buffer)
+
+    @staticmethod
+    def _decode(line):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise errors.BadRequestError(('INVALID_DATA', (str(e),)))
+
+    @classmethod
+    def _check_size(cls, pending):
+        if len(pending) > cls.max_entry_size:
+            raise errors.BadRequestError(
+                    ('INVALID_DATA', ('An entry is longer than %i characters'
+                                      % cls.max_entry_size,)))
+
+    @staticmethod
+    def _read(blocks, buffer, position):
+        """Append the next of :blocks to the text of :buffer not consumed
+        yet, from :position on.
+
+        :return: :tuple (buffer, position, eof).
+        """
+        block = next(blocks, None)
+
+        return buffer[position:] + (block or ''), 0, block is None
+
+    @classmethod
+    def _array(cls, blocks):
+        """Decode the entries of a JSON array, or a single JSON object,
+        from :blocks of text.
+
+        Entries are scanned as blocks are read and only decoded once they
+        are whole, so the text of an entry is never decoded twice.
+        """
+        decoder = json.JSONDecoder()
+        buffer, position, eof = '', 0, False
+        scan = [0, 0, False]
+
+        # What is expected next: the opening bracket, an entry, an entry
+        # or the closing bracket, a separator or the end of the body.
+        expected = '['
+
+        while True:
+            position = cls._whitespace.match(buffer, position).end()
+
+            if position == len(buffer):
+                if eof:
+                    break
+
+                buffer, position, eof = cls._read(blocks, buffer, position)
+                continue
+
+            c = buffer[position]
+
+            if expected == '[':
+                # A body which is not an array holds a single entry.
+                expected = 'entry or ]' if c == '[' else 'single'
+                position += c == '['
+                continue
+
+            if expected == 'end':
+                raise errors.BadRequestError(
+                        ('INVALID_DATA', ('Extra data at %r' % c,)))
+
+            if expected in ('separator', 'entry or ]') and c == ']':
+                expected = 'end'
+                position += 1
+                continue
+
+            if expected == 'separator':
+                if c != ',':
+                    raise errors.BadRequestError(
+                            ('INVALID_DATA', ('Expected , or ] at %r' % c,)))
+
+                expected = 'entry'
+                position += 1
+                continue
+
+            if not eof and cls._scan(buffer, position, scan) is None:
+                # The entry continues in the blocks not read yet.
+                cls._check_size(buffer[position:])
+                buffer, position, eof = cls._read(blocks, buffer, position)
+                continue
+
+            try:
+                entry, position = decoder.raw_decode(buffer, position)
+            except ValueError as e:
+                raise errors.BadRequestError(('INVALID_DATA', (str(e),)))
+
+            yield entry
+
+            scan = [0, 0, False]
+            expected = 'end' if expected == 'single' else 'separator'
+
+        if expected not in ('[', 'end'):
+            raise errors.BadRequestError(
+                    ('INVALID_DATA', ('Unexpected end of data',)))
+
+    @classmethod
+    def _scan(cls, buffer, start, scan):
+        """Scan the entry at :start of :buffer for its end, resuming
+        where the previous scan of the same entry stopped.
+
+        :param scan: :list [offset, depth, quoted]: where the scan stopped,
+            relative to :start, the depth of nested arrays and objects and
+            if it stopped within a string. Updated in place.
+        :return: the position after the entry, or None if it is not whole.
+        """
+        offset, depth, quoted = scan
+        position, n = start + offset, len(buffer)
+
+        if buffer[start] not in '[{"':
+            # Numbers and literals end at the first delimiter.
+            m = cls._scalar_end.search(buffer, position)
+
+            if m is None:
+                scan[0] = n - start
+                return None
+
+            return m.start()
+
+        while True:
+            if quoted:
+                m = cls._string_end.search(buffer, position)
+
+                if m is None:
+                    position = n
+                    break
+
+                if m.group() == '\\':
+                    if m.end() == n:
+                        # The escaped character was not read yet.
+                        position = m.start()
+                        break
+
+                    position = m.end() + 1
+                    continue
+
+                quoted, position = False, m.end()
+
+                if not depth:
+                    return position
+
+                continue
+
+            m = cls._structural.search(buffer, position)
+
+            if m is None:
+                position = n
+                break
+
+            c, position = m.group(), m.end()
+
+            if c == '"':
+                quoted = True
+            elif c in '[{':
+                depth += 1
+            else:
+                depth -= 1
+
+                if not depth:
+                    return position
+
+        scan[:] = [position - start, depth, quoted]
+        return None
@@ -33,6 +33,34 @@ class QueryParser(Parser, metaclass=abc.ABCMeta):
 
         return {'query': query, 'skip': skip, 'limit': limit}
 
+    @classmethod
+    def normalize(cls, parsed, **extra):
+        """Build the canonical form of a :parsed query.
+
+        Keys are sorted, sets become sorted lists and integral floats
+        become integers, so equivalent queries share the same form.
+
+        :param parsed: :dict, as returned by :parse.
+        :param extra: other arguments that affect the result, such as the
+            projected fields.
+        :return: :str.
+        """
+        return json.dumps(cls._canonical(dict(parsed, **extra)),
+                          sort_keys=True, separators=(',', ':'), default=str)
+
+    @classmethod
+    def _canonical(cls, value):
+        if isinstance(value, dict):
+            return {str(k): cls._canonical(v) for k, v in value.items()}
+        if isinstance(value, (set, frozenset)):
+            return sorted((cls._canonical(v) for v in value), key=repr)
+        if isinstance(value, (list, tuple)):
+            return [cls._canonical(v) for v in value]
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+
+        return value
+
     @classmethod
     def parse_or_raise(cls):
         query = cls.parse()
@@ -1,5 +1,7 @@
 import abc
 
+from .. import commons
+
 
 class Repository(metaclass=abc.ABCMeta):
     """Repository base interface.
@@ -9,6 +11,17 @@ class Repository(metaclass=abc.ABCMeta):
 
     connection_string = None
 
+    # Flags if bulk writes are applied in order, stopping at the first
+    # failure, when the caller does not specify it.
+    ordered_writes = True
+
+    # The number of entries in each chunk read by :stream.
+    batch_size = 1000
+
+    # Errors raised when the database cannot be reached or fails to
+    # execute an operation.
+    database_errors = ()
+
     def __init__(self, schema):
         """Construct a repository of a :label, constrained by a :schema.
 
@@ -27,7 +40,7 @@ class Repository(metaclass=abc.ABCMeta):
         indices = iter(indices)
         return {next(indices): e for e in entities}
 
-    def all(self, skip=0, limit=None):
+    def all(self, skip=0, limit=None, fields=None, after=None, before=None):
         """Retrieve all elements that share :self.label.
 
         The return must be a list of dictionaries that represent the
@@ -37,21 +50,28 @@ class Repository(metaclass=abc.ABCMeta):
                      If None, none element should be skipped.
         :param limit: the maximum length of the list retrieved.
                       If None, returns all elements after :skip.
+        :param fields: the set of fields to be retrieved, besides the
+                       identity. If None, all fields are retrieved.
+        :param after: if set, retrieve only the elements whose identity
+                      follows it, in identity order (keyset pagination).
+        :param before: if set, retrieve only the elements whose identity
+                       precedes it, in identity order.
         """
         raise NotImplementedError
 
     def find(self, identities):
         """Find :n entities that match the :n :identities.
 
-        The return must be a list of dictionaries that represent the entities retrieved.
-        This list is ordered in such way that the i-th element of the list is identified
-        by the i-th identity in :identities.
+        The return must be a dict of dictionaries that represent the entities retrieved.
+        This dict is indexed in such way that the i-th element is identified by the
+        i-th identity in :identities. Identities that were not found are absent.
 
         :param identities: the :n identities of the entities to be retrieved.
         """
         raise NotImplementedError
 
-    def where(self, skip=0, limit=None, **query):
+    def where(self, skip=0, limit=None, fields=None, after=None, before=None,
+              **query):
         """Retrieve a collection of entities that match the query.
 
         The return must be a list of dictionaries that represent the entities retrieved.
@@ -62,11 +82,56 @@ class Repository(metaclass=abc.ABCMeta):
 
         :param skip: the number of elements to skip when retrieving. If None, none element should be skipped.
         :param limit: the maximum length of the list retrieved. If None, returns all elements after :skip.
+        :param fields: the set of fields to be retrieved, besides the identity. If None, all fields are retrieved.
+        :param after: if set, retrieve only the entities whose identity follows it, in identity order.
+        :param before: if set, retrieve only the entities whose identity precedes it, in identity order.
         :param query: the query to be performed.
         """
         raise NotImplementedError
 
-    def create(self, entities, raise_errors=False):
+    def count(self, **query):
+        """Count the entities that match the query.
+
+        :param query: the query to be performed. If empty, all entities that
+            share :self.label are counted.
+        :return: :int: the number of entities.
+        """
+        raise NotImplementedError
+
+    def stream(self, chunk_size=None, fields=None, skip=0, limit=None,
+               **query):
+        """Retrieve the entities that match :query in chunks, in order of
+        identity, holding a single chunk in memory at once.
+
+        Each chunk is read by :where, seeking past the last identity of
+        the previous chunk.
+
+        :param chunk_size: the maximum number of entities in each chunk.
+            If None, :self.batch_size is used.
+        :return: a generator of dicts, each one containing a chunk of
+            entities indexed by their positions in the whole result.
+        """
+        chunk_size = chunk_size or self.batch_size
+        after, position = None, 0
+
+        while limit is None or position < limit:
+            n = chunk_size if limit is None else min(chunk_size,
+                                                     limit - position)
+            chunk = self.where(skip=skip if after is None else 0, limit=n,
+                               fields=fields, after=after, **query)
+
+            if not chunk:
+                return
+
+            yield {position + i: e for i, e in chunk.items()}
+
+            if len(chunk) < n:
+                return
+
+            position += len(chunk)
+            after = chunk[len(chunk) - 1][self.schema.Meta.identity]
+
+    def create(self, entities, raise_errors=False, ordered=None):
         """Create and return the created entities.
 
         The dict of :entities has dictionaries' instances, each containing
@@ -79,13 +144,16 @@ class Repository(metaclass=abc.ABCMeta):
         :param entities: :dict of dictionaries that represent the data to be
             created, indexed by the order in which they appeared in the request.
         :param raise_errors: flag if errors should be raised or silenced.
+        :param ordered: flag if the entities must be written in order,
+            stopping at the first failure. Unordered writes may be applied
+            in parallel by the database. If None, :self.ordered_writes is used.
 
         :return :pair of dicts: (created, failed) containing the entities
             created and failed indexed by their original order.
         """
         raise NotImplementedError
 
-    def update(self, entities, raise_errors=False):
+    def update(self, entities, raise_errors=False, ordered=None):
         """Update and return the entities.
 
         The dict of :entities contains dictionaries that represent the data to
@@ -100,13 +168,35 @@ class Repository(metaclass=abc.ABCMeta):
         :param raise_errors: flag if errors should be raised or silenced.
         :param entities: :dict of dictionaries that represent the data to be
         updated, indexed by the order in which they appeared in the request.
+        :param ordered: flag if the entities must be written in order,
+        stopping at the first failure. If None, :self.ordered_writes is used.
 
         :return :pair of dicts: (updated, failed) containing the entities
         updated and failed indexed by their original order.
         """
         raise NotImplementedError
 
-    def delete(self, entities, raise_errors=False):
+    def upsert(self, entities, key=None, raise_errors=False, ordered=None):
+        """Update the entities matched by their :key field, creating the
+        ones that do not exist, in a single batched write.
+
+        The entities are not read beforehand. Just like in :update, fields
+        absent from an entity are left untouched.
+
+        :param entities: :dict of dictionaries that represent the data to be
+        written, indexed by the order in which they appeared in the request.
+        :param key: the field that identifies the entities: the identity or
+        a unique field. If None, the identity is used.
+        :param raise_errors: flag if errors should be raised or silenced.
+        :param ordered: flag if the entities must be written in order,
+        stopping at the first failure. If None, :self.ordered_writes is used.
+
+        :return :pair of dicts: (written, failed) containing the entities
+        stored and failed indexed by their original order.
+        """
+        raise NotImplementedError
+
+    def delete(self, entities, raise_errors=False, ordered=None):
         """Delete entities and return them.
 
         The dict of :entities to be deleted, instances of
@@ -119,12 +209,70 @@ class Repository(metaclass=abc.ABCMeta):
         :param entities: :dict of dictionaries that represent the data to be
         deleted, indexed by the order in which they appeared in the request.
         :param raise_errors: flag if errors should be raised or silenced.
+        :param ordered: flag if the entities must be deleted in order,
+        stopping at the first failure. If None, :self.ordered_writes is used.
 
         :return :pair of dicts: (deleted, failed) containing the entities
         deleted and failed indexed by their original order.
         """
         raise NotImplementedError
 
+    def delete_where(self, chunk_size=None, returning=False, **query):
+        """Delete the entities that match :query within the database,
+        without retrieving them first.
+
+        :param chunk_size: the maximum number of entities deleted by a
+            single statement, keeping transactions small. If None, the
+            repository's default is used.
+        :param returning: flag if the entities deleted are returned.
+        :param query: the query to be performed, which must not be empty.
+
+        :return :tuple: (count, deleted, failed), where deleted is the
+            :dict of entities deleted, if :returning, or None otherwise, and
+            failed is the :dict (identity)->(error message) of the entities
+            matched but not deleted.
+        """
+        raise NotImplementedError
+
+    def indexes(self):
+        """Retrieve the indexes that exist in the database for :self.label.
+
+        :return: :dict (field)->(unique).
+        """
+        raise NotImplementedError
+
+    def create_index(self, field, unique=False):
+        """Create an index or unique constraint over a :field.
+
+        :return: :bool: True, if the index was created.
+        """
+        raise NotImplementedError
+
+    def reconcile_indexes(self, create=True):
+        """Reconcile the indexes declared by the schema with the database.
+
+        :param create: flag if missing indexes should be created.
+
+        :return: :tuple of dicts: (created, missing, undeclared), each
+            one as (field)->(unique). Missing indexes are declared indexes
+            that do not exist and were not created. Undeclared indexes
+            exist in the database but not in the schema.
+        """
+        declared = commons.SchemaNavigator.indexes_from(self.schema.model)
+        existing = self.indexes()
+
+        missing = {f: u for f, u in declared.items() if existing.get(f) != u}
+        created = {}
+
+        if create:
+            created = {f: u for f, u in missing.items()
+                       if self.create_index(f, unique=u)}
+            missing = {f: u for f, u in missing.items() if f not in created}
+
+        undeclared = {f: u for f, u in existing.items() if f not in declared}
+
+        return created, missing, undeclared
+
 
 class EntityRepository(Repository, metaclass=abc.ABCMeta):
     """Repository for entities.
@@ -139,7 +287,8 @@ class RelationshipRepository(Repository, metaclass=abc.ABCMeta):
     Implementations of this interface will be used for relationship-resources' persistence.
     """
 
-    def match(self, origin=None, target=None, skip=0, limit=None):
+    def match(self, origin=None, target=None, skip=0, limit=None,
+              fields=None):
         """Match all relationships, as long as they share the same label with
         this repository.
 
@@ -157,5 +306,69 @@ class RelationshipRepository(Repository, metaclass=abc.ABCMeta):
             If None, none element should be skipped.
         :param limit: the maximum length of the list retrieved.
             If None, returns all elements after :skip.
+        :param fields: the set of fields to be retrieved, besides the
+            identity. If None, all fields are retrieved.
         """
         raise NotImplementedError
+
+
+class AsyncRepository(Repository, metaclass=abc.ABCMeta):
+    """Asynchronous repository base interface.
+
+    Retrieval and persistence methods are coroutines with the same
+    semantics as the ones in :Repository. Index methods are kept
+    synchronous, as they are only called on start-up.
+    """
+
+    async def all(self, skip=0, limit=None, fields=None, after=None,
+                  before=None):
+        raise NotImplementedError
+
+    async def find(self, identities):
+        raise NotImplementedError
+
+    async def where(self, skip=0, limit=None, fields=None, after=None,
+                    before=None, **query):
+        raise NotImplementedError
+
+    async def count(self, **query):
+        raise NotImplementedError
+
+    async def stream(self, chunk_size=None, fields=None, skip=0, limit=None,
+                     **query):
+        chunk_size = chunk_size or self.batch_size
+        after, position = None, 0
+
+        while limit is None or position < limit:
+            n = chunk_size if limit is None else min(chunk_size,
+                                                     limit - position)
+            chunk = await self.where(skip=skip if after is None else 0,
+                                     limit=n, fields=fields, after=after,
+                                     **query)
+
+            if not chunk:
+                return
+
+            yield {position + i: e for i, e in chunk.items()}
+
+            if len(chunk) < n:
+                return
+
+            position += len(chunk)
+            after = chunk[len(chunk) - 1][self.schema.Meta.identity]
+
+    async def create(self, entities, raise_errors=False, ordered=None):
+        raise NotImplementedError
+
+    async def update(self, entities, raise_errors=False, ordered=None):
+        raise NotImplementedError
+
+    async def upsert(self, entities, key=None, raise_errors=False,
+                     ordered=None):
+        raise NotImplementedError
+
+    async def delete(self, entities, raise_errors=False, ordered=None):
+        raise NotImplementedError
+
+    async def delete_where(self, chunk_size=None, returning=False, **query):
+        raise NotImplementedError
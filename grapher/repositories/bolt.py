@@ -0,0 +1,272 @@
+import abc
+import threading
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from neo4j.exceptions import DriverError, Neo4jError
+
+from . import base, graph
+
+
+class BoltRepository(graph.GraphRepository, metaclass=abc.ABCMeta):
+    """Graph repository that executes its statements through the Bolt
+    protocol.
+
+    A single driver, and therefore a single bounded connection pool, is
+    shared by the repositories of all schemas.
+    """
+
+    cypher_errors = (Neo4jError,)
+    database_errors = (Neo4jError, DriverError)
+
+    _driver = None
+    _driver_lock = threading.Lock()
+
+    @property
+    def driver(self):
+        if BoltRepository._driver is None:
+            with BoltRepository._driver_lock:
+                if BoltRepository._driver is None:
+                    BoltRepository._driver = self.create_driver()
+
+        return BoltRepository._driver
+
+    def create_driver(self, database=GraphDatabase):
+        c = self.connection_string
+
+        return database.driver(
+                c['bolt_uri'],
+                auth=(c['username'], c['password']),
+                **{k: c[k] for k in ('max_connection_pool_size',
+                                     'connection_acquisition_timeout',
+                                     'max_connection_lifetime') if k in c})
+
+    @classmethod
+    def close(cls):
+        """Close the shared driver and all its pooled connections.
+        """
+        with cls._driver_lock:
+            if BoltRepository._driver is not None:
+                BoltRepository._driver.close()
+                BoltRepository._driver = None
+
+    def cypher(self, statement, **parameters):
+        with self.driver.session() as session:
+            return list(session.run(statement, parameters))
+
+
+class BoltEntityRepository(BoltRepository, graph.GraphEntityRepository):
+    # Indexes are listed and created by the statements of Neo4j 4.4 and
+    # 5.x, the servers spoken to by the driver.
+
+    def indexes(self):
+        indexes = {}
+
+        for r in self.cypher('SHOW INDEXES '
+                             'YIELD entityType, labelsOrTypes, properties '
+                             'RETURN entityType, labelsOrTypes, properties'):
+            field = self._indexed(r)
+
+            if field is not None:
+                indexes.setdefault(field, False)
+
+        for r in self.cypher('SHOW CONSTRAINTS '
+                             'YIELD entityType, labelsOrTypes, properties, '
+                             'type '
+                             'RETURN entityType, labelsOrTypes, properties, '
+                             'type'):
+            field = self._indexed(r)
+
+            if field is not None and 'UNIQUENESS' in r[3]:
+                indexes[field] = True
+
+        return indexes
+
+    def _indexed(self, record):
+        """Retrieve the property of an index or constraint :record over
+        a single property of :self.label, or None.
+        """
+        entity_type, labels, properties = record[0], record[1], record[2]
+
+        if entity_type == 'NODE' and labels == [self.label] and \
+                properties is not None and len(properties) == 1:
+            return properties[0]
+
+        return None
+
+    def create_index(self, field, unique=False):
+        field = field.replace('`', '``')
+
+        if unique:
+            statement = ('CREATE CONSTRAINT FOR (n:`%s`) '
+                         'REQUIRE n.`%s` IS UNIQUE' % (self.label, field))
+        else:
+            statement = ('CREATE INDEX FOR (n:`%s`) ON (n.`%s`)'
+                         % (self.label, field))
+
+        try:
+            self.cypher(statement)
+        except self.cypher_errors:
+            return False
+
+        return True
+
+
+class BoltRelationshipRepository(BoltRepository,
+                                 graph.GraphRelationshipRepository):
+    pass
+
+
+class AsyncBoltRepository(BoltRepository, base.AsyncRepository,
+                          metaclass=abc.ABCMeta):
+    """Graph repository that awaits its statements through the asynchronous
+    Bolt driver.
+
+    Statements are built just like in :GraphRepository. Indexes are still
+    reconciled through the synchronous driver on start-up.
+    """
+
+    _async_driver = None
+
+    @property
+    def async_driver(self):
+        # Created on first use, from within the event loop serving requests.
+        if AsyncBoltRepository._async_driver is None:
+            AsyncBoltRepository._async_driver = \
+                self.create_driver(AsyncGraphDatabase)
+
+        return AsyncBoltRepository._async_driver
+
+    @classmethod
+    async def close_async(cls):
+        """Close the shared asynchronous driver.
+        """
+        if AsyncBoltRepository._async_driver is not None:
+            driver, AsyncBoltRepository._async_driver = \
+                AsyncBoltRepository._async_driver, None
+            await driver.close()
+
+    async def cypher_async(self, statement, **parameters):
+        """Execute a parameterized Cypher :statement without blocking.
+
+        :return: a list of records yielded by the statement.
+        """
+        async with self.async_driver.session() as session:
+            result = await session.run(statement, parameters)
+            return [record async for record in result]
+
+    async def _write_async(self, statement, rows, raise_errors=False,
+                           ordered=None):
+        """Asynchronous counterpart of :GraphRepository._write.
+        """
+        written, failed = {}, {}
+        batches = self._batches(rows)
+
+        for batch in batches:
+            try:
+                records = await self.cypher_async(statement, rows=batch)
+            except self.cypher_errors as e:
+                if self._batch_failed(batch, e, batches, failed,
+                                      raise_errors, ordered):
+                    break
+
+                continue
+
+            self._written(batch, records, written, failed, raise_errors)
+
+        return written, failed
+
+    async def all(self, skip=0, limit=None, fields=None, after=None,
+                  before=None):
+        return await self.where(skip=skip, limit=limit, fields=fields,
+                                after=after, before=before)
+
+    async def find(self, identities):
+        identities = list(identities)
+        statement, parameters = self._find(identities)
+
+        return self._found(identities,
+                           await self.cypher_async(statement, **parameters))
+
+    async def where(self, skip=0, limit=None, fields=None, after=None,
+                    before=None, **query):
+        statement, parameters, descending = self._select(
+                skip, limit, fields, after, before, **query)
+
+        return self._entries(await self.cypher_async(statement, **parameters),
+                             descending)
+
+    async def count(self, **query):
+        statement, parameters = self._count(query)
+
+        return (await self.cypher_async(statement, **parameters))[0][0]
+
+    async def create(self, entities, raise_errors=False, ordered=None):
+        return await self._write_async(self._create(), self._rows(entities),
+                                       raise_errors, ordered)
+
+    async def update(self, entities, raise_errors=False, ordered=None):
+        return await self._write_async(self._update(), self._rows(entities),
+                                       raise_errors, ordered)
+
+    async def upsert(self, entities, key=None, raise_errors=False,
+                     ordered=None):
+        if key is None or key == self.schema.Meta.identity:
+            return await self.update(entities, raise_errors, ordered)
+
+        return await self._write_async(self._upsert(key),
+                                       self._keyed_rows(entities, key),
+                                       raise_errors, ordered)
+
+    async def delete(self, entities, raise_errors=False, ordered=None):
+        rows, failed = self._rows(entities), {}
+        kept = self._kept_rows(rows)
+
+        if kept is not None:
+            rows = self._deletable(
+                    rows, await self.cypher_async(kept[0], **kept[1]),
+                    failed, raise_errors)
+
+        deleted, write_failed = await self._write_async(
+                self._delete(), rows, raise_errors, ordered)
+        failed.update(write_failed)
+
+        return deleted, failed
+
+    async def delete_where(self, chunk_size=None, returning=False, **query):
+        statement, parameters, chunk_size = self._delete_chunks(
+                query, chunk_size, returning)
+        count, deleted = 0, []
+
+        while True:
+            n = self._deleted(await self.cypher_async(statement, **parameters),
+                              returning, deleted)
+            count += n
+
+            if n < chunk_size:
+                break
+
+        kept = self._kept(query)
+
+        if kept is not None:
+            kept = await self.cypher_async(kept[0], **kept[1])
+
+        return self._deleted_where(count, deleted, returning, kept)
+
+
+class AsyncBoltEntityRepository(AsyncBoltRepository, BoltEntityRepository):
+    pass
+
+
+class AsyncBoltRelationshipRepository(AsyncBoltRepository,
+                                      graph.GraphRelationshipRepository):
+    async def match(self, origin=None, target=None, skip=0, limit=None,
+                    fields=None):
+        query = {}
+
+        if origin is not None:
+            query['_origin'] = origin
+        if target is not None:
+            query['_target'] = target
+
+        return await self.where(skip=skip, limit=limit, fields=fields,
+                                **query)
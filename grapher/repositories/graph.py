@@ -1,15 +1,26 @@
 import abc
+import itertools
+import re
+
 import py2neo
-from py2neo import Graph, Node, Relationship
+from py2neo import Graph
 
 from . import base
-from .. import errors, settings
+from .. import commons, errors, settings
 
 
 class GraphRepository(base.Repository, metaclass=abc.ABCMeta):
     _g = None
     connection_string = settings.effective.DATABASES['neo4j']
 
+    # The maximum number of entries sent to the database in a single
+    # write statement.
+    batch_size = connection_string.get('batch_size', 1000)
+
+    # Errors raised by :cypher when a statement cannot be executed.
+    cypher_errors = (py2neo.GraphError,)
+    database_errors = cypher_errors + (OSError,)
+
     @property
     def g(self):
         self._g = self._g or Graph('http://%s:%s@%s' % (
@@ -20,160 +31,669 @@ class GraphRepository(base.Repository, metaclass=abc.ABCMeta):
 
         return self._g
 
-    def _build(self, identities):
-        """Build entities or relationships based on their identities.
+    def cypher(self, statement, **parameters):
+        """Execute a parameterized Cypher :statement.
+
+        :param statement: the Cypher statement to be executed.
+        :param parameters: the parameters referenced by the statement.
+        :return: a list of records yielded by the statement.
+        """
+        return self.g.cypher.execute(statement, parameters)
 
-        :param identities: :list of identities compatible with
-        self.schema[self.schema.Meta.identity]['type'].
+    # The variable bound to the entries in the statements' MATCH clauses.
+    variable = None
 
-        :return: a list of :nodes or :relationships corresponding to
-        the identities passed, in order.
+    def _match(self):
+        """Build the MATCH clause which binds all entries of this
+        repository to :self.variable.
         """
         raise NotImplementedError
 
-    def find(self, identities):
-        entities = self._build(identities)
+    def _returns(self, variable, fields=None):
+        """Build the RETURN clause's columns of a :variable.
 
-        try:
-            self.g.pull(*entities)
-        except py2neo.GraphError:
-            raise errors.NotFoundError(('NOT_FOUND', identities))
+        :param fields: the set of properties returned. If None,
+        all properties are returned.
+        :return: :str: the columns that describe an entry, in the order
+        expected by :_entry.
+        """
+        raise NotImplementedError
 
-        return self.to_dict_of_dicts(entities)
+    def _properties(self, variable, fields=None):
+        """Build the expression that returns the properties of :variable,
+        projected onto :fields.
+        """
+        if fields is None:
+            return 'properties(%s)' % variable
 
-    def create(self, entities, raise_errors=False):
-        entities = self.from_dict_of_dicts(entities)
-        entities = self.g.create(*entities)
+        fields = sorted(set(fields) - {self.schema.Meta.identity})
 
-        return self.to_dict_of_dicts(entities), {}
+        if not fields:
+            return '{}'
 
-    def update(self, entities, raise_errors=False):
-        entities = self.from_dict_of_dicts(entities)
+        return '%s {%s}' % (variable, ', '.join(
+                '.`%s`' % f.replace('`', '``') for f in fields))
 
-        self.g.push(*entities)
+    def _entry(self, record):
+        """Build the dictionary that represents an entry from a :record,
+        whose columns were defined by :_returns.
+        """
+        raise NotImplementedError
 
-        return self.to_dict_of_dicts(entities), {}
+    @staticmethod
+    def _present(properties):
+        """Drop the nulls a map projection yields for the properties an
+        entry doesn't have, so they read as absent rather than as None.
+        """
+        return {k: v for k, v in dict(properties).items() if v is not None}
 
-    def delete(self, identities, raise_errors=False):
-        entities = self._build(identities)
-        entities = self.g.delete(*entities)
+    def _property(self, variable, field):
+        """Build the Cypher expression that references a :field of
+        :variable.
+        """
+        if field == self.schema.Meta.identity:
+            return 'id(%s)' % variable
 
-        return self.to_dict_of_dicts(entities), {}
+        return '%s.`%s`' % (variable, field.replace('`', '``'))
 
+    def _where(self, variable, query):
+        """Compile a :query into a parameterized Cypher WHERE clause.
 
-class GraphEntityRepository(GraphRepository, base.EntityRepository):
-    def _build(self, identities):
-        return [self.g.node(i) for i in identities]
+        :param variable: the variable in the statement being filtered.
+        :param query: :dict of (field, value) pairs.
+        :return: :pair (clause, parameters).
+        """
+        conditions, parameters = [], {}
 
-    def from_dict_of_dicts(self, entries):
-        nodes = []
+        # Fields are sorted so equivalent queries produce the same statement,
+        # allowing the database to reuse its execution plan.
+        for i, (field, value) in enumerate(sorted(query.items())):
+            parameter = 'p%i' % i
 
-        for i, entry in entries.items():
-            # Find if the node exists on the database or is a new node.
-            if self.schema.Meta.identity in entry:
-                # The entry claims to have an identity,
-                # bind the node to a database node.
-                node = self.g.node(entry[self.schema.Meta.identity])
-                del entry[self.schema.Meta.identity]
-            else:
-                # That's a new entry. Create a new node.
-                node = Node(self.label)
+            conditions.append('%s = $%s' % (self._property(variable, field),
+                                            parameter))
+            parameters[parameter] = value
 
-            node.properties.update(entry)
-            nodes.append(node)
+        clause = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
 
-        return nodes
+        return clause, parameters
 
-    def to_dict_of_dicts(self, entities, indices=None):
-        entries, entities = [], list(entities)
+    def _read(self, statement, variable, skip=0, limit=None, fields=None,
+              descending=False, **parameters):
+        """Complete a read :statement, returning :variable ordered by its
+        identity and paginated by the database itself.
 
-        for node in entities:
-            e = node.properties
-            e[self.schema.Meta.identity] = node._id
+        :param statement: the Cypher statement, without its RETURN clause.
+        :param variable: the variable to be returned.
+        :param skip: the number of elements to skip when retrieving.
+        :param limit: the maximum length of the list retrieved.
+        :param fields: the set of properties returned.
+        :param descending: flag if the statement should be paginated in
+            descending order.
+        :param parameters: the parameters referenced by the statement.
+        :return: :pair (statement, parameters).
+        """
+        statement += ' RETURN %s ORDER BY id(%s)%s SKIP $skip' % (
+            self._returns(variable, fields), variable,
+            ' DESC' if descending else '')
+        parameters['skip'] = skip or 0
 
-            entries.append(e)
+        if limit is not None:
+            statement += ' LIMIT $limit'
+            parameters['limit'] = limit
 
-        return super().to_dict_of_dicts(entries)
+        return statement, parameters
 
-    def all(self, skip=0, limit=None):
-        if limit is not None:
-            limit += skip
+    def _select(self, skip=0, limit=None, fields=None, after=None,
+                before=None, **query):
+        """Build the statement that reads the entries which match :query.
 
-        nodes = self.g.find(self.label, limit=limit)
+        :return: :tuple (statement, parameters, descending), where
+            descending flags if the records must be reversed by :_entries.
+        """
+        clause, parameters = self._where(self.variable, query)
 
-        # Discard :skip elements.
-        for _ in range(skip):
-            next(nodes)
+        if after is not None or before is not None:
+            # Keyset pagination: seek past the last identity seen,
+            # which is cheap regardless of how deep the page is.
+            clause += ' AND ' if clause else ' WHERE '
+            clause += 'id(%s) %s $bound' % (self.variable,
+                                            '>' if after is not None else '<')
+            parameters['bound'] = after if after is not None else before
 
-        return self.to_dict_of_dicts(nodes)
+        descending = after is None and before is not None
 
-    def where(self, skip=0, limit=None, **query):
-        if len(query) != 1:
-            raise ValueError('GraphRepository.where does not support '
-                             'multiple parameter filtering yet.')
+        statement, parameters = self._read(
+                self._match() + clause, self.variable, skip=skip, limit=limit,
+                fields=fields, descending=descending, **parameters)
 
-        # TODO: Allow multiple keys when searching. This issue might help:
-        # http://stackoverflow.com/questions/27795874/py2neo-graph-find-one-with-multiple-key-values
-        query_item = query.popitem()
-        if query_item[0] == self.schema.Meta.identity:
-            return self.find((query_item[1],))
+        return statement, parameters, descending
 
-        if limit is not None:
-            limit += skip
+    def _entries(self, records, descending=False):
+        """Convert the :records of a read statement into entries indexed by
+        their position, always in ascending order of identity.
+        """
+        if descending:
+            records = list(records)[::-1]
+
+        return {i: self._entry(r) for i, r in enumerate(records)}
 
-        nodes = self.g.find(self.label, *query_item, limit=limit)
+    def _find(self, identities):
+        """Build the statement that reads the entries with :identities.
 
-        for _ in range(skip):
-            next(nodes)
+        :return: :pair (statement, parameters).
+        """
+        return ('%s WHERE id(%s) IN $ids RETURN %s' % (
+            self._match(), self.variable, self._returns(self.variable)),
+                {'ids': identities})
+
+    def _found(self, identities, records):
+        """Index the entries in :records by the position of their identity
+        in :identities. Identities not found are left out, so callers can
+        report them by their index.
+        """
+        found = {}
+        for r in records:
+            e = self._entry(r)
+            found[e[self.schema.Meta.identity]] = e
 
-        return self.to_dict_of_dicts(nodes)
+        return {i: dict(found[identity])
+                for i, identity in enumerate(identities)
+                if identity in found}
 
+    def _count(self, query):
+        """Build the statement that counts the entries which match :query.
 
-class GraphRelationshipRepository(GraphRepository, base.RelationshipRepository):
-    def _build(self, identities):
-        return [self.g.relationship(i) for i in identities]
+        :return: :pair (statement, parameters).
+        """
+        clause, parameters = self._where(self.variable, query)
 
-    def from_dict_of_dicts(self, entries):
-        entities, indices = super().from_dict_of_dicts(entries)
+        return ('%s%s RETURN count(%s)' % (self._match(), clause,
+                                           self.variable), parameters)
 
-        relationships = []
+    def _write(self, statement, rows, raise_errors=False, ordered=None):
+        """Execute a write :statement in batches of :self.batch_size rows.
 
-        for r in entities:
-            if self.schema.Meta.identity in r:
-                relationship = self.g.relationship(r)
-            else:
-                origin = self.g.node(r['_origin'])
-                target = self.g.node(r['_target'])
+        The :statement must unwind the parameter $rows and return the index
+        `row.i` followed by the columns defined by :_returns. Rows which
+        do not yield a record are considered not found.
 
-                relationship = Relationship(origin, self.label.upper(), target)
+        :param statement: the Cypher statement to be executed for each batch.
+        :param rows: :list of dictionaries, each containing the key 'i',
+            the index in which the entry appeared in the request.
+        :param raise_errors: flag if errors should be raised or silenced.
+        :param ordered: flag if the batches following a failed one should
+            not be attempted.
 
-            # Delete meta properties, if present.
-            if self.schema.Meta.identity in r:
-                del r[self.schema.Meta.identity]
-            if '_origin' in r:
-                del r['_origin']
-            if '_target' in r:
-                del r['_target']
+        :return :pair of dicts: (written, failed) indexed by the original
+            order of the entries.
+        """
+        written, failed = {}, {}
+        batches = self._batches(rows)
+
+        for batch in batches:
+            try:
+                records = self.cypher(statement, rows=batch)
+            except self.cypher_errors as e:
+                if self._batch_failed(batch, e, batches, failed,
+                                      raise_errors, ordered):
+                    break
 
-            relationship.properties.update(r)
-            relationships.append(relationship)
+                continue
 
-        return relationships, indices
+            self._written(batch, records, written, failed, raise_errors)
 
-    def to_dict_of_dicts(self, entities, indices=None):
-        relationships = []
+        return written, failed
 
-        for r in entities:
-            e = r.properties
-            e[self.schema.Meta.identity] = r._id
-            e['_origin'] = r.start_node._id
-            e['_target'] = r.end_node._id
+    def _batches(self, rows):
+        """Split write :rows into the batches sent to the database.
 
-            relationships.append(e)
+        :return: an iterator over the batches, shared with :_batch_failed.
+        """
+        return commons.CollectionHelper.chunks(rows, self.batch_size)
 
-        return super().to_dict_of_dicts(relationships, indices)
+    def _batch_failed(self, batch, error, batches, failed, raise_errors=False,
+                      ordered=None):
+        """Collect the :error raised by a write :batch into :failed.
 
-    def all(self, skip=0, limit=None):
+        :return: flag if the remaining :batches are not attempted, in which
+            case they are failed as well.
+        """
+        if raise_errors:
+            raise error
+
+        if ordered is None:
+            ordered = self.ordered_writes
+
+        failed.update((row['i'], str(error)) for row in batch)
+
+        if ordered:
+            for row in itertools.chain.from_iterable(batches):
+                failed[row['i']] = 'Not attempted, as a previous entry failed.'
+
+        return ordered
+
+    def _written(self, batch, records, written, failed, raise_errors=False):
+        """Collect the :records returned for a :batch of write rows into
+        :written. Rows which did not yield a record are :failed.
+        """
+        for record in records:
+            written[record[0]] = self._entry(record[1:])
+
+        missing = [row for row in batch if row['i'] not in written]
+
+        if missing and raise_errors:
+            raise errors.NotFoundError(
+                    ('NOT_FOUND', ([self._reference(row)
+                                    for row in missing],)))
+
+        for row in missing:
+            failed[row['i']] = (settings.effective.ERRORS['NOT_FOUND']
+                                ['description'] % (self._reference(row),))
+
+    def _reference(self, row):
+        """Retrieve the reference reported when the entry of a write :row
+        is not found.
+        """
+        return row['id']
+
+    def _rows(self, entities):
+        """Convert :entities into the rows sent to write statements.
+        """
+        raise NotImplementedError
+
+    def _create(self):
+        """Build the statement that creates a batch of rows.
+        """
+        raise NotImplementedError
+
+    def _update(self):
+        """Build the statement that updates a batch of rows.
+        """
+        raise NotImplementedError
+
+    def _upsert(self, key):
+        """Build the statement that merges a batch of rows on the
+        property :key, whose values are bound to `row.key`.
+        """
+        raise NotImplementedError
+
+    def _keyed_rows(self, entities, key):
+        rows = self._rows(entities)
+
+        for row, e in zip(rows, entities.values()):
+            row['key'] = e.get(key)
+
+        return rows
+
+    def _delete(self):
+        """Build the statement that deletes a batch of rows.
+        """
+        raise NotImplementedError
+
+    def _delete_where(self, query, returning=False):
+        """Build the statement that deletes up to $chunk entries which
+        match :query.
+
+        :param returning: flag if the statement returns the columns defined
+            by :_returns for each entry deleted, instead of their count.
+        :return: :pair (statement, parameters).
+        """
+        raise NotImplementedError
+
+    def _kept(self, query):
+        """Build the statement that reads the identities of the entries
+        which match :query, but are kept by the statement of
+        :_delete_where.
+
+        :return: :pair (statement, parameters), or None if no entry is kept.
+        """
+        return None
+
+    def _delete_chunks(self, query, chunk_size=None, returning=False):
+        """Build the statement of :_delete_where, deleting chunks of
+        :chunk_size entries.
+
+        :return: :tuple (statement, parameters, chunk_size).
+        """
+        statement, parameters = self._delete_where(query, returning)
+        parameters['chunk'] = chunk_size = chunk_size or self.batch_size
+
+        return statement, parameters, chunk_size
+
+    def _deleted_where(self, count, deleted, returning, kept=None):
+        """Build the result of :delete_where from the entries :deleted and
+        the records :kept, read by the statement of :_kept.
+        """
+        description = (settings.effective.ERRORS['HAS_RELATIONSHIPS']
+                       ['description'])
+        failed = {r[0]: description % r[0] for r in kept or []}
+
+        return count, self._entries(deleted) if returning else None, failed
+
+    def _kept_rows(self, rows):
+        """Build the statement that reads the identities of the write :rows
+        which are kept by the statement of :_delete.
+
+        :return: :pair (statement, parameters), or None if no entry is kept.
+        """
+        return None
+
+    def _deletable(self, rows, records, failed, raise_errors=False):
+        """Move the :rows whose identities are in the :records read by
+        :_kept_rows into :failed.
+
+        :return: the rows left to be deleted.
+        """
+        kept = {r[0] for r in records}
+        rejected = [row for row in rows if row['id'] in kept]
+
+        if rejected and raise_errors:
+            raise errors.BadRequestError(
+                    ('HAS_RELATIONSHIPS', ([row['id'] for row in rejected],)))
+
+        description = (settings.effective.ERRORS['HAS_RELATIONSHIPS']
+                       ['description'])
+
+        for row in rejected:
+            failed[row['i']] = description % row['id']
+
+        return [row for row in rows if row['id'] not in kept]
+
+    def _deleted(self, records, returning, deleted):
+        """Collect the :records of a chunk deleted into :deleted.
+
+        :return: :int: the number of entries deleted.
+        """
+        if not returning:
+            return records[0][0]
+
+        deleted.extend(records)
+        return len(records)
+
+    def all(self, skip=0, limit=None, fields=None, after=None, before=None):
+        return self.where(skip=skip, limit=limit, fields=fields,
+                          after=after, before=before)
+
+    def find(self, identities):
+        identities = list(identities)
+        statement, parameters = self._find(identities)
+
+        return self._found(identities, self.cypher(statement, **parameters))
+
+    def where(self, skip=0, limit=None, fields=None, after=None, before=None,
+              **query):
+        statement, parameters, descending = self._select(
+                skip, limit, fields, after, before, **query)
+
+        return self._entries(self.cypher(statement, **parameters), descending)
+
+    def count(self, **query):
+        statement, parameters = self._count(query)
+
+        return self.cypher(statement, **parameters)[0][0]
+
+    def create(self, entities, raise_errors=False, ordered=None):
+        return self._write(self._create(), self._rows(entities),
+                           raise_errors, ordered)
+
+    def update(self, entities, raise_errors=False, ordered=None):
+        return self._write(self._update(), self._rows(entities),
+                           raise_errors, ordered)
+
+    def upsert(self, entities, key=None, raise_errors=False, ordered=None):
+        """Merge :entities on their :key field.
+
+        Identities are assigned by the database, hence entities upserted
+        on their identity are only updated.
+        """
+        if key is None or key == self.schema.Meta.identity:
+            return self.update(entities, raise_errors, ordered)
+
+        return self._write(self._upsert(key),
+                           self._keyed_rows(entities, key),
+                           raise_errors, ordered)
+
+    def delete(self, entities, raise_errors=False, ordered=None):
+        rows, failed = self._rows(entities), {}
+        kept = self._kept_rows(rows)
+
+        if kept is not None:
+            rows = self._deletable(rows, self.cypher(kept[0], **kept[1]),
+                                   failed, raise_errors)
+
+        deleted, write_failed = self._write(self._delete(), rows,
+                                            raise_errors, ordered)
+        failed.update(write_failed)
+
+        return deleted, failed
+
+    def delete_where(self, chunk_size=None, returning=False, **query):
+        """Delete the entries that match :query, running a statement for
+        each chunk of :chunk_size entries until none is left.
+        """
+        statement, parameters, chunk_size = self._delete_chunks(
+                query, chunk_size, returning)
+        count, deleted = 0, []
+
+        while True:
+            n = self._deleted(self.cypher(statement, **parameters),
+                              returning, deleted)
+            count += n
+
+            if n < chunk_size:
+                break
+
+        kept = self._kept(query)
+
+        if kept is not None:
+            kept = self.cypher(kept[0], **kept[1])
+
+        return self._deleted_where(count, deleted, returning, kept)
+
+
+class GraphEntityRepository(GraphRepository, base.EntityRepository):
+    variable = 'n'
+
+    def _match(self):
+        return 'MATCH (n:`%s`)' % self.label
+
+    def _returns(self, variable, fields=None):
+        return 'id(%s), %s' % (variable, self._properties(variable, fields))
+
+    def _entry(self, record):
+        e = self._present(record[1])
+        e[self.schema.Meta.identity] = record[0]
+
+        return e
+
+    def _rows(self, entities):
+        identity = self.schema.Meta.identity
+
+        return [{'i': i,
+                 'id': e.get(identity),
+                 'properties': {k: v for k, v in e.items() if k != identity}}
+                for i, e in entities.items()]
+
+    def _create(self):
+        return ('UNWIND $rows AS row '
+                'CREATE (n:`%s`) SET n = row.properties '
+                'RETURN row.i, %s' % (self.label, self._returns('n')))
+
+    def _update(self):
+        return ('UNWIND $rows AS row '
+                'MATCH (n:`%s`) WHERE id(n) = row.id '
+                'SET n += row.properties '
+                'RETURN row.i, %s' % (self.label, self._returns('n')))
+
+    def _upsert(self, key):
+        return ('UNWIND $rows AS row '
+                'MERGE (n:`%s` {`%s`: row.key}) SET n += row.properties '
+                'RETURN row.i, %s' % (self.label, key.replace('`', '``'),
+                                      self._returns('n')))
+
+    def _delete(self):
+        # Properties are bound before the node is deleted. Relationships are
+        # never deleted along with their nodes, so nodes which still have
+        # them are kept.
+        return ('UNWIND $rows AS row '
+                'MATCH (n:`%s`) WHERE id(n) = row.id AND NOT (n)--() '
+                'WITH row, n, properties(n) AS properties DELETE n '
+                'RETURN row.i, row.id, properties' % self.label)
+
+    def _delete_where(self, query, returning=False):
+        # Nodes which still have relationships are kept, as in :_delete.
+        clause, parameters = self._where('n', query)
+        clause += ' AND ' if clause else ' WHERE '
+        statement = '%s%sNOT (n)--() WITH n LIMIT $chunk ' % (self._match(),
+                                                               clause)
+
+        if returning:
+            statement += ('WITH n, id(n) AS id, properties(n) AS properties '
+                          'DELETE n RETURN id, properties')
+        else:
+            statement += 'DELETE n RETURN count(*)'
+
+        return statement, parameters
+
+    def _kept(self, query):
+        clause, parameters = self._where('n', query)
+        clause += ' AND ' if clause else ' WHERE '
+
+        return ('%s%s(n)--() RETURN id(n)' % (self._match(), clause),
+                parameters)
+
+    def _kept_rows(self, rows):
+        return ('%s WHERE id(n) IN $ids AND (n)--() RETURN id(n)'
+                % self._match(), {'ids': [row['id'] for row in rows]})
+
+    def indexes(self):
+        description = re.compile(r'ON :`?%s`?\(`?([^,`]+)`?\)$'
+                                 % re.escape(self.label))
+        indexes = {}
+
+        for r in self.cypher('CALL db.indexes() YIELD description, type '
+                             'RETURN description, type'):
+            m = description.search(r[0])
+
+            if m:
+                indexes[m.group(1)] = 'unique' in r[1]
+
+        return indexes
+
+    def create_index(self, field, unique=False):
+        field = field.replace('`', '``')
+
+        if unique:
+            statement = ('CREATE CONSTRAINT ON (n:`%s`) '
+                         'ASSERT n.`%s` IS UNIQUE' % (self.label, field))
+        else:
+            statement = 'CREATE INDEX ON :`%s`(`%s`)' % (self.label, field)
+
+        try:
+            self.cypher(statement)
+        except self.cypher_errors:
+            return False
+
+        return True
+
+
+class GraphRelationshipRepository(GraphRepository, base.RelationshipRepository):
+    variable = 'r'
+
+    def _match(self):
+        return 'MATCH (a)-[r:`%s`]->(b)' % self.label.upper()
+
+    def _returns(self, variable, fields=None):
+        if fields is not None:
+            fields = set(fields) - {'_origin', '_target'}
+
+        return ('id({0}), {1}, id(startNode({0})), id(endNode({0}))'
+                .format(variable, self._properties(variable, fields)))
+
+    def _entry(self, record):
+        e = self._present(record[1])
+        e[self.schema.Meta.identity] = record[0]
+        e['_origin'] = record[2]
+        e['_target'] = record[3]
+
+        return e
+
+    def _property(self, variable, field):
+        # Relationships are always matched as (a)-[variable]->(b).
+        if field == '_origin':
+            return 'id(a)'
+        if field == '_target':
+            return 'id(b)'
+
+        return super()._property(variable, field)
+
+    def _rows(self, entities):
+        meta = {self.schema.Meta.identity, '_origin', '_target'}
+
+        return [{'i': i,
+                 'id': e.get(self.schema.Meta.identity),
+                 'o': e.get('_origin'),
+                 't': e.get('_target'),
+                 'properties': {k: v for k, v in e.items() if k not in meta}}
+                for i, e in entities.items()]
+
+    def _reference(self, row):
+        if row['id'] is None:
+            # A new relationship, whose endpoints were not found.
+            return [row['o'], row['t']]
+
+        return row['id']
+
+    def _create(self):
+        # Endpoints are resolved for the whole batch at once. Rows whose
+        # origin or target do not exist yield no record and are failed.
+        return ('UNWIND $rows AS row '
+                'MATCH (a), (b) WHERE id(a) = row.o AND id(b) = row.t '
+                'CREATE (a)-[r:`%s`]->(b) SET r = row.properties '
+                'RETURN row.i, %s' % (self.label.upper(),
+                                      self._returns('r')))
+
+    def _update(self):
+        return ('UNWIND $rows AS row '
+                'MATCH (a)-[r:`%s`]->(b) WHERE id(r) = row.id '
+                'SET r += row.properties '
+                'RETURN row.i, %s' % (self.label.upper(),
+                                      self._returns('r')))
+
+    def _upsert(self, key):
+        # Rows whose origin or target do not exist are failed, as in _create.
+        return ('UNWIND $rows AS row '
+                'MATCH (a), (b) WHERE id(a) = row.o AND id(b) = row.t '
+                'MERGE (a)-[r:`%s` {`%s`: row.key}]->(b) '
+                'SET r += row.properties '
+                'RETURN row.i, %s' % (self.label.upper(),
+                                      key.replace('`', '``'),
+                                      self._returns('r')))
+
+    def _delete(self):
+        return ('UNWIND $rows AS row '
+                'MATCH (a)-[r:`%s`]->(b) WHERE id(r) = row.id '
+                'WITH row, r, properties(r) AS properties, '
+                'id(a) AS origin, id(b) AS target DELETE r '
+                'RETURN row.i, row.id, properties, origin, target'
+                % self.label.upper())
+
+    def _delete_where(self, query, returning=False):
+        clause, parameters = self._where('r', query)
+        statement = '%s%s WITH r LIMIT $chunk ' % (self._match(), clause)
+
+        if returning:
+            statement += ('WITH r, id(r) AS id, properties(r) AS properties, '
+                          'id(startNode(r)) AS origin, '
+                          'id(endNode(r)) AS target '
+                          'DELETE r RETURN id, properties, origin, target')
+        else:
+            statement += 'DELETE r RETURN count(*)'
+
+        return statement, parameters
+
+    def all(self, skip=0, limit=None, fields=None, after=None, before=None):
         """Match all relationships, as long as they share the same label
         with this repository.
 
@@ -182,32 +702,24 @@ class GraphRelationshipRepository(GraphRepository, base.RelationshipRepository):
 
         :param limit: the maximum length of the list retrieved.
         If None, returns all elements after :skip.
-        """
-        return self.match(skip=skip, limit=limit)
 
-    def match(self, origin=None, target=None, skip=0, limit=None):
-        if origin:
-            origin = self.g.node(origin)
-        if target:
-            target = self.g.node(target)
-        if limit is not None:
-            limit += skip
-
-        relationships = self.g.match(origin, self.label.upper(), target,
-                                     limit=limit)
+        :param fields: the set of fields to be retrieved, besides the
+        identity. If None, all fields are retrieved.
 
-        for _ in range(skip):
-            next(relationships)
+        :param after: retrieve only relationships whose identity follows it.
 
-        return self.to_dict_of_dicts(relationships)
+        :param before: retrieve only relationships whose identity precedes it.
+        """
+        return self.where(skip=skip, limit=limit, fields=fields,
+                          after=after, before=before)
 
-    def where(self, skip=0, limit=None, **query):
-        if len(query) != 1:
-            raise ValueError('GraphRepository.where does not support'
-                             'multiple parameter filtering yet.')
+    def match(self, origin=None, target=None, skip=0, limit=None,
+              fields=None):
+        query = {}
 
-        query_item = query.popitem()
-        if query_item[0] == self.schema.Meta.identity:
-            return self.find((query_item[1],))
+        if origin is not None:
+            query['_origin'] = origin
+        if target is not None:
+            query['_target'] = target
 
-        raise NotImplementedError
+        return self.where(skip=skip, limit=limit, fields=fields, **query)
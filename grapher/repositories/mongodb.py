@@ -1,22 +1,68 @@
 import abc
-from pymongo import MongoClient, UpdateOne
-from pymongo.errors import BulkWriteError
+import threading
+
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteOne, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
 from . import base
-from .. import settings
+from .. import commons, errors, settings
 
 
 class MongodbRepository(base.Repository, metaclass=abc.ABCMeta):
+    """Repository backed by a MongoDB collection.
+
+    Clients are shared by all repositories in the process, one for each
+    distinct set of connection options, so each of them keeps a single
+    connection pool and set of monitoring threads.
+    """
+
     connection_string = settings.effective.DATABASES['mongodb']
+    database_errors = (PyMongoError,)
     _database = None
-    _mongodb_client = None
+
+    # The maximum number of documents retrieved at once by streams and by
+    # deletes that return the documents deleted.
+    batch_size = connection_string.get('batch_size', 1000)
+
+    # Options of the connection string passed on to the client.
+    client_options = ('host', 'port', 'maxPoolSize', 'minPoolSize',
+                      'waitQueueTimeoutMS', 'maxIdleTimeMS', 'compressors')
+
+    _clients = {}
+    _clients_lock = threading.Lock()
 
     @property
     def mongodb_client(self):
-        self._mongodb_client = self._mongodb_client or \
-                               MongoClient(
-                                       **{k: self.connection_string[k] for k in
-                                          {'host', 'port'}})
-        return self._mongodb_client
+        return self.shared_client(MongoClient, MongodbRepository._clients)
+
+    def shared_client(self, client_class, clients):
+        """Retrieve the client in :clients for this repository's connection
+        options, instantiating :client_class if it does not exist yet.
+        """
+        options = {k: self.connection_string[k] for k in self.client_options
+                   if self.connection_string.get(k) is not None}
+        key = tuple(sorted(options.items()))
+
+        client = clients.get(key)
+
+        if client is None:
+            with MongodbRepository._clients_lock:
+                client = clients.get(key)
+
+                if client is None:
+                    client = clients[key] = client_class(**options)
+
+        return client
+
+    @classmethod
+    def close(cls):
+        """Close all shared clients and their pooled connections.
+        """
+        with cls._clients_lock:
+            for client in MongodbRepository._clients.values():
+                client.close()
+
+            MongodbRepository._clients.clear()
 
     @property
     def database(self):
@@ -28,83 +74,503 @@ class MongodbRepository(base.Repository, metaclass=abc.ABCMeta):
     def collection(self):
         return self.database[self.label]
 
+    def indexes(self):
+        indexes = {}
+
+        for name, info in self.collection.index_information().items():
+            keys = info['key']
+
+            # Compound indexes and the implicit identity index are ignored.
+            if len(keys) == 1 and keys[0][0] != '_id':
+                indexes[keys[0][0]] = bool(info.get('unique'))
+
+        return indexes
+
+    def create_index(self, field, unique=False):
+        try:
+            self.collection.create_index(field, unique=unique)
+        except OperationFailure:
+            return False
+
+        return True
+
+    def projection(self, fields=None):
+        """Build the projection of :fields passed to the collection's find.
+
+        The identity is always retrieved.
+        """
+        if fields is None:
+            return None
+
+        projection = {f: True for f in fields}
+        projection[self.schema.Meta.identity] = True
+
+        return projection
+
+    @staticmethod
+    def object_id(identity):
+        """Restore an identity serialized by :to_dict_of_dicts.
+        """
+        if isinstance(identity, str) and len(identity) == 24 and \
+                ObjectId.is_valid(identity):
+            return ObjectId(identity)
+
+        return identity
+
+    def _seek(self, query=None, skip=0, limit=None, fields=None, after=None,
+              before=None):
+        """Build the arguments passed on to the collection's find.
+
+        Documents are always sorted by identity, as in the graph
+        repositories, so the last identity of any page can seek the next
+        one, including the first page of a keyset pagination.
+
+        :return: :pair (query, options).
+        """
+        query = query or {}
+
+        if after is not None or before is not None:
+            # Keyset pagination over the identity index.
+            bound = {'$gt': self.object_id(after)} if after is not None \
+                else {'$lt': self.object_id(before)}
+            query = {'$and': [query, {'_id': bound}]} if '_id' in query \
+                else dict(query, _id=bound)
+
+        descending = after is None and before is not None
+
+        return query, dict(projection=self.projection(fields), skip=skip,
+                           limit=limit or 0,
+                           sort=[('_id', -1 if descending else 1)])
+
+    def _entities(self, entities, descending=False):
+        """Index the documents retrieved by find by their position, always
+        in ascending order of identity.
+        """
+        if descending:
+            entities = list(entities)[::-1]
+
+        return self.to_dict_of_dicts(entities)
+
+    def _find(self, query=None, skip=0, limit=None, fields=None, after=None,
+              before=None):
+        query, options = self._seek(query, skip, limit, fields, after, before)
+
+        return self._entities(self.collection.find(query, **options),
+                              descending=after is None and before is not None)
+
+    def _found(self, identities, entities):
+        """Index the :entities found by the position of their identity in
+        :identities. Identities not found are left out.
+        """
+        found = {str(e['_id']): e for e in entities}
+
+        entities, indices = [], []
+
+        for i, identity in enumerate(identities):
+            if str(identity) in found:
+                entities.append(dict(found[str(identity)]))
+                indices.append(i)
+
+        return self.to_dict_of_dicts(entities, indices)
+
     def to_dict_of_dicts(self, entities, indices=None):
         entities = list(entities)
+        identity = self.schema.Meta.identity
 
         for e in entities:
-            e[self.schema.Meta.identity] = str(e[self.schema.Meta.identity])
+            if identity in e:
+                e[identity] = str(e[identity])
 
         return super().to_dict_of_dicts(entities, indices)
 
+    def all(self, skip=0, limit=None, fields=None, after=None, before=None):
+        return self._find(skip=skip, limit=limit, fields=fields,
+                          after=after, before=before)
 
-class MongodbEntityRepository(MongodbRepository, base.EntityRepository):
-    def all(self, skip=0, limit=None):
-        limit = limit or 0
+    def find(self, identities):
+        identities = list(identities)
 
-        entities = self.collection.find(skip=skip, limit=limit)
-        return self.to_dict_of_dicts(entities)
+        return self._found(identities, self.collection.find(
+                {'_id': {'$in': [self.object_id(i) for i in identities]}}))
 
-    def find(self, identities):
-        entities = self.collection.find({'_id': {'$in': identities}})
-        return self.to_dict_of_dicts(entities)
+    def where(self, skip=0, limit=None, fields=None, after=None, before=None,
+              **query):
+        return self._find(query, skip=skip, limit=limit, fields=fields,
+                          after=after, before=before)
 
-    def where(self, skip=0, limit=None, **query):
-        limit = limit or 0
+    def count(self, **query):
+        return self.collection.count_documents(query)
 
-        entities = self.collection.find(query, skip=skip, limit=limit)
-        return self.to_dict_of_dicts(entities)
+    def stream(self, chunk_size=None, fields=None, skip=0, limit=None,
+               **query):
+        """Retrieve the documents that match :query through a single
+        cursor, which fetches :chunk_size documents from the server at once.
+        """
+        chunk_size = chunk_size or self.batch_size
+        query, options = self._seek(query, skip, limit, fields)
+        position = 0
 
-    def create(self, entities, raise_errors=False):
-        entities, indices = self.from_dict_of_dicts(entities)
+        for chunk in commons.CollectionHelper.chunks(
+                self.collection.find(query, batch_size=chunk_size, **options),
+                chunk_size):
+            yield self.to_dict_of_dicts(
+                    chunk, range(position, position + len(chunk)))
+            position += len(chunk)
 
-        result = self.collection.insert_many(entities)
-        ids = iter(result.inserted_ids)
+    def _write_failures(self, bulk_error, n, ordered=True):
+        """Map the errors of a bulk write of :n documents to their positions.
 
-        for entity in entities:
-            entity.update({self.schema.Meta.identity: str(next(ids))})
+        Ordered writes stop at the first error, hence all documents after it
+        are failed as well. Unordered writes attempt every document, so only
+        the ones reported in `writeErrors` have failed.
 
-        return self.to_dict_of_dicts(entities, indices), {}
+        :return: :dict (position)->(error message).
+        """
+        write_errors = bulk_error.details.get('writeErrors', [])
+        failed = {e['index']: e['errmsg'] for e in write_errors}
 
-    def update(self, entities, raise_errors=False):
-        entities, indices = self.from_dict_of_dicts(entities)
-        failed = {}
+        if failed and ordered:
+            first = min(failed)
 
-        try:
-            result = self.collection.bulk_write(
-                    (UpdateOne({'_id': e[self.schema.Meta.identity]}, {'$set': e}) for e in
-                     entities), ordered=True)
+            for position in range(first + 1, n):
+                failed.setdefault(position, 'Not attempted, as the entry %s '
+                                            'failed.' % first)
+
+        return failed
+
+    def _bulk_write(self, write, entities, indices, raise_errors, ordered):
+        """Run :write over :entities, splitting them in written and failed.
+
+        :param write: callable that receives :entities and the ordered flag
+            and performs the bulk operation.
 
+        :return: :tuple (written, failed, summary), where written is the
+            list of the positions written, failed is the :dict (request
+            index)->(error message) of failures and summary holds the
+            counters reported by the server, such as `nMatched`.
+        """
+        if ordered is None:
+            ordered = self.ordered_writes
+
+        try:
+            result = write(entities, ordered)
         except BulkWriteError as bulk_error:
             if raise_errors:
                 raise
 
-            for error in bulk_error['writeErrors']:
-                i = error['index']
+            return self._written(bulk_error, entities, indices, ordered)
+
+        return self._written(None, entities, indices, ordered, result)
+
+    def _written(self, bulk_error, entities, indices, ordered, result=None):
+        if bulk_error is not None:
+            failed = self._write_failures(bulk_error, len(entities), ordered)
+            summary = bulk_error.details
+        else:
+            failed = {}
+            summary = getattr(result, 'bulk_api_result', None) or {}
+
+        written = [p for p in range(len(entities)) if p not in failed]
+
+        return written, {indices[p]: e for p, e in failed.items()}, summary
+
+    def _not_found(self, entities, indices, written, failed, found,
+                   raise_errors):
+        """Move the :written positions whose identities were not :found
+        into :failed.
+
+        :return: the list of positions effectively written.
+        """
+        identity = self.schema.Meta.identity
+        found = {str(i) for i in found}
+
+        missing = [p for p in written
+                   if str(entities[p][identity]) not in found]
+
+        if missing and raise_errors:
+            raise errors.NotFoundError(
+                    ('NOT_FOUND', ([entities[p][identity]
+                                    for p in missing],)))
+
+        for p in missing:
+            failed[indices[p]] = (settings.effective.ERRORS['NOT_FOUND']
+                                  ['description'] % entities[p][identity])
+
+        return [p for p in written if p not in missing]
+
+    def _existing(self, entities, indices, failed, found, raise_errors):
+        """Select the :entities whose identities were :found, moving the
+        others into :failed.
+
+        :return: :pair (entities, indices) of the entities found.
+        """
+        existing = self._not_found(entities, indices, range(len(entities)),
+                                   failed, found, raise_errors)
+
+        return [entities[p] for p in existing], [indices[p] for p in existing]
+
+    def _identified(self, entities):
+        """Build the filter that matches the identities of :entities.
+        """
+        identity = self.schema.Meta.identity
+
+        return {'_id': {'$in': [self.object_id(e[identity])
+                                for e in entities]}}
 
-                indices.pop(i)
-                entities.pop(i)
+    def _select(self, entities, indices, written):
+        """Select the :written positions of :entities, indexed by their
+        original :indices.
+        """
+        return self.to_dict_of_dicts([entities[p] for p in written],
+                                     [indices[p] for p in written])
 
-                failed[i] = error['errmsg']
+    def _written_filter(self, entities, written, key=None, unidentified=()):
+        """Build the filter that reads back the documents stored for the
+        :written positions of :entities.
 
-        return self.to_dict_of_dicts(entities, indices), failed
+        The :unidentified positions, which matched existing documents by
+        their :key field, are read back by it instead.
+        """
+        identity = self.schema.Meta.identity
+        unidentified = set(unidentified)
 
-    def delete(self, entities, raise_errors=False):
+        query = {'_id': {'$in': [self.object_id(entities[p][identity])
+                                 for p in written if p not in unidentified]}}
+
+        if unidentified:
+            query = {'$or': [query, {key: {'$in': [entities[p][key]
+                                                   for p in unidentified]}}]}
+
+        return query
+
+    def _stored(self, entities, indices, written, documents):
+        """Select the :documents stored for the :written positions of
+        :entities, indexed by their original :indices.
+        """
+        identity = self.schema.Meta.identity
+        stored = {str(d['_id']): d for d in documents}
+
+        written = [p for p in written
+                   if str(entities[p].get(identity)) in stored]
+
+        return self.to_dict_of_dicts(
+                [stored[str(entities[p][identity])] for p in written],
+                [indices[p] for p in written])
+
+    def _identify_created(self, entities, written):
+        for p in written:
+            # insert_many sets the generated identity on the documents.
+            entities[p][self.schema.Meta.identity] = entities[p]['_id']
+
+    def _filter(self, entity, key=None):
+        """Build the filter that matches :entity by its :key field, or by
+        its identity if :key is None.
+        """
+        identity = self.schema.Meta.identity
+
+        if key is None or key == identity:
+            return {'_id': self.object_id(entity[identity])}
+
+        return {key: entity[key]}
+
+    def _updates(self, entities, key=None, upsert=False):
+        identity = self.schema.Meta.identity
+
+        return [UpdateOne(self._filter(e, key),
+                          {'$set': {k: v for k, v in e.items()
+                                    if k not in (identity, '_id')}},
+                          upsert=upsert)
+                for e in entities]
+
+    def _identify_upserted(self, entities, written, summary):
+        """Set the identities of the documents created by an upsert.
+
+        :return: the list of the :written positions still unidentified,
+            as they matched existing documents by another field.
+        """
+        identity = self.schema.Meta.identity
+
+        for upserted in summary.get('upserted', []):
+            entities[upserted['index']][identity] = upserted['_id']
+
+        return [p for p in written if identity not in entities[p]]
+
+    def _identify_matched(self, entities, positions, key, documents):
+        identities = {d[key]: d['_id'] for d in documents}
+
+        for p in positions:
+            if entities[p][key] in identities:
+                entities[p][self.schema.Meta.identity] = \
+                    identities[entities[p][key]]
+
+    def _deletions(self, entities):
+        identity = self.schema.Meta.identity
+
+        return [DeleteOne({'_id': self.object_id(e[identity])})
+                for e in entities]
+
+    def create(self, entities, raise_errors=False, ordered=None):
         entities, indices = self.from_dict_of_dicts(entities)
 
-        result = self.collection.delete_many({'_id': {'$in': entities}})
+        written, failed, _ = self._bulk_write(
+                lambda e, o: self.collection.insert_many(e, ordered=o),
+                entities, indices, raise_errors, ordered)
 
-        if result.deleted_count == len(entities):
-            return self.to_dict_of_dicts(entities, indices), {}
-        else:
-            if raise_errors:
-                raise BulkWriteError(result)
+        self._identify_created(entities, written)
+
+        return self._select(entities, indices, written), failed
+
+    def update(self, entities, raise_errors=False, ordered=None):
+        """Update the fields in :entities, leaving all others untouched.
+
+        The documents updated are read back at once, so all of their fields
+        are returned. Entities whose identities are not in the collection
+        are failed.
+        """
+        entities, indices = self.from_dict_of_dicts(entities)
+        operations = self._updates(entities)
+
+        written, failed, _ = self._bulk_write(
+                lambda _, o: self.collection.bulk_write(operations, ordered=o),
+                entities, indices, raise_errors, ordered)
+
+        if not written:
+            return {}, failed
+
+        documents = list(self.collection.find(
+                self._written_filter(entities, written)))
+        written = self._not_found(entities, indices, written, failed,
+                                  [d['_id'] for d in documents], raise_errors)
+
+        return self._stored(entities, indices, written, documents), failed
+
+    def upsert(self, entities, key=None, raise_errors=False, ordered=None):
+        """Merge :entities on their :key field.
+
+        The documents stored are read back at once, so the fields of the
+        documents matched which were not in :entities are returned as well.
+        """
+        entities, indices = self.from_dict_of_dicts(entities)
+        operations = self._updates(entities, key, upsert=True)
+
+        written, failed, summary = self._bulk_write(
+                lambda _, o: self.collection.bulk_write(operations, ordered=o),
+                entities, indices, raise_errors, ordered)
+
+        if not written:
+            return {}, failed
+
+        unidentified = self._identify_upserted(entities, written, summary)
 
-            return (self.to_dict_of_dicts(entities[:result.deleted_count],
-                                          indices[:result.deleted_count]),
-                    self.to_dict_of_dicts(entities[result.deleted_count:],
-                                          indices[result.deleted_count:]))
+        documents = list(self.collection.find(self._written_filter(
+                entities, written, key, unidentified)))
+
+        if unidentified:
+            # Documents matched by a unique field are identified at once.
+            self._identify_matched(entities, unidentified, key, documents)
+
+        return self._stored(entities, indices, written, documents), failed
+
+    def delete(self, entities, raise_errors=False, ordered=None):
+        """Delete :entities by their identities.
+
+        The server does not report deletions that match no document, so
+        the identities are looked up beforehand. Entities not found are
+        failed.
+        """
+        entities, indices = self.from_dict_of_dicts(entities)
+        failed = {}
+
+        found = self.collection.distinct('_id', self._identified(entities))
+        entities, indices = self._existing(entities, indices, failed, found,
+                                           raise_errors)
+
+        if not entities:
+            return {}, failed
+
+        operations = self._deletions(entities)
+
+        written, write_failed, _ = self._bulk_write(
+                lambda _, o: self.collection.bulk_write(operations, ordered=o),
+                entities, indices, raise_errors, ordered)
+        failed.update(write_failed)
+
+        return self._select(entities, indices, written), failed
+
+    def delete_where(self, chunk_size=None, returning=False, **query):
+        """Delete the documents that match :query.
+
+        Documents are deleted by a single `delete_many`, unless they are
+        returned, in which case they are retrieved and deleted in chunks
+        of :chunk_size.
+        """
+        if not returning:
+            return self.collection.delete_many(query).deleted_count, None, {}
+
+        chunk_size = chunk_size or self.batch_size
+        count, deleted = 0, []
+
+        while True:
+            documents = list(self.collection.find(query, limit=chunk_size))
+
+            if documents:
+                count += self.collection.delete_many(
+                        self._chunk(documents)).deleted_count
+                deleted += documents
+
+            if len(documents) < chunk_size:
+                break
+
+        return count, self.to_dict_of_dicts(deleted), {}
+
+    @staticmethod
+    def _chunk(documents):
+        return {'_id': {'$in': [d['_id'] for d in documents]}}
+
+
+class MongodbEntityRepository(MongodbRepository, base.EntityRepository):
+    pass
 
 
 class MongodbRelationshipRepository(MongodbRepository,
                                     base.RelationshipRepository):
-    pass
+    # Compound indexes that turn lookups by either endpoint into seeks.
+    adjacency_indexes = (('_origin', '_target'), ('_target', '_origin'))
+
+    def match(self, origin=None, target=None, skip=0, limit=None,
+              fields=None):
+        query = {}
+
+        if origin is not None:
+            query['_origin'] = origin
+        if target is not None:
+            query['_target'] = target
+
+        return self.where(skip=skip, limit=limit, fields=fields, **query)
+
+    def projection(self, fields=None):
+        projection = super().projection(fields)
+
+        if projection is not None:
+            projection.update(_origin=True, _target=True)
+
+        return projection
+
+    def reconcile_indexes(self, create=True):
+        created, missing, undeclared = super().reconcile_indexes(create)
+
+        existing = {tuple(k for k, _ in info['key'])
+                    for info in self.collection.index_information().values()}
+
+        for keys in self.adjacency_indexes:
+            if keys in existing:
+                continue
+
+            name = ','.join(keys)
+
+            if create and self.create_index([(k, ASCENDING) for k in keys]):
+                created[name] = False
+            else:
+                missing[name] = False
+
+        return created, missing, undeclared
@@ -0,0 +1,225 @@
+import abc
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+
+from . import base, mongodb
+
+
+class MotorRepository(mongodb.MongodbRepository, base.AsyncRepository,
+                      metaclass=abc.ABCMeta):
+    """MongoDB repository that awaits its operations through Motor.
+
+    Queries and bulk operations are built just like in :MongodbRepository.
+    Indexes are still reconciled through the synchronous client on start-up.
+    """
+
+    _async_clients = {}
+
+    @property
+    def motor_client(self):
+        return self.shared_client(AsyncIOMotorClient,
+                                  MotorRepository._async_clients)
+
+    @property
+    def async_collection(self):
+        return self.motor_client[self.connection_string['name']][self.label]
+
+    @classmethod
+    def close(cls):
+        """Close all shared clients, synchronous and Motor ones.
+        """
+        super().close()
+
+        with cls._clients_lock:
+            for client in MotorRepository._async_clients.values():
+                client.close()
+
+            MotorRepository._async_clients.clear()
+
+    async def _bulk_write_async(self, write, entities, indices, raise_errors,
+                                ordered):
+        """Asynchronous counterpart of :MongodbRepository._bulk_write.
+        """
+        if ordered is None:
+            ordered = self.ordered_writes
+
+        try:
+            result = await write(entities, ordered)
+        except BulkWriteError as bulk_error:
+            if raise_errors:
+                raise
+
+            return self._written(bulk_error, entities, indices, ordered)
+
+        return self._written(None, entities, indices, ordered, result)
+
+    async def _find_async(self, query=None, skip=0, limit=None, fields=None,
+                          after=None, before=None):
+        query, options = self._seek(query, skip, limit, fields, after, before)
+
+        entities = await self.async_collection.find(query, **options) \
+            .to_list(None)
+
+        return self._entities(entities,
+                              descending=after is None and before is not None)
+
+    async def all(self, skip=0, limit=None, fields=None, after=None,
+                  before=None):
+        return await self._find_async(skip=skip, limit=limit, fields=fields,
+                                      after=after, before=before)
+
+    async def find(self, identities):
+        identities = list(identities)
+
+        entities = await self.async_collection.find(
+                {'_id': {'$in': [self.object_id(i) for i in identities]}}) \
+            .to_list(None)
+
+        return self._found(identities, entities)
+
+    async def where(self, skip=0, limit=None, fields=None, after=None,
+                    before=None, **query):
+        return await self._find_async(query, skip=skip, limit=limit,
+                                      fields=fields, after=after,
+                                      before=before)
+
+    async def count(self, **query):
+        return await self.async_collection.count_documents(query)
+
+    async def stream(self, chunk_size=None, fields=None, skip=0, limit=None,
+                     **query):
+        chunk_size = chunk_size or self.batch_size
+        query, options = self._seek(query, skip, limit, fields)
+        chunk, position = [], 0
+
+        async for document in self.async_collection.find(
+                query, batch_size=chunk_size, **options):
+            chunk.append(document)
+
+            if len(chunk) == chunk_size:
+                yield self.to_dict_of_dicts(
+                        chunk, range(position, position + len(chunk)))
+                chunk, position = [], position + len(chunk)
+
+        if chunk:
+            yield self.to_dict_of_dicts(
+                    chunk, range(position, position + len(chunk)))
+
+    async def create(self, entities, raise_errors=False, ordered=None):
+        entities, indices = self.from_dict_of_dicts(entities)
+
+        written, failed, _ = await self._bulk_write_async(
+                lambda e, o: self.async_collection.insert_many(e, ordered=o),
+                entities, indices, raise_errors, ordered)
+
+        self._identify_created(entities, written)
+
+        return self._select(entities, indices, written), failed
+
+    async def update(self, entities, raise_errors=False, ordered=None):
+        entities, indices = self.from_dict_of_dicts(entities)
+        operations = self._updates(entities)
+
+        written, failed, _ = await self._bulk_write_async(
+                lambda _, o: self.async_collection.bulk_write(operations,
+                                                              ordered=o),
+                entities, indices, raise_errors, ordered)
+
+        if not written:
+            return {}, failed
+
+        documents = await self.async_collection.find(
+                self._written_filter(entities, written)).to_list(None)
+        written = self._not_found(entities, indices, written, failed,
+                                  [d['_id'] for d in documents], raise_errors)
+
+        return self._stored(entities, indices, written, documents), failed
+
+    async def upsert(self, entities, key=None, raise_errors=False,
+                     ordered=None):
+        entities, indices = self.from_dict_of_dicts(entities)
+        operations = self._updates(entities, key, upsert=True)
+
+        written, failed, summary = await self._bulk_write_async(
+                lambda _, o: self.async_collection.bulk_write(operations,
+                                                              ordered=o),
+                entities, indices, raise_errors, ordered)
+
+        if not written:
+            return {}, failed
+
+        unidentified = self._identify_upserted(entities, written, summary)
+
+        documents = await self.async_collection.find(self._written_filter(
+                entities, written, key, unidentified)).to_list(None)
+
+        if unidentified:
+            # Documents matched by a unique field are identified at once.
+            self._identify_matched(entities, unidentified, key, documents)
+
+        return self._stored(entities, indices, written, documents), failed
+
+    async def delete(self, entities, raise_errors=False, ordered=None):
+        entities, indices = self.from_dict_of_dicts(entities)
+        failed = {}
+
+        found = await self.async_collection.distinct(
+                '_id', self._identified(entities))
+        entities, indices = self._existing(entities, indices, failed, found,
+                                           raise_errors)
+
+        if not entities:
+            return {}, failed
+
+        operations = self._deletions(entities)
+
+        written, write_failed, _ = await self._bulk_write_async(
+                lambda _, o: self.async_collection.bulk_write(operations,
+                                                              ordered=o),
+                entities, indices, raise_errors, ordered)
+        failed.update(write_failed)
+
+        return self._select(entities, indices, written), failed
+
+    async def delete_where(self, chunk_size=None, returning=False, **query):
+        if not returning:
+            result = await self.async_collection.delete_many(query)
+            return result.deleted_count, None, {}
+
+        chunk_size = chunk_size or self.batch_size
+        count, deleted = 0, []
+
+        while True:
+            documents = await self.async_collection.find(
+                    query, limit=chunk_size).to_list(None)
+
+            if documents:
+                result = await self.async_collection.delete_many(
+                        self._chunk(documents))
+                count += result.deleted_count
+                deleted += documents
+
+            if len(documents) < chunk_size:
+                break
+
+        return count, self.to_dict_of_dicts(deleted), {}
+
+
+class MotorEntityRepository(MotorRepository, mongodb.MongodbEntityRepository):
+    pass
+
+
+class MotorRelationshipRepository(MotorRepository,
+                                  mongodb.MongodbRelationshipRepository):
+    async def match(self, origin=None, target=None, skip=0, limit=None,
+                    fields=None):
+        query = {}
+
+        if origin is not None:
+            query['_origin'] = origin
+        if target is not None:
+            query['_target'] = target
+
+        return await self.where(skip=skip, limit=limit, fields=fields,
+                                **query)
@@ -1 +1,2 @@
 from .base import Resource, SchematicResource, EntityResource, RelationshipResource
+from .base import AsyncSchematicResource, AsyncEntityResource, AsyncRelationshipResource
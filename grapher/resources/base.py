@@ -1,4 +1,8 @@
-from flask import views, jsonify
+import functools
+import hashlib
+
+from flask import views, json, jsonify, stream_with_context, Response
+from flask_restful import request
 from .. import paginators
 from .. import serializers, parsers, commons, settings, errors
 from ..guardian import Guardian
@@ -105,10 +109,42 @@ class Resource(views.MethodView):
 
 
 class SchematicResource(Resource):
+    # Media type of collections streamed as newline-delimited JSON.
+    stream_mimetype = 'application/x-ndjson'
+
+    # Flags if bulk writes stop at the first failure. If None, the
+    # repository's default is used. Users may override it per request.
+    ordered_writes = None
+
+    # Cache-Control header of collection reads. If None, it is not sent.
+    cache_control = settings.effective.CACHE_CONTROL
+
+    # Flags if reads are tagged and answered with 304 Not Modified. Tags
+    # are only valid while the schema is written by a single process.
+    etags = settings.effective.ETAGS
+
+    # Flags if deletes respond with the entities deleted, besides their
+    # count. Users may override it per request.
+    returns_deleted = False
+
+    # Methods served by the route of single entities, /<end-point>/<identity>.
+    item_methods = ('GET', 'HEAD', 'PUT', 'PATCH', 'DELETE')
+
+    # Field on which PUT upserts entries: the identity or a unique field.
+    # Entries that match no entity are then created. If None, they fail.
+    upsert_on = None
+
     def __init__(self, schema):
         self.schema = schema
         self.serializer = serializers.DynamicSerializer(schema.model)
 
+        if self.upsert_on is not None and \
+                self.upsert_on != schema.Meta.identity and \
+                not schema.model.get(self.upsert_on, {}).get('unique'):
+            raise ValueError('Cannot upsert %s on %s, which is neither its '
+                             'identity nor unique.'
+                             % (self.real_name(), self.upsert_on))
+
     @property
     def manager(self):
         return self.schema.manager
@@ -122,83 +158,376 @@ class SchematicResource(Resource):
 
         return description
 
-    def get(self):
+    @staticmethod
+    def _flag(name, default):
+        value = request.args.get(name)
+
+        if value in ('1', 'true'):
+            return True
+        if value in ('0', 'false'):
+            return False
+
+        return default
+
+    def ordered(self):
+        """Check if the entries in the request must be written in order.
+
+        Usage:
+            curl -X POST localhost/user?ordered=false -d '[...]'
+        """
+        return self._flag('ordered', self.ordered_writes)
+
+    def returning(self):
+        """Check if the entities deleted must be sent in the response.
+
+        Usage:
+            curl -X DELETE 'localhost/user?query={"age":18}&returning=true'
+        """
+        return self._flag('returning', self.returns_deleted)
+
+    def streams(self):
+        """Check if the collection requested must be streamed, an entity
+        per line, instead of sent as a single JSON document.
+
+        Usage:
+            curl localhost/user?stream=1
+            curl -H 'Accept: application/x-ndjson' localhost/user
+        """
+        return self._flag('stream', False) or \
+            request.accept_mimetypes.best_match(
+                    ('application/json', self.stream_mimetype)) == \
+            self.stream_mimetype
+
+    def stream(self, query, fields):
+        """Stream the entities that match :query, reading, projecting and
+        encoding a chunk at a time.
+        """
+        chunks = self.manager.stream(fields=fields, **query)
+
+        return Response(stream_with_context(self._lines(chunks, fields)),
+                        mimetype=self.stream_mimetype)
+
+    def _lines(self, chunks, fields):
+        for chunk in chunks:
+            yield self._encode(chunk, fields)
+
+    def _encode(self, chunk, fields):
+        chunk, _ = self.serializer.project(chunk, fields)
+
+        return ''.join(json.dumps(e) + '\n' for e in chunk.values())
+
+    def identities(self, identity=None):
+        """Retrieve the identities requested, either by the route of a
+        single entity or by the `ids` argument.
+
+        Usage:
+            curl localhost/user/10
+            curl localhost/user?ids=10,11,12
+
+        :return: :list of identities, or None if no entity was identified.
+        """
+        if identity is not None:
+            identities = [identity]
+        elif request.args.get('ids') is not None:
+            identities = [i for i in request.args.get('ids').split(',') if i]
+        else:
+            return None
+
+        return [self.parse_identity(i) for i in identities]
+
+    def parse_identity(self, identity):
+        """Convert an :identity sent in the URL into its model's type.
+        """
+        rules = self.schema.model.get(self.schema.Meta.identity, {})
+
+        if rules.get('type') == 'integer':
+            try:
+                return int(identity)
+            except ValueError:
+                raise errors.BadRequestError(('INVALID_IDENTITY', (identity,)))
+
+        return identity
+
+    def request_entries(self, identity=None):
+        """Parse the entries in the request, which are identified by
+        :identity, when sent to the route of a single entity.
+        """
+        entries = parsers.DataParser.parse_or_raise()
+
+        if identity is None:
+            return entries
+
+        if len(entries) != 1:
+            raise errors.BadRequestError('SINGLE_ENTRY_EXPECTED')
+
+        entries[0][self.schema.Meta.identity] = self.parse_identity(identity)
+
+        return entries
+
+    def ingests(self):
+        """Check if the body must be ingested as it is read, a chunk of
+        entries at a time.
+
+        Usage:
+            curl -X POST localhost/user?stream=1 --data-binary @users.json
+        """
+        threshold = settings.effective.STREAMING_INGEST['threshold']
+
+        return request.mimetype == parsers.DataParser.stream_mimetype or \
+            self._flag('stream', False) or \
+            bool(threshold) and (request.content_length or 0) > threshold
+
+    def ingestion(self):
+        options = settings.effective.STREAMING_INGEST
+        ordered = self.ordered()
+
+        if ordered is None:
+            ordered = self.manager.repository.ordered_writes
+
+        return _Ingestion(self.serializer, options['chunk_size'],
+                          options['details'], ordered)
+
+    def etag(self, query, fields):
+        """Build the entity tag of a collection read from the schema's
+        version and the normalized :query and :fields.
+
+        :return: :str, or None if reads are not tagged.
+        """
+        if not self.etags:
+            return None
+
+        key = parsers.QueryParser.normalize(
+                query, fields=fields, total=self.paginator.requests_total())
+
+        return hashlib.sha1(('%s:%s' % (self.manager.version_tag, key))
+                            .encode('utf-8')).hexdigest()
+
+    def cache_headers(self, etag):
+        headers = {}
+
+        if etag is not None:
+            headers['ETag'] = 'W/"%s"' % etag
+
+        if self.cache_control is not None:
+            headers['Cache-Control'] = self.cache_control
+
+        return headers
+
+    def not_modified(self, etag):
+        """Build a 304 response if the client already holds the
+        representation tagged :etag, or None otherwise.
+        """
+        if etag is not None and request.if_none_match.contains_weak(etag):
+            return '', 304, self.cache_headers(etag)
+
+        return None
+
+    def get(self, identity=None):
         try:
             Guardian.check_permissions(self)
 
+            fields = self.serializer.projected_fields
+            identities = self.identities(identity)
+
+            if identities is not None:
+                # Entities are found by identity, without parsing a query
+                # or paginating.
+                etag = self.etag({'ids': identities}, fields)
+
+                return self.not_modified(etag) or self._found(
+                        identities, self.manager.find(identities), fields,
+                        etag, single=identity is not None)
+
             query = parsers.QueryParser.parse()
-            entries = self.manager.query_or_all(**query)
 
-            entries, page = self.paginator.paginate(entries)
-            entries, fields = self.serializer.project(entries)
+            if self.streams():
+                return self.stream(query, fields)
+
+            etag = self.seek(query, fields)
+            not_modified = self.not_modified(etag)
 
-            return self.response(entries, fields=fields, page=page, wrap=True)
+            if not_modified:
+                return not_modified
+
+            entries = self.manager.query_or_all(fields=fields, **query)
+
+            total = self.manager.count(query['query']) \
+                if self.paginator.requests_total() else None
+
+            return self._page(entries, total, fields, etag)
 
         except errors.GrapherError as e:
             return self.response(status=e.status_code,
                                  errors=e.as_api_response())
 
+    def seek(self, query, fields):
+        """Replace the skip offset of a collection read's :query by the
+        cursor sent, if any.
+
+        :return: the entity tag of the page read.
+        """
+        cursor = self.paginator.cursor()
+
+        if cursor:
+            # Cursors replace skip offsets.
+            query.update(cursor, skip=0)
+
+        return self.etag(query, fields)
+
+    def _page(self, entries, total, fields, etag):
+        entries, page = self.paginator.paginate(
+                entries, total=total, identity=self.schema.Meta.identity)
+        entries, fields = self.serializer.project(entries, fields)
+
+        return self.response(entries, fields=fields, page=page,
+                             wrap=True) + (self.cache_headers(etag),)
+
+    def _found(self, identities, entries, fields, etag, single=False):
+        """Build the response of the :entries found by their :identities.
+
+        :param single: flag if a single entity was requested, which is
+            then sent on its own or reported as not found.
+        """
+        if single and not entries:
+            raise errors.NotFoundError(('NOT_FOUND', (identities[0],)))
+
+        entries, fields = self.serializer.project(entries, fields)
+        meta = {'fields': fields}
+
+        if single:
+            entries = entries[0]
+        else:
+            missing = [identity for i, identity in enumerate(identities)
+                       if i not in entries]
+
+            if missing:
+                meta['missing'] = missing
+
+        return self.response(entries, wrap=True, **meta) + \
+            (self.cache_headers(etag),)
+
     def post(self):
         try:
             Guardian.check_permissions(self)
 
+            if self.ingests():
+                return self.ingest()
+
             entries = parsers.DataParser.parse_or_raise()
             entries, rejected = self.serializer.validate(entries)
 
-            entries, failed = self.manager.create(entries) if entries \
-                else ({}, {})
-
-            entries, fields = self.serializer.project(entries)
-
-            status = 207 if entries and (rejected or failed) \
-                else 200 if entries else 400
+            entries, failed = self.manager.create(
+                    entries, ordered=self.ordered()) if entries else ({}, {})
 
-            return self.response({
-                'created': entries,
-                'rejected': rejected,
-                'failed': failed
-            }, status=status, fields=fields)
+            return self._created(entries, rejected, failed)
 
         except errors.GrapherError as e:
             return self.response(status=e.status_code,
                                  errors=e.as_api_response())
 
-    def put(self):
+    def _created(self, entries, rejected, failed):
+        entries, fields = self.serializer.project(entries)
+
+        status = 207 if entries and (rejected or failed) \
+            else 200 if entries else 400
+
+        return self.response({
+            'created': entries,
+            'rejected': rejected,
+            'failed': failed
+        }, status=status, fields=fields)
+
+    def ingest(self):
+        """Create the entries in the body a chunk at a time, as they are
+        parsed, holding no more than a chunk in memory.
+        """
+        ingestion = self.ingestion()
+
+        for entries in ingestion.chunks(parsers.DataParser.stream()):
+            ingestion.written(*self.manager.create(
+                    entries, ordered=ingestion.ordered))
+
+        return self._ingested(ingestion)
+
+    def _ingested(self, ingestion):
+        content, status, meta = ingestion.result()
+
+        return self.response(content, status=status, **meta)
+
+    def put(self, identity=None):
         try:
             Guardian.check_permissions(self)
 
-            entries = parsers.DataParser.parse_or_raise()
-            entries, unidentified = self.manager.fetch(entries)
+            entries = self.request_entries(identity)
+            entries, unidentified = self.manager.identify(entries,
+                                                          key=self.upsert_on)
 
-            return self._update(entries, unidentified)
+            return self._update(entries, unidentified,
+                                upsert=self.upsert_on is not None)
 
         except errors.GrapherError as e:
             return self.response(status=e.status_code,
                                  errors=e.as_api_response())
 
-    def patch(self):
+    def patch(self, identity=None):
         try:
             Guardian.check_permissions(self)
 
-            request_entries = parsers.DataParser.parse_or_raise()
-            database_entries, unidentified = self.manager.fetch(request_entries)
+            request_entries = self.request_entries(identity)
 
-            # Patches the request data onto the database data.
-            for i, entry in database_entries.items():
-                entry.update(request_entries[i])
+            if self.serializer.validates_incrementally:
+                # Only the submitted fields are validated and written, so
+                # the entities are not fetched beforehand.
+                entries, unidentified = self.manager.identify(request_entries)
 
-            del request_entries
+                return self._update(entries, unidentified, partial=True)
+
+            database_entries, unidentified = self.manager.fetch(request_entries)
 
-            return self._update(database_entries, unidentified)
+            return self._update(
+                    self._patched(database_entries, request_entries),
+                    unidentified)
 
         except errors.GrapherError as e:
             return self.response(status=e.status_code,
                                  errors=e.as_api_response())
 
-    def _update(self, entries, unidentified=None):
-        entries, rejected = self.serializer.validate(entries)
+    @staticmethod
+    def _patched(database_entries, request_entries):
+        """Patch the :request_entries onto the :database_entries.
+        """
+        for i, entry in database_entries.items():
+            entry.update(request_entries[i])
+
+        return database_entries
+
+    def _update(self, entries, unidentified=None, partial=False,
+                upsert=False):
+        """Validate and update :entries in a single batched write.
+
+        :param partial: flag if :entries only hold the fields to update,
+            which are validated on their own and written over the ones
+            stored.
+        :param upsert: flag if :entries are matched on :upsert_on, creating
+            the ones that do not exist.
+        """
+        entries, rejected = self.serializer.validate(entries, update=partial)
+
+        entries, failed = self._writer(upsert)(
+                entries, ordered=self.ordered()) if entries else ({}, {})
+
+        return self._updated(entries, rejected, failed, unidentified)
+
+    def _writer(self, upsert=False):
+        """Choose the manager's method that writes the entries of a PUT
+        or PATCH.
+        """
+        if upsert:
+            return functools.partial(self.manager.upsert, key=self.upsert_on)
+
+        return self.manager.update
 
-        entries, failed = self.manager.update(entries) if entries else ({}, {})
+    def _updated(self, entries, rejected, failed, unidentified):
         entries, fields = self.serializer.project(entries)
 
         status = 207 if entries and (rejected or failed or unidentified) \
@@ -211,27 +540,153 @@ class SchematicResource(Resource):
             'unidentified': unidentified
         }, status=status, fields=fields)
 
-    def delete(self):
+    def delete(self, identity=None):
         try:
             Guardian.check_permissions(self)
 
-            query = parsers.QueryParser.parse_or_raise()
-            entries = self.manager.query(**query)
+            entries, query = self.deletion(identity)
+
+            if entries is None and not self.deletes_page(query):
+                # The whole query is deleted by the database.
+                return self._deleted(*self.manager.delete_where(
+                        query['query'], returning=self.returning()))
 
-            entries, failed = self.manager.delete(entries) \
-                if entries \
-                else ({}, {})
-            entries, fields = self.serializer.project(entries)
+            if entries is None:
+                # Only a page of the entities matched is deleted.
+                entries = self.manager.query(**query)
 
-            return self.response({
-                'deleted': entries,
-                'failed': failed
-            }, fields=fields)
+            entries, failed = self.manager.delete(
+                    entries, ordered=self.ordered()) if entries else ({}, {})
+
+            return self._deleted(len(entries), entries, failed)
 
         except errors.GrapherError as e:
             return self.response(status=e.status_code,
                                  errors=e.as_api_response())
 
+    def deletion(self, identity=None):
+        """Parse what is deleted by a request.
+
+        :return: :pair (entries, query). If entries is None, the entities
+            that match :query are deleted. Otherwise, :query is None and
+            entries reference the entities deleted by identity.
+        """
+        identities = self.identities(identity)
+
+        if identities is not None:
+            return self.identified(identities), None
+
+        return None, parsers.QueryParser.parse_or_raise()
+
+    @staticmethod
+    def deletes_page(query):
+        """Check if only a page of the entities that match :query is
+        deleted, which must then be read beforehand.
+        """
+        return bool(query['skip']) or query['limit'] is not None
+
+    def identified(self, identities):
+        """Build the entries that reference the entities :identities.
+        """
+        return {i: {self.schema.Meta.identity: identity}
+                for i, identity in enumerate(identities)}
+
+    def _deleted(self, count, entries, failed):
+        if entries is None or not self.returning():
+            return self.response({'failed': failed}, count=count)
+
+        entries, fields = self.serializer.project(entries)
+
+        return self.response({
+            'deleted': entries,
+            'failed': failed
+        }, fields=fields, count=count)
+
+
+class _Ingestion:
+    """Tally of the entries created from a body ingested in chunks.
+
+    Entries are reported by their positions in the body while no more
+    than :details were ingested. Larger loads are only counted. If the
+    body turns out to be malformed, the entries parsed before the error
+    are still ingested and the error is reported along with them.
+    """
+
+    def __init__(self, serializer, chunk_size, details, ordered):
+        self.serializer = serializer
+        self.chunk_size = chunk_size
+        self.details = details
+        self.ordered = ordered
+
+        self.counts = {'created': 0, 'rejected': 0, 'failed': 0}
+        self.reports = {'created': {}, 'rejected': {}, 'failed': {}}
+        self.fields = None
+        self.stopped = False
+        self.error = None
+
+    def chunks(self, entries):
+        """Validate :entries a chunk at a time, yielding the ones accepted.
+        """
+        for chunk in commons.CollectionHelper.chunks(
+                enumerate(self._parsed(entries)), self.chunk_size):
+            accepted, rejected = self.serializer.validate(dict(chunk))
+            self.add('rejected', rejected)
+
+            if self.stopped:
+                self.add('failed', {i: 'Not attempted, as a previous entry '
+                                       'failed.' for i in accepted})
+            elif accepted:
+                yield accepted
+
+    def _parsed(self, entries):
+        try:
+            yield from entries
+        except errors.GrapherError as e:
+            self.error = e
+
+    def written(self, created, failed):
+        created, self.fields = self.serializer.project(created)
+
+        self.add('created', created)
+        self.add('failed', failed)
+
+        # Ordered writes stop at the first failure.
+        self.stopped = self.stopped or self.ordered and bool(failed)
+
+    def add(self, outcome, entries):
+        self.counts[outcome] += len(entries)
+
+        if self.reports is not None:
+            if sum(self.counts.values()) > self.details:
+                self.reports = None
+            else:
+                self.reports[outcome].update(entries)
+
+    def result(self):
+        """Build the content, status and metadata of the response.
+        """
+        if self.error is None and not any(self.counts.values()):
+            raise errors.BadRequestError('DATA_CANNOT_BE_EMPTY')
+
+        created = self.counts['created']
+        meta = {'counts': self.counts}
+
+        if self.error is not None:
+            status = 207 if created else self.error.status_code
+            meta['errors'] = self.error.as_api_response()
+        else:
+            status = 207 if created and (self.counts['rejected'] or
+                                         self.counts['failed']) \
+                else 200 if created else 400
+
+        if self.reports is None:
+            return None, status, meta
+
+        if self.fields is not None:
+            meta['fields'] = self.fields
+
+        return self.reports, status, meta
+
 
 class EntityResource(SchematicResource):
     pluralize = settings.effective.PLURALIZE_ENTITIES_NAMES
@@ -273,3 +728,162 @@ class RelationshipResource(SchematicResource):
                                'cardinality': self.schema.cardinality})
 
         return description
+
+
+class AsyncSchematicResource(SchematicResource):
+    """Schematic resource served by `async def` handlers.
+
+    Requires a manager that implements :AsyncManager. Handlers are awaited
+    directly when served by :Grapher.asgi.
+    """
+
+    async def get(self, identity=None):
+        try:
+            Guardian.check_permissions(self)
+
+            fields = self.serializer.projected_fields
+            identities = self.identities(identity)
+
+            if identities is not None:
+                etag = self.etag({'ids': identities}, fields)
+
+                return self.not_modified(etag) or self._found(
+                        identities, await self.manager.find(identities),
+                        fields, etag, single=identity is not None)
+
+            query = parsers.QueryParser.parse()
+
+            if self.streams():
+                return self.stream(query, fields)
+
+            etag = self.seek(query, fields)
+            not_modified = self.not_modified(etag)
+
+            if not_modified:
+                return not_modified
+
+            entries = await self.manager.query_or_all(fields=fields, **query)
+
+            total = await self.manager.count(query['query']) \
+                if self.paginator.requests_total() else None
+
+            return self._page(entries, total, fields, etag)
+
+        except errors.GrapherError as e:
+            return self.response(status=e.status_code,
+                                 errors=e.as_api_response())
+
+    def stream(self, query, fields):
+        # Served by Grapher.asgi, which iterates asynchronous bodies.
+        chunks = self.manager.stream(fields=fields, **query)
+
+        return Response(self._lines(chunks, fields),
+                        mimetype=self.stream_mimetype)
+
+    async def _lines(self, chunks, fields):
+        async for chunk in chunks:
+            yield self._encode(chunk, fields)
+
+    async def post(self):
+        try:
+            Guardian.check_permissions(self)
+
+            if self.ingests():
+                return await self.ingest()
+
+            entries = parsers.DataParser.parse_or_raise()
+            entries, rejected = self.serializer.validate(entries)
+
+            entries, failed = await self.manager.create(
+                    entries, ordered=self.ordered()) if entries else ({}, {})
+
+            return self._created(entries, rejected, failed)
+
+        except errors.GrapherError as e:
+            return self.response(status=e.status_code,
+                                 errors=e.as_api_response())
+
+    async def ingest(self):
+        ingestion = self.ingestion()
+
+        for entries in ingestion.chunks(parsers.DataParser.stream()):
+            ingestion.written(*await self.manager.create(
+                    entries, ordered=ingestion.ordered))
+
+        return self._ingested(ingestion)
+
+    async def put(self, identity=None):
+        try:
+            Guardian.check_permissions(self)
+
+            entries = self.request_entries(identity)
+            entries, unidentified = self.manager.identify(entries,
+                                                          key=self.upsert_on)
+
+            return await self._update(entries, unidentified,
+                                      upsert=self.upsert_on is not None)
+
+        except errors.GrapherError as e:
+            return self.response(status=e.status_code,
+                                 errors=e.as_api_response())
+
+    async def patch(self, identity=None):
+        try:
+            Guardian.check_permissions(self)
+
+            request_entries = self.request_entries(identity)
+
+            if self.serializer.validates_incrementally:
+                entries, unidentified = self.manager.identify(request_entries)
+
+                return await self._update(entries, unidentified, partial=True)
+
+            database_entries, unidentified = await self.manager.fetch(
+                    request_entries)
+
+            return await self._update(
+                    self._patched(database_entries, request_entries),
+                    unidentified)
+
+        except errors.GrapherError as e:
+            return self.response(status=e.status_code,
+                                 errors=e.as_api_response())
+
+    async def _update(self, entries, unidentified=None, partial=False,
+                      upsert=False):
+        entries, rejected = self.serializer.validate(entries, update=partial)
+
+        entries, failed = await self._writer(upsert)(
+                entries, ordered=self.ordered()) if entries else ({}, {})
+
+        return self._updated(entries, rejected, failed, unidentified)
+
+    async def delete(self, identity=None):
+        try:
+            Guardian.check_permissions(self)
+
+            entries, query = self.deletion(identity)
+
+            if entries is None and not self.deletes_page(query):
+                return self._deleted(*await self.manager.delete_where(
+                        query['query'], returning=self.returning()))
+
+            if entries is None:
+                entries = await self.manager.query(**query)
+
+            entries, failed = await self.manager.delete(
+                    entries, ordered=self.ordered()) if entries else ({}, {})
+
+            return self._deleted(len(entries), entries, failed)
+
+        except errors.GrapherError as e:
+            return self.response(status=e.status_code,
+                                 errors=e.as_api_response())
+
+
+class AsyncEntityResource(AsyncSchematicResource, EntityResource):
+    pass
+
+
+class AsyncRelationshipResource(AsyncSchematicResource, RelationshipResource):
+    pass
@@ -1,6 +1,56 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 from flask_restful import request
 
-from . import validators, errors
+from . import commons, validators, errors, settings
+
+
+def validator_for(model, compiled=None):
+    """Build the validator of a :model, as configured in the settings.
+
+    :param compiled: flag if the validator is compiled. If None, the
+        setting COMPILED_VALIDATION is followed.
+    """
+    if compiled is None:
+        compiled = settings.effective.COMPILED_VALIDATION
+
+    if compiled:
+        return validators.CompiledValidator.compile(model)
+
+    return validators.GrapherValidator(model)
+
+
+# Validators built by the pool processes, by the models they validate.
+_pool_validators = {}
+
+
+def _validate_chunk(model, chunk, update=False, compiled=None):
+    """Validate a :chunk of (index, entry) pairs against a :model.
+
+    Executed by the processes of the validation pool, which are not forked
+    from the worker, so :compiled carries the worker's setting.
+
+    :return: :pair (accepted, rejected): the list of indices of the entries
+        accepted and the :dict (index)->(errors) of the ones rejected.
+    """
+    key = repr(model), compiled
+    v = _pool_validators.get(key)
+
+    if v is None:
+        v = _pool_validators[key] = validator_for(model, compiled)
+
+    accepted, rejected = [], {}
+
+    for i, entry in chunk:
+        if v.validate(entry, update=update):
+            accepted.append(i)
+        else:
+            rejected[i] = v.errors
+
+    return accepted, rejected
 
 
 class Serializer:
@@ -13,46 +63,129 @@ class Serializer:
     def __init__(self, model):
         self.model = model
 
-    _projected_fields = None
+    _visible_fields = None
 
     @property
-    def projected_fields(self):
+    def visible_fields(self):
         # Scan all fields that are tagged as "visible".
-        self._projected_fields = self._projected_fields or \
-                                 {f for f, d in self.model.items()
-                                  if 'visible' not in d or d['visible']}
-        return self._projected_fields
+        if self._visible_fields is None:
+            self._visible_fields = frozenset(
+                    f for f, d in self.model.items()
+                    if 'visible' not in d or d['visible'])
+        return self._visible_fields
+
+    @property
+    def projected_fields(self):
+        return set(self.visible_fields)
+
+    # Rules that relate a field to others in the same entry.
+    cross_field_rules = {'dependencies', 'excludes'}
+
+    _validates_incrementally = None
+
+    @property
+    def validates_incrementally(self):
+        """Check if entries can be validated by their submitted fields
+        alone, which holds when no field's rules refer to other fields.
+        """
+        if self._validates_incrementally is None:
+            self._validates_incrementally = not any(
+                    self.cross_field_rules & rules.keys()
+                    for rules in self.model.values())
+        return self._validates_incrementally
 
     _validator = None
 
     @property
     def validator(self):
-        self._validator = (self._validator or
-                           validators.GrapherValidator(self.model))
+        if self._validator is None:
+            self._validator = validator_for(self.model)
+
         return self._validator
 
-    def validate(self, entries):
+    # Process pool shared by all serializers of a worker. Its processes are
+    # started by a server process, or spawned where that is not available,
+    # as forking a worker whose threads may hold locks, such as the ones of
+    # the database clients, could leave them deadlocked.
+    pool_context = multiprocessing.get_context(
+            'forkserver'
+            if 'forkserver' in multiprocessing.get_all_start_methods()
+            else 'spawn')
+
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def pool(cls):
+        """Retrieve the validation pool of this process, starting it if
+        it does not exist yet. Pools inherited from a parent process,
+        when workers are forked, are not reused.
+        """
+        with Serializer._pool_lock:
+            if Serializer._pool is None or Serializer._pool_pid != os.getpid():
+                Serializer._pool = ProcessPoolExecutor(
+                        settings.effective.PARALLEL_VALIDATION['processes'],
+                        mp_context=cls.pool_context)
+                Serializer._pool_pid = os.getpid()
+
+            return Serializer._pool
+
+    def validate(self, entries, update=False):
         """Validate entries according to a schema.
 
         :param entries: :dict: containing entries to be validated.
             E.g.: {0: {...}, 1: {...}, 2: {...}}.
+        :param update: flag if entries only hold the fields updated, in
+            which case the required fields missing are not reported.
 
         :return: :tuple: of :dict:, containing the entries that were
         accepted and rejected, respectively. E.g.:
             {0: {...}, 2: {...}}, {1: {...}}
         """
+        options = settings.effective.PARALLEL_VALIDATION
+
+        if options['threshold'] and len(entries) > options['threshold']:
+            return self.validate_in_parallel(entries, options['chunk_size'],
+                                             update)
+
         accepted, rejected = {}, {}
         v = self.validator
 
         for i, entry in entries.items():
-            if v.validate(entry):
+            if v.validate(entry, update=update):
                 accepted[i] = entry
             else:
                 rejected[i] = v.errors
 
         return accepted, rejected
 
-    def project(self, entries):
+    def validate_in_parallel(self, entries, chunk_size=None, update=False):
+        """Validate entries in chunks of :chunk_size, spread across the
+        validation pool.
+
+        Only the indices of the accepted entries are sent back by the pool,
+        hence the entries accepted are the very ones passed.
+
+        :return: :tuple: of :dict:, just like :validate.
+        """
+        compiled = settings.effective.COMPILED_VALIDATION
+        futures = [self.pool().submit(_validate_chunk, self.model, chunk,
+                                      update, compiled)
+                   for chunk in commons.CollectionHelper.chunks(
+                    entries.items(), chunk_size)]
+
+        accepted, rejected = {}, {}
+
+        for future in futures:
+            indices, failures = future.result()
+
+            accepted.update((i, entries[i]) for i in indices)
+            rejected.update(failures)
+
+        return accepted, rejected
+
+    def project(self, entries, fields=None):
         """For each entry in entries, remove all (key, value) pairs that
         are not in the set of projected fields, which are likely private
         or non-requested fields.
@@ -63,14 +196,19 @@ class Serializer:
 
         :param entries: :dict: containing entries to be projected.
         E.g.: {0: {...}, 1: {...}, 2: {...}}.
+        :param fields: the set of fields projected. If None,
+        :self.projected_fields is used.
 
         :return: :entries filtered.
         """
+        if fields is None:
+            fields = self.projected_fields
+
         for i, entry in entries.items():
-            for field in entry.keys() - self.projected_fields:
+            for field in entry.keys() - fields:
                 del entry[field]
 
-        return entries, list(self.projected_fields)
+        return entries, list(fields)
 
 
 class DynamicSerializer(Serializer):
@@ -79,30 +217,32 @@ class DynamicSerializer(Serializer):
         """Overrides BaseSerializer :project_fields property to consider fields
         requested by the user.
 
+        The projection is computed for the current request, as serializers
+        are shared by all requests of a resource.
+
         Usage:
             curl .../resource?fields=[field][,field]*
             curl localhost/user?fields=id,name
         """
-        if self._projected_fields is None:
-            fields = super().projected_fields
-
-            if request.args.get('fields') is not None:
-                # The user has requested a field projection onto the result.
-                # Only get not empty fields, fixing requests errors such
-                # as "fields=,id,name" or "fields=id,name,"
-                request_fields = request.args.get('fields').split(',')
-                request_fields = {f for f in request_fields if f}
-
-                invalid_fields = request_fields - fields
-                if invalid_fields:
-                    # End-users have tried to project invalid fields, such
-                    # as nonexistent fields or fields marked as not visible.
-                    raise errors.BadRequestError(
-                            ('INVALID_FIELDS', invalid_fields,
-                             ('%s?fields=%s' % (
-                             request.base_url, ','.join(fields)),))
-                    )
-
-                self._projected_fields = fields & request_fields
-
-        return self._projected_fields
+        fields = super().projected_fields
+
+        if request.args.get('fields') is not None:
+            # The user has requested a field projection onto the result.
+            # Only get not empty fields, fixing requests errors such
+            # as "fields=,id,name" or "fields=id,name,"
+            request_fields = request.args.get('fields').split(',')
+            request_fields = {f for f in request_fields if f}
+
+            invalid_fields = request_fields - fields
+            if invalid_fields:
+                # End-users have tried to project invalid fields, such
+                # as nonexistent fields or fields marked as not visible.
+                raise errors.BadRequestError(
+                        ('INVALID_FIELDS', invalid_fields,
+                         ('%s?fields=%s' % (
+                         request.base_url, ','.join(fields)),))
+                )
+
+            fields &= request_fields
+
+        return fields
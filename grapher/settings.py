@@ -19,6 +19,9 @@ class Settings:
     # pluralization will NOT happen if the user has set :EntityResource.name.
     PLURALIZE_ENTITIES_NAMES = True
 
+    # Graph schemas can be served through the Bolt protocol by setting the
+    # repositories to 'grapher.repositories.bolt.BoltEntityRepository' and
+    # 'grapher.repositories.bolt.BoltRelationshipRepository'.
     DEFAULT_COMPONENTS = {
         'entity': {
             'repositories': 'grapher.repositories.graph.GraphEntityRepository',
@@ -33,19 +36,102 @@ class Settings:
         },
     }
 
+    # Components served by `async def` handlers, through Grapher.asgi.
+    # Set DEFAULT_COMPONENTS = ASYNC_COMPONENTS to use them by default.
+    ASYNC_COMPONENTS = {
+        'entity': {
+            'repositories': 'grapher.repositories.bolt.'
+                            'AsyncBoltEntityRepository',
+            'managers': 'grapher.managers.AsyncEntityManager',
+            'resources': 'grapher.resources.AsyncEntityResource',
+        },
+        'relationship': {
+            'repositories': 'grapher.repositories.bolt.'
+                            'AsyncBoltRelationshipRepository',
+            'managers': 'grapher.managers.AsyncRelationshipManager',
+            'resources': 'grapher.resources.AsyncRelationshipResource',
+        },
+    }
+
+    # Request bodies received through Grapher.asgi are read whole before the
+    # request is dispatched, as their parsers read them synchronously. Bodies
+    # larger than this number of bytes are spooled to a temporary file, so
+    # streamed ingestions are not held in memory, but still start only once
+    # the upload has been received.
+    ASGI_SPOOLED_BODY_SIZE = 2 ** 20
+
     DATABASES = {
         'neo4j': {
             'uri': '127.0.0.1:7474/db/data/',
             'username': 'neo4j',
-            'password': 'root'
+            'password': 'root',
+            # Maximum number of entries sent in a single write statement.
+            'batch_size': 1000,
+            # Bolt connections, shared by all schemas.
+            'bolt_uri': 'bolt://127.0.0.1:7687',
+            'max_connection_pool_size': 50,
+            'connection_acquisition_timeout': 60,
+            'max_connection_lifetime': 3600,
         },
         'mongodb': {
             'name': 'default',
             'host': 'localhost',
             'port': 27017,
+            # Client options. A single client, and therefore a single pool,
+            # is shared by all schemas with the same connection options.
+            # Options set to None fall back to the driver's defaults.
+            'maxPoolSize': 100,
+            'minPoolSize': 0,
+            'waitQueueTimeoutMS': None,
+            'maxIdleTimeMS': None,
+            'compressors': None,
         }
     }
 
+    # Seconds for which the total count of unfiltered collections, reported
+    # when requested with ?total=true, is cached by each manager. Writes
+    # through the manager invalidate it. If 0, totals are never cached.
+    TOTAL_COUNT_CACHE_TTL = 0
+
+    # Read-through cache of entities by identity, held by each manager and
+    # used by find and fetch. 'size' is the maximum number of entities
+    # cached (0 disables the cache) and 'ttl' the seconds for which each of
+    # them is kept. Writes through the manager invalidate the entities
+    # written. Schemas are configured by name in 'schemas', e.g.:
+    #   'schemas': {'User': {'size': 10000, 'ttl': 30}}
+    ENTITY_CACHE = {'size': 0, 'ttl': 60, 'schemas': {}}
+
+    # Cache of the results of collection reads (GET), held by each manager
+    # and keyed by the normalized query, skip, limit, cursor and projection.
+    # Every write through the manager bumps the schema's version, which
+    # invalidates all the results cached for it. Options as ENTITY_CACHE.
+    QUERY_CACHE = {'size': 0, 'ttl': 60, 'schemas': {}}
+
+    # Cache-Control header sent with collection reads (GET). Overridden by
+    # :SchematicResource.cache_control. If None, the header is not sent.
+    CACHE_CONTROL = 'no-cache'
+
+    # If True, reads (GET) carry a weak ETag and are answered with 304 Not
+    # Modified when the client already holds them. Tags are built from the
+    # schema's version as seen by each manager, which only counts the writes
+    # made through its own process. Enable them only when the schemas are
+    # served, and written, by a single process. Overridden by
+    # :SchematicResource.etags.
+    ETAGS = False
+
+    # Indexes and unique constraints declared in the schemas' models
+    # (with 'index': True or 'unique': True) are reconciled with their
+    # databases on start-up.
+    INDEXES = {
+        'reconcile': True,
+        # Create indexes and constraints that are missing.
+        'create': True,
+        # Fail the start-up if a declared index is still missing, or if
+        # the indexes cannot be read from the database. Otherwise, both are
+        # only reported as warnings.
+        'required': False,
+    }
+
     AUTH = {
         'database': 'mongodb',
         'grant': {'expires_in_seconds': 100},
@@ -60,6 +146,27 @@ class Settings:
     #   Does not insert any of the entities, if False.
     ATTEMPT_PARTIAL_RECOVERIES = True
 
+    # If True, models are compiled into specialized validation code on
+    # start-up. Models using rules that cannot be compiled are still
+    # validated by Cerberus.
+    COMPILED_VALIDATION = True
+
+    # Batches of more than 'threshold' entries are validated in parallel,
+    # in chunks of 'chunk_size' entries, by a pool of 'processes' processes
+    # (None for one per core). The pool is started once in each worker,
+    # on its first large batch. If 'threshold' is 0, entries are always
+    # validated in-process.
+    PARALLEL_VALIDATION = {'threshold': 0, 'chunk_size': 1000,
+                           'processes': None}
+
+    # POST bodies sent as NDJSON, posted with ?stream=1 or larger than
+    # 'threshold' bytes are parsed as they are read, then validated and
+    # created in chunks of 'chunk_size' entries. Loads of more than
+    # 'details' entries are only reported by their counts. If 'threshold'
+    # is 0, the size of bodies is not considered.
+    STREAMING_INGEST = {'threshold': 16 * 2 ** 20, 'chunk_size': 1000,
+                        'details': 10000}
+
     DOCS = {
         'title': 'Grapher',
         'description': 'Welcome to Grapher!',
@@ -82,10 +189,27 @@ class Settings:
         'INVALID_QUERY': {
             'description': 'The query is invalid: %s.',
         },
+        'INVALID_CURSOR': {
+            'description': 'The cursor %s is invalid.',
+        },
         'MISSING_QUERY': {
             'description': 'This operation requires a query, which was '
                            'not provided.',
         },
+        'INVALID_DATA': {
+            'description': 'The data sent is not valid JSON: %s.',
+        },
+        'INVALID_IDENTITY': {
+            'description': 'The identity %s is invalid.',
+        },
+        'SINGLE_ENTRY_EXPECTED': {
+            'description': 'Requests to a single entity must send exactly '
+                           'one entry.',
+        },
+        'HAS_RELATIONSHIPS': {
+            'description': 'The entity %s was not deleted, as it still has '
+                           'relationships.',
+        },
         'UNIDENTIFIABLE': {
             'description': 'This operation requires all instances to have '
                            'an identity.',
@@ -111,5 +235,7 @@ class Testing(Settings):
     TESTING = True
     BASE_MODULE = 'tests.examples'
 
+    INDEXES = dict(Settings.INDEXES, reconcile=False)
+
 
 effective = Development
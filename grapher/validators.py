@@ -1,6 +1,9 @@
 import abc
 import json
+from collections.abc import Iterable, Mapping, Sequence, Sized
+
 from cerberus import Validator
+from cerberus import errors as cerberus_errors
 
 from . import commons, errors
 
@@ -17,3 +20,214 @@ class GrapherValidator(Validator):
     def _validate_index(self, index, field, value):
         """Add "index" property to schemas.
         """
+
+    def _validate_unique(self, unique, field, value):
+        """Add "unique" property to schemas.
+
+        Uniqueness is enforced by the databases' constraints.
+        """
+
+
+class CompiledValidator:
+    """Validator compiled from a schema model into specialized Python code.
+
+    Validates documents just like :GrapherValidator, producing the same
+    errors, without interpreting the model's rules for every document.
+    Only the rules in :compiled_rules are supported. :compile falls back
+    to :GrapherValidator for models that use any other rule.
+    """
+
+    # Rules which are compiled, besides the ones that are not validated.
+    compiled_rules = {'type', 'required', 'empty', 'nullable', 'minlength',
+                      'maxlength', 'schema'}
+
+    # Rules which only describe the model, without validating documents.
+    descriptive_rules = {'identity', 'visible', 'index', 'unique', 'meta'}
+
+    def __init__(self, model, validate, fallback):
+        self.schema = model
+        self.errors = {}
+
+        self._validate = validate
+        self._fallback = fallback
+
+    def validate(self, document, update=False):
+        """Validate a :document.
+
+        :param update: flag if :document only holds the fields updated,
+            in which case required fields are not checked.
+        """
+        if not isinstance(document, Mapping):
+            # Let Cerberus report malformed documents.
+            return self._fallback.validate(document, update=update)
+
+        self.errors = self._validate(document, update)
+        return not self.errors
+
+    @classmethod
+    def compile(cls, model, validator_class=None):
+        """Compile a :model into a validator.
+
+        :param validator_class: the Cerberus validator used for models
+            which cannot be compiled. Defaults to :GrapherValidator.
+        :return: :CompiledValidator, or an instance of :validator_class.
+        """
+        # Cerberus checks the model itself.
+        fallback = (validator_class or GrapherValidator)(model)
+
+        if not cls.compilable(model):
+            return fallback
+
+        compiler = _Compiler(fallback)
+        validate = compiler.compile_document(model)
+
+        return cls(model, validate, fallback)
+
+    @classmethod
+    def compilable(cls, model, item=False):
+        """Check if all rules in a :model can be compiled.
+
+        :param item: flag if :model is the rules of the items of a list.
+        """
+        for field, rules in ([(None, model)] if item else model.items()):
+            if not isinstance(rules, Mapping) or \
+                    rules.keys() - cls.compiled_rules - cls.descriptive_rules:
+                return False
+
+            types = rules.get('type')
+            types = [types] if isinstance(types, str) else types or []
+
+            if any(t not in GrapherValidator.types_mapping for t in types):
+                return False
+
+            if 'schema' in rules and (rules.get('type') != 'list' or
+                                      not cls.compilable(rules['schema'],
+                                                         item=True)):
+                return False
+
+        return True
+
+
+class _Compiler:
+    """Generate the source of the validation functions of a model.
+    """
+
+    def __init__(self, fallback):
+        self.messages = fallback.error_handler.messages
+        self.namespace = {'Iterable': Iterable, 'Sequence': Sequence,
+                          'Sized': Sized}
+        self.lines = []
+        self.functions = 0
+
+    def message(self, error, constraint=None):
+        return self.messages[error.code].format(constraint=constraint)
+
+    def constant(self, value):
+        name = '_c%i' % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indentation, line):
+        self.lines.append('    ' * indentation + line)
+
+    def compile_document(self, model):
+        checks = {field: self.compile_field(rules)
+                  for field, rules in model.items()}
+        table = {}
+        required = [field for field, rules in model.items()
+                    if rules.get('required') is True]
+
+        self.emit(0, 'def validate(document, update=False):')
+        self.emit(1, 'errors = {}')
+        self.emit(1, 'for field, value in document.items():')
+        self.emit(2, 'check = %s.get(field)' % self.constant(table))
+        self.emit(2, 'if check is None:')
+        self.emit(3, 'errors[field] = [%r]'
+                  % self.message(cerberus_errors.UNKNOWN_FIELD))
+        self.emit(3, 'continue')
+        self.emit(2, 'e = check(value)')
+        self.emit(2, 'if e:')
+        self.emit(3, 'errors[field] = e')
+
+        if required:
+            self.emit(1, 'if not update:')
+
+        for field in required:
+            self.emit(2, 'if %r not in document:' % field)
+            self.emit(3, 'errors[%r] = [%r]' % (
+                field, self.message(cerberus_errors.REQUIRED_FIELD)))
+
+        self.emit(1, 'return errors')
+
+        namespace = self.namespace
+        exec('\n'.join(self.lines), namespace)
+
+        # Fields are dispatched to their functions once all were defined.
+        table.update((f, namespace[c]) for f, c in checks.items())
+
+        return namespace['validate']
+
+    def compile_field(self, rules):
+        """Emit the function that validates the value of a field, returning
+        the list of its errors. Errors are listed in the order of their
+        rules' names, as Cerberus does.
+
+        :return: :str: the name of the function.
+        """
+        item = self.compile_field(rules['schema']) \
+            if 'schema' in rules else None
+
+        name = '_check%i' % self.functions
+        self.functions += 1
+
+        self.emit(0, 'def %s(value):' % name)
+        self.emit(1, 'if value is None:')
+        self.emit(2, 'return %s' % ('None' if rules.get('nullable') else
+                                    '[%r]' % self.message(
+                                        cerberus_errors.NOT_NULLABLE)))
+
+        if rules.get('type'):
+            types = rules['type']
+            definitions = [GrapherValidator.types_mapping[t] for t in (
+                [types] if isinstance(types, str) else types)]
+
+            self.emit(1, 'if not (%s):' % ' or '.join(
+                    '(isinstance(value, %s) and not isinstance(value, %s))'
+                    % (self.constant(d.included_types),
+                       self.constant(d.excluded_types))
+                    for d in definitions))
+            self.emit(2, 'return [%r]' % self.message(
+                    cerberus_errors.BAD_TYPE, types))
+
+        if 'empty' in rules:
+            self.emit(1, 'if isinstance(value, Sized) and len(value) == 0:')
+            self.emit(2, 'return %s' % ('None' if rules['empty'] else
+                                        '[%r]' % self.message(
+                                            cerberus_errors.EMPTY_NOT_ALLOWED)))
+
+        self.emit(1, 'errors = []')
+
+        if 'maxlength' in rules:
+            self.emit(1, 'if isinstance(value, Iterable) and len(value) > %r:'
+                      % rules['maxlength'])
+            self.emit(2, 'errors.append(%r)' % self.message(
+                    cerberus_errors.MAX_LENGTH, rules['maxlength']))
+
+        if 'minlength' in rules:
+            self.emit(1, 'if isinstance(value, Iterable) and len(value) < %r:'
+                      % rules['minlength'])
+            self.emit(2, 'errors.append(%r)' % self.message(
+                    cerberus_errors.MIN_LENGTH, rules['minlength']))
+
+        if item is not None:
+            self.emit(1, 'items = {}')
+            self.emit(1, 'for i, v in enumerate(value):')
+            self.emit(2, 'e = %s(v)' % item)
+            self.emit(2, 'if e:')
+            self.emit(3, 'items[i] = e')
+            self.emit(1, 'if items:')
+            self.emit(2, 'errors.append(items)')
+
+        self.emit(1, 'return errors')
+
+        return name
@@ -6,6 +6,17 @@ requirements = [
     'cerberus',
 ]
 
+# Drivers of the optional repositories, e.g.: pip install grapher[bolt].
+extra_requirements = {
+    # grapher.repositories.bolt, whose asynchronous repositories and index
+    # statements require the 4.4 driver or later.
+    'bolt': ['neo4j>=4.4'],
+    # grapher.repositories.mongodb.
+    'mongodb': ['pymongo'],
+    # grapher.repositories.motor, built upon the pymongo repositories.
+    'motor': ['motor'],
+}
+
 test_requirements = [
     'grapher',
     'requests',
@@ -41,6 +52,7 @@ setup(
     include_package_data=True,
 
     install_requires=requirements,
+    extras_require=extra_requirements,
     tests_require=test_requirements,
     test_suite='tests'
 )
@@ -0,0 +1,148 @@
+import io
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock
+
+from flask import Flask, Response, jsonify, request
+
+from grapher.asgi import ASGIApplication
+
+
+class AsyncResource:
+    async def get(self):
+        return jsonify(args=request.args.get('a')), 201
+
+
+class FailingResource:
+    async def get(self):
+        raise RuntimeError('unexpected')
+
+
+class EchoResource:
+    async def post(self):
+        return request.get_data()
+
+
+class StreamingResource:
+    async def get(self):
+        async def lines():
+            for i in range(3):
+                yield '{"i":%i}\n' % i
+
+        return Response(lines(), mimetype='application/x-ndjson')
+
+
+class ASGIApplicationTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        app = Flask('test')
+        app.add_url_rule('/async', 'async_api', lambda: None)
+        app.add_url_rule('/stream', 'stream_api', lambda: None)
+        app.add_url_rule('/sync', 'sync_api', lambda: 'synchronous')
+        app.add_url_rule('/failing', 'failing_api', lambda: None)
+        app.add_url_rule('/sync-failing', 'sync_failing_api',
+                         lambda: 1 / 0)
+        app.add_url_rule('/echo', 'echo_api', lambda: None,
+                         methods=['POST'])
+
+        grapher = Mock()
+        grapher.app = app
+        grapher.endpoints = {'async_api': AsyncResource(),
+                             'stream_api': StreamingResource(),
+                             'failing_api': FailingResource(),
+                             'echo_api': EchoResource()}
+
+        self.asgi = ASGIApplication(grapher)
+
+    async def _request(self, method, path, query_string=b'', body=b''):
+        sent = []
+        messages = self._messages(body)
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.asgi({'type': 'http', 'method': method, 'path': path,
+                         'query_string': query_string,
+                         'headers': [(b'content-type', b'application/json')]},
+                        receive, send)
+
+        return (sent[0]['status'], dict(sent[0]['headers']),
+                b''.join(m['body'] for m in sent[1:]))
+
+    @staticmethod
+    def _messages(body, size=4):
+        # Split the :body across several http.request messages.
+        chunks = [body[i:i + size] for i in range(0, len(body), size)]
+
+        for i, chunk in enumerate(chunks or [b'']):
+            yield {'type': 'http.request', 'body': chunk,
+                   'more_body': i < len(chunks) - 1}
+
+    async def test_async_handlers_are_awaited(self):
+        status, headers, body = await self._request('GET', '/async',
+                                                    query_string=b'a=1')
+
+        self.assertEqual(status, 201)
+        self.assertEqual(headers[b'content-type'], b'application/json')
+        self.assertIn(b'"args":"1"', body.replace(b' ', b''))
+
+    async def test_asynchronous_bodies_are_streamed(self):
+        status, headers, body = await self._request('GET', '/stream')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-type'], b'application/x-ndjson')
+        self.assertEqual(body, b'{"i":0}\n{"i":1}\n{"i":2}\n')
+
+    async def test_sync_views_are_dispatched_by_flask(self):
+        status, _, body = await self._request('GET', '/sync')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'synchronous')
+
+    async def test_not_found(self):
+        status, _, _ = await self._request('GET', '/missing')
+
+        self.assertEqual(status, 404)
+
+    async def test_bodies_are_received_in_full(self):
+        status, _, body = await self._request('POST', '/echo',
+                                              body=b'[{"i": 0}, {"i": 1}]')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'[{"i": 0}, {"i": 1}]')
+
+    async def test_long_bodies_are_spooled(self):
+        self.asgi.spooled_body_size = 8
+        messages = self._messages(b'0123456789' * 4)
+
+        async def receive():
+            return next(messages)
+
+        with await self.asgi.read_body(receive) as body:
+            self.assertNotIsInstance(body._file, io.BytesIO)
+            self.assertEqual(body.read(), b'0123456789' * 4)
+
+    async def test_unhandled_errors_are_internal_server_errors(self):
+        status, _, _ = await self._request('GET', '/failing')
+
+        self.assertEqual(status, 500)
+
+    async def test_unhandled_sync_errors_are_internal_server_errors(self):
+        status, _, _ = await self._request('GET', '/sync-failing')
+
+        self.assertEqual(status, 500)
+
+    def test_environ(self):
+        environ = ASGIApplication.environ({
+            'method': 'POST', 'path': '/users', 'query_string': b'skip=2',
+            'headers': [(b'content-type', b'application/json'),
+                        (b'accept', b'a'), (b'accept', b'b')]},
+            io.BytesIO(b'[]'))
+
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(environ['PATH_INFO'], '/users')
+        self.assertEqual(environ['QUERY_STRING'], 'skip=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+        self.assertEqual(environ['wsgi.input'].read(), b'[]')
@@ -1,4 +1,5 @@
 from unittest import TestCase
+from unittest.mock import patch
 from nose_parameterized import parameterized
 from cerberus import SchemaError
 from grapher import commons
@@ -49,6 +50,20 @@ class SchemaNavigatorTest(TestCase):
             commons.SchemaNavigator.identity_from(schema)
 
 
+    def test_indexes_from(self):
+        model = {
+            '_id': {'type': 'integer', 'identity': True, 'index': True},
+            'email': {'type': 'string', 'index': True},
+            'secret': {'type': 'string', 'unique': True},
+            'name': {'type': 'string', 'index': False},
+            'age': {'type': 'integer'},
+        }
+
+        actual = commons.SchemaNavigator.indexes_from(model)
+
+        self.assertDictEqual(actual, {'email': False, 'secret': True})
+
+
 class CollectionHelperTest(TestCase):
     def setUp(self):
         self.collections = (
@@ -135,6 +150,54 @@ class CollectionHelperTest(TestCase):
         result = commons.CollectionHelper.restore_enumeration(e, previously_transformed=True)
         self.assertEqual(result, 1292)
 
+    @parameterized.expand([
+        (range(5), 2, [[0, 1], [2, 3], [4]]),
+        (range(4), 2, [[0, 1], [2, 3]]),
+        (range(3), None, [[0, 1, 2]]),
+        ([], 2, []),
+    ])
+    def test_chunks(self, item, size, expected):
+        actual = list(commons.CollectionHelper.chunks(item, size))
+
+        self.assertListEqual(actual, expected)
+
+
+class LRUCacheTest(TestCase):
+    def test_eviction(self):
+        c = commons.LRUCache(size=2)
+        c.set('a', 1)
+        c.set('b', 2)
+
+        # 'a' becomes the most recently used entry.
+        self.assertEqual(c.get('a'), 1)
+        c.set('c', 3)
+
+        self.assertIsNone(c.get('b'))
+        self.assertEqual(c.get('a'), 1)
+        self.assertEqual(c.get('c'), 3)
+        self.assertDictEqual(c.stats(), {'size': 2, 'hits': 3, 'misses': 1,
+                                         'evictions': 1})
+
+    def test_ttl(self):
+        c = commons.LRUCache(size=2, ttl=10)
+
+        with patch.object(commons.time, 'monotonic', return_value=100):
+            c.set('a', 1)
+            self.assertEqual(c.get('a'), 1)
+
+        with patch.object(commons.time, 'monotonic', return_value=110):
+            self.assertIsNone(c.get('a'))
+
+        self.assertEqual(len(c), 0)
+
+    def test_pop(self):
+        c = commons.LRUCache(size=2)
+        c.set('a', 1)
+        c.pop('a')
+        c.pop('missing')
+
+        self.assertIsNone(c.get('a'))
+
 
 class WordHelperTest(TestCase):
     @parameterized.expand([
@@ -1,4 +1,6 @@
 from unittest import TestCase
+from unittest.mock import Mock
+
 from grapher import Grapher, settings
 
 settings.effective = settings.Testing
@@ -21,3 +23,18 @@ class GrapherTest(TestCase):
         self.assertIs(g.settings, settings.effective)
         self.assertEqual(g.app.name, expected_name)
         self.assertGreater(len(g.api.endpoints), 0)
+
+    def test_reconcile_indexes_of_unreachable_database(self):
+        g = Mock(settings=settings.Testing)
+        schema = Mock(model={'name': {'type': 'string', 'index': True}})
+        schema.repository.database_errors = (ConnectionError,)
+        schema.repository.reconcile_indexes = Mock(
+            side_effect=ConnectionError('refused'))
+
+        Grapher.reconcile_indexes(g, 'User', schema)
+
+        g.settings = Mock(INDEXES=dict(settings.Testing.INDEXES,
+                                       required=True))
+
+        with self.assertRaises(ConnectionError):
+            Grapher.reconcile_indexes(g, 'User', schema)
@@ -0,0 +1,221 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from grapher import commons, settings
+from grapher.managers import AsyncManager, Manager
+
+
+class ManagerTest(TestCase):
+    def setUp(self):
+        class Meta:
+            identity = '_id'
+
+        self.schema = Mock()
+        self.schema.__name__ = 'Test'
+        self.schema.Meta = Meta
+        self.schema.repository = Mock()
+
+        self.m = Manager(self.schema)
+
+    def test_fetch(self):
+        self.schema.repository.find = Mock(
+            side_effect=lambda ids: {i: {'_id': _id, 'name': 'stored'}
+                                     for i, _id in enumerate(ids)
+                                     if _id != 'missing'})
+        entities = {0: {'_id': 'a'},
+                    1: {'name': 'no identity'},
+                    2: {'_id': 'missing'},
+                    3: {'_id': 'b'}}
+
+        fetched, unidentified = self.m.fetch(entities)
+
+        self.schema.repository.find.assert_called_once_with(
+            ['a', 'missing', 'b'])
+        self.assertDictEqual(fetched, {0: {'_id': 'a', 'name': 'stored'},
+                                       3: {'_id': 'b', 'name': 'stored'}})
+        self.assertDictEqual(unidentified, {1: {'name': 'no identity'},
+                                            2: {'_id': 'missing'}})
+
+    def test_count(self):
+        self.schema.repository.count = Mock(return_value=10)
+
+        self.assertEqual(self.m.count({'name': 'a'}), 10)
+        self.schema.repository.count.assert_called_once_with(name='a')
+
+    def test_count_total_is_cached(self):
+        self.schema.repository.count = Mock(return_value=10)
+        self.schema.repository.create = Mock(return_value=({}, {}))
+        self.m.total_cache_ttl = 60
+
+        self.assertEqual(self.m.count(), 10)
+        self.assertEqual(self.m.count(), 10)
+        self.assertEqual(self.schema.repository.count.call_count, 1)
+
+        # Writes through the manager invalidate the cached total.
+        self.m.create({0: {'name': 'a'}})
+        self.m.count()
+        self.assertEqual(self.schema.repository.count.call_count, 2)
+
+    def test_cache_is_configured_per_schema(self):
+        self.assertIsNone(self.m.cache)
+
+        with patch.dict(settings.effective.ENTITY_CACHE,
+                        schemas={'Test': {'size': 10, 'ttl': 5}}):
+            m = Manager(self.schema)
+
+        self.assertEqual(m.cache.size, 10)
+        self.assertEqual(m.cache.ttl, 5)
+
+    def test_find_is_read_through_cached(self):
+        self.schema.repository.find = Mock(
+            side_effect=lambda ids: {i: {'_id': _id, 'name': 'stored'}
+                                     for i, _id in enumerate(ids)
+                                     if _id != 'missing'})
+        self.m.cache = commons.LRUCache(size=10)
+
+        self.m.find(['a', 'b'])
+        found = self.m.find(['missing', 'b', 'c', 'a'])
+
+        self.assertEqual(self.schema.repository.find.call_count, 2)
+        self.schema.repository.find.assert_called_with(['missing', 'c'])
+        self.assertDictEqual(found, {1: {'_id': 'b', 'name': 'stored'},
+                                     2: {'_id': 'c', 'name': 'stored'},
+                                     3: {'_id': 'a', 'name': 'stored'}})
+
+        # Entries handed out can be modified without affecting the cache.
+        found[1]['name'] = 'modified'
+        self.assertEqual(self.m.find(['b'])[0]['name'], 'stored')
+
+        self.assertDictEqual(self.m.cache.stats(), {
+            'size': 3, 'hits': 3, 'misses': 4, 'evictions': 0})
+
+    def test_writes_invalidate_cached_entities(self):
+        self.schema.repository.find = Mock(
+            side_effect=lambda ids: {i: {'_id': _id}
+                                     for i, _id in enumerate(ids)})
+        self.schema.repository.update = Mock(return_value=({}, {}))
+        self.schema.repository.delete = Mock(return_value=({}, {}))
+        self.m.cache = commons.LRUCache(size=10)
+
+        self.m.find(['a', 'b', 'c'])
+        self.m.update({0: {'_id': 'a', 'name': 'new'}})
+        self.m.delete({0: {'_id': 'b'}})
+        self.m.find(['a', 'b', 'c'])
+
+        self.schema.repository.find.assert_called_with(['a', 'b'])
+
+    def test_upsert_invalidates_stored_entities(self):
+        self.schema.repository.upsert = Mock(
+            return_value=({0: {'_id': 'a', 'code': 'x'}}, {}))
+        self.m.cache = commons.LRUCache(size=10)
+        self.m.cache.set('a', {'_id': 'a', 'code': 'y'})
+
+        stored, failed = self.m.upsert({0: {'code': 'x'}}, key='code')
+
+        self.schema.repository.upsert.assert_called_once_with(
+            {0: {'code': 'x'}}, key='code', raise_errors=False, ordered=None)
+        self.assertEqual(stored, {0: {'_id': 'a', 'code': 'x'}})
+        self.assertIsNone(self.m.cache.get('a'))
+
+    def test_delete_where_clears_cached_entities(self):
+        self.schema.repository.delete_where = Mock(
+            return_value=(2, None, {}))
+        self.m.cache = commons.LRUCache(size=10)
+        self.m.cache.set('a', {'_id': 'a'})
+
+        self.assertEqual(self.m.delete_where({'name': 'x'}), (2, None, {}))
+
+        self.schema.repository.delete_where.assert_called_once_with(
+            returning=False, name='x')
+        self.assertEqual(len(self.m.cache), 0)
+
+    def test_query_results_are_cached_by_version(self):
+        self.schema.repository.where = Mock(
+            side_effect=lambda **kwargs: {0: {'_id': 'a', 'name': 'x'}})
+        self.schema.repository.create = Mock(return_value=({}, {}))
+        self.m.results = commons.LRUCache(size=10)
+
+        first = self.m.query_or_all({'name': 'x', 'age': 1.0}, limit=10)
+        first[0].clear()
+        second = self.m.query_or_all({'age': 1, 'name': 'x'}, limit=10)
+
+        self.assertEqual(self.schema.repository.where.call_count, 1)
+        self.assertDictEqual(second, {0: {'_id': 'a', 'name': 'x'}})
+
+        self.m.query_or_all({'name': 'x'}, limit=20)
+        self.assertEqual(self.schema.repository.where.call_count, 2)
+
+        # Writes bump the version, invalidating all results.
+        self.m.create({0: {'name': 'y'}})
+        self.m.query_or_all({'name': 'x', 'age': 1}, limit=10)
+        self.assertEqual(self.schema.repository.where.call_count, 3)
+
+    def test_count_total_is_not_cached_without_ttl(self):
+        self.schema.repository.count = Mock(return_value=10)
+        self.m.total_cache_ttl = 0
+
+        self.m.count()
+        self.m.count()
+        self.assertEqual(self.schema.repository.count.call_count, 2)
+
+
+class AsyncManagerTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        class Meta:
+            identity = '_id'
+
+        self.schema = Mock()
+        self.schema.__name__ = 'Test'
+        self.schema.Meta = Meta
+        self.schema.repository = Mock()
+
+        self.m = AsyncManager(self.schema)
+
+    async def test_fetch(self):
+        self.schema.repository.find = AsyncMock(
+            side_effect=lambda ids: {i: {'_id': _id}
+                                     for i, _id in enumerate(ids)
+                                     if _id != 'missing'})
+
+        fetched, unidentified = await self.m.fetch({0: {'_id': 'missing'},
+                                                    1: {'_id': 'a'}})
+
+        self.assertDictEqual(fetched, {1: {'_id': 'a'}})
+        self.assertDictEqual(unidentified, {0: {'_id': 'missing'}})
+
+    async def test_query_or_all(self):
+        self.schema.repository.all = AsyncMock(return_value={})
+        self.schema.repository.where = AsyncMock(return_value={})
+
+        await self.m.query_or_all({}, skip=2)
+        await self.m.query_or_all({'name': 'a'}, limit=3)
+
+        self.schema.repository.all.assert_awaited_once_with(
+            skip=2, limit=None, fields=None, after=None, before=None)
+        self.schema.repository.where.assert_awaited_once_with(
+            skip=0, limit=3, fields=None, after=None, before=None, name='a')
+
+    async def test_count_total_is_cached(self):
+        self.schema.repository.count = AsyncMock(return_value=10)
+        self.schema.repository.delete = AsyncMock(return_value=({}, {}))
+        self.m.total_cache_ttl = 60
+
+        self.assertEqual(await self.m.count(), 10)
+        self.assertEqual(await self.m.count(), 10)
+        self.assertEqual(self.schema.repository.count.await_count, 1)
+
+        await self.m.delete({0: {'_id': 'a'}})
+        await self.m.count()
+        self.assertEqual(self.schema.repository.count.await_count, 2)
+
+    async def test_find_is_read_through_cached(self):
+        self.schema.repository.find = AsyncMock(
+            side_effect=lambda ids: {i: {'_id': _id}
+                                     for i, _id in enumerate(ids)})
+        self.m.cache = commons.LRUCache(size=10)
+
+        await self.m.find(['a'])
+        found = await self.m.find(['b', 'a'])
+
+        self.schema.repository.find.assert_awaited_with(['b'])
+        self.assertDictEqual(found, {0: {'_id': 'b'}, 1: {'_id': 'a'}})
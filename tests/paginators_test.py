@@ -1,7 +1,9 @@
 from unittest import TestCase
 from unittest.mock import Mock, patch
+from urllib.parse import urlencode
 from nose_parameterized import parameterized
-from grapher import paginators
+from werkzeug.datastructures import MultiDict
+from grapher import errors, paginators
 
 
 class PaginatorTest(TestCase):
@@ -9,9 +11,9 @@ class PaginatorTest(TestCase):
         request = Mock()
         request.base_url = 'http://localhost/test'
         request.url = 'http://localhost/test?skip=2&limit=2'
-        request.args = Mock()
-        request.args.get = Mock(return_value=2)
+        request.args = MultiDict({'skip': '2', 'limit': '2'})
 
+        self.addCleanup(setattr, paginators, 'request', paginators.request)
         paginators.request = request
 
     def test_paginate(self):
@@ -39,3 +41,104 @@ class PaginatorTest(TestCase):
         self.assertIn('skip', page)
         self.assertIn('limit', page)
         self.assertIn('count', page)
+
+    def test_paginate_with_total(self):
+        data = {i: i for i in range(4)}
+
+        p = paginators.Paginator
+        p.soft_pagination = True
+
+        content, page = p.paginate(data, 0, 4, total=120)
+        self.assertEqual(page['count'], 4)
+        self.assertEqual(page['total'], 120)
+
+        content, page = p.paginate(data, 0, 4)
+        self.assertNotIn('total', page)
+
+    @parameterized.expand([
+        ('true', True),
+        ('1', True),
+        ('false', False),
+        (None, False),
+    ])
+    def test_requests_total(self, value, expected):
+        paginators.request.args = MultiDict({'total': value} if value else {})
+
+        self.assertEqual(paginators.Paginator.requests_total(), expected)
+
+    @parameterized.expand([
+        ({'after': 42},),
+        ({'before': 'a1b2'},),
+    ])
+    def test_cursor(self, cursor):
+        encoded = paginators.Paginator.encode_cursor(**cursor)
+        paginators.request.args = MultiDict({'cursor': encoded})
+
+        self.assertDictEqual(paginators.Paginator.cursor(), cursor)
+
+    @parameterized.expand([
+        ('not-base64!',),
+        (paginators.Paginator.encode_cursor(after=1, before=2),),
+        (paginators.Paginator.encode_cursor(skip=2),),
+        (paginators.Paginator.encode_cursor(after={'$gt': 1}),),
+        (paginators.Paginator.encode_cursor(after=[1, 2]),),
+        (paginators.Paginator.encode_cursor(before=None),),
+        (paginators.Paginator.encode_cursor(before=True),),
+    ])
+    def test_invalid_cursor(self, encoded):
+        paginators.request.args = MultiDict({'cursor': encoded})
+
+        with self.assertRaises(errors.BadRequestError):
+            paginators.Paginator.cursor()
+
+    def test_keyset_paginate(self):
+        cursor = paginators.Paginator.encode_cursor(after=10)
+        paginators.request.args = MultiDict({'cursor': cursor, 'limit': '2'})
+        data = {0: {'_id': 11}, 1: {'_id': 15}}
+
+        p = paginators.Paginator
+        p.soft_pagination = True
+
+        content, page = p.paginate(data, identity='_id')
+
+        self.assertEqual(page['skip'], 0)
+        self.assertEqual(page['next'], 'http://localhost/test?' + urlencode(
+            {'cursor': p.encode_cursor(after=15), 'limit': 2}))
+        self.assertEqual(page['previous'], 'http://localhost/test?' +
+                         urlencode({'cursor': p.encode_cursor(before=11),
+                                    'limit': 2}))
+
+    def test_paginate_keeps_arguments(self):
+        query = '{"year": 2}'
+        paginators.request.args = MultiDict([
+            ('query', query), ('fields', 'year'), ('total', 'true'),
+            ('skip', '2'), ('limit', '2')])
+
+        p = paginators.Paginator
+        p.soft_pagination = True
+
+        content, page = p.paginate({i: i for i in range(2)})
+
+        self.assertEqual(page['next'], 'http://localhost/test?' + urlencode([
+            ('query', query), ('fields', 'year'), ('total', 'true'),
+            ('skip', 4), ('limit', 2)]))
+        self.assertEqual(page['previous'], 'http://localhost/test?' +
+                         urlencode([('query', query), ('fields', 'year'),
+                                    ('total', 'true'), ('skip', 0),
+                                    ('limit', 2)]))
+
+    def test_keyset_paginate_keeps_arguments(self):
+        query = '{"year": 2}'
+        cursor = paginators.Paginator.encode_cursor(after=10)
+        paginators.request.args = MultiDict([
+            ('query', query), ('cursor', cursor), ('limit', '2')])
+
+        p = paginators.Paginator
+        p.soft_pagination = True
+
+        content, page = p.paginate({0: {'_id': 11}, 1: {'_id': 15}},
+                                   identity='_id')
+
+        self.assertEqual(page['next'], 'http://localhost/test?' + urlencode([
+            ('query', query), ('cursor', p.encode_cursor(after=15)),
+            ('limit', 2)]))
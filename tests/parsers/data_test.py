@@ -0,0 +1,86 @@
+import io
+import json
+from unittest import TestCase
+from unittest.mock import Mock
+
+from grapher import errors
+from grapher.parsers import DataParser
+from grapher.parsers import data
+from nose_parameterized import parameterized
+
+
+class DataParserTest(TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, data, 'request', data.request)
+        data.request = Mock()
+
+        # Bodies are read a few bytes at a time, splitting entries.
+        self.addCleanup(setattr, DataParser, 'read_size',
+                        DataParser.read_size)
+        DataParser.read_size = 3
+
+        self.addCleanup(setattr, DataParser, 'max_entry_size',
+                        DataParser.max_entry_size)
+        DataParser.max_entry_size = 64
+
+    def _stream(self, body, mimetype='application/json'):
+        data.request.stream = io.BytesIO(body.encode('utf-8'))
+        data.request.mimetype = mimetype
+
+        return list(DataParser.stream())
+
+    @parameterized.expand([
+        ([],),
+        ([{'name': 'ação', 'age': 21}, {'name': 'b', 'score': -1.5e-3}],),
+        ([12345, 'test', True, None, [1, [2]]],),
+    ])
+    def test_stream_array(self, entries):
+        self.assertEqual(self._stream(json.dumps(entries, indent=2)),
+                         entries)
+
+    def test_stream_single_entry(self):
+        self.assertEqual(self._stream(' {"name": "a"} '), [{'name': 'a'}])
+
+    def test_stream_ndjson(self):
+        body = '{"name": "a"}\n\n{"name": "b", "age": 21}'
+
+        self.assertEqual(self._stream(body, 'application/x-ndjson'),
+                         [{'name': 'a'}, {'name': 'b', 'age': 21}])
+
+    @parameterized.expand([
+        ('[1, 2',),
+        ('[1 2]',),
+        ('[1.]',),
+        ('[{"a": 1}]]',),
+        ('{"a": 1} {"b": 2}',),
+    ])
+    def test_stream_invalid_array(self, body):
+        with self.assertRaises(errors.BadRequestError):
+            self._stream(body)
+
+    def test_stream_invalid_ndjson(self):
+        with self.assertRaises(errors.BadRequestError):
+            self._stream('{"a": 1}\n{"a": ', 'application/x-ndjson')
+
+    @parameterized.expand([
+        ('[{"name": "' + 'a' * 1000,),
+        ('"' + 'a' * 1000,),
+        ('[' + '[' * 1000,),
+        ('[' + '1' * 1000,),
+    ])
+    def test_stream_unterminated_entry(self, body):
+        stream = io.BytesIO(body.encode('utf-8'))
+        data.request.stream = stream
+        data.request.mimetype = 'application/json'
+
+        with self.assertRaises(errors.BadRequestError) as context:
+            list(DataParser.stream())
+
+        self.assertEqual(context.exception.errors[0][0], 'INVALID_DATA')
+        # The body is not read past the maximum length of an entry.
+        self.assertLess(stream.tell(), 100)
+
+    def test_stream_long_ndjson_line(self):
+        with self.assertRaises(errors.BadRequestError):
+            self._stream('{"name": "%s"}\n' % ('a' * 1000),
+                         'application/x-ndjson')
@@ -12,6 +12,8 @@ class QueryParserTest(TestCase):
         r = Mock()
         r.args = Mock()
         r.args.get = Mock()
+
+        self.addCleanup(setattr, query, 'request', query.request)
         query.request = r
 
     @parameterized.expand([
@@ -38,3 +40,15 @@ class QueryParserTest(TestCase):
 
         with self.assertRaises(errors.BadRequestError):
             QueryParser.parse()
+
+    def test_normalize(self):
+        a = QueryParser.normalize({'query': {'b': 1.0, 'a': 'x'}, 'skip': 0,
+                                   'limit': None}, fields={'name', 'age'})
+        b = QueryParser.normalize({'limit': None, 'skip': 0,
+                                   'query': {'a': 'x', 'b': 1}},
+                                  fields={'age', 'name'})
+        c = QueryParser.normalize({'query': {'a': 'x', 'b': 1}, 'skip': 2,
+                                   'limit': None}, fields={'age', 'name'})
+
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
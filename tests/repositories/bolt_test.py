@@ -0,0 +1,234 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from neo4j.exceptions import Neo4jError
+
+from grapher.repositories import bolt
+from grapher.repositories.bolt import (AsyncBoltEntityRepository,
+                                       AsyncBoltRelationshipRepository,
+                                       AsyncBoltRepository,
+                                       BoltEntityRepository,
+                                       BoltRelationshipRepository,
+                                       BoltRepository)
+from tests.repositories.graph_test import fake_schema
+
+
+class BoltRepositoryTest(TestCase):
+    def setUp(self):
+        self.session = MagicMock()
+        self.session.__enter__.return_value = self.session
+
+        self.driver = Mock()
+        self.driver.session = Mock(return_value=self.session)
+
+        BoltRepository._driver = None
+
+        patcher = patch.object(bolt.GraphDatabase, 'driver',
+                               return_value=self.driver)
+        self.graph_database_driver = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, BoltRepository, '_driver', None)
+
+    def test_driver_is_shared_by_all_schemas(self):
+        users = BoltEntityRepository(fake_schema('User', {}))
+        groups = BoltEntityRepository(fake_schema('Group', {}))
+        members = BoltRelationshipRepository(fake_schema('Members', {}))
+
+        self.assertIs(users.driver, self.driver)
+        self.assertIs(groups.driver, self.driver)
+        self.assertIs(members.driver, self.driver)
+        self.assertEqual(self.graph_database_driver.call_count, 1)
+
+    def test_driver_pool_settings(self):
+        r = BoltEntityRepository(fake_schema('User', {}))
+        r.connection_string = {
+            'bolt_uri': 'bolt://localhost:7687',
+            'username': 'neo4j',
+            'password': 'root',
+            'max_connection_pool_size': 10,
+            'connection_acquisition_timeout': 5,
+            'max_connection_lifetime': 300,
+        }
+
+        r.driver
+
+        self.graph_database_driver.assert_called_once_with(
+            'bolt://localhost:7687', auth=('neo4j', 'root'),
+            max_connection_pool_size=10, connection_acquisition_timeout=5,
+            max_connection_lifetime=300)
+
+    def test_close(self):
+        BoltEntityRepository(fake_schema('User', {})).driver
+        BoltRepository.close()
+
+        self.assertTrue(self.driver.close.called)
+        self.assertIsNone(BoltRepository._driver)
+
+    def test_all(self):
+        self.session.run = Mock(return_value=iter([(1, {'name': 'a'}),
+                                                   (2, {'name': 'b'})]))
+        r = BoltEntityRepository(fake_schema('User', {}))
+
+        actual = r.all(skip=10, limit=2)
+
+        statement, parameters = self.session.run.call_args[0]
+        self.assertIn('MATCH (n:`User`)', statement)
+        self.assertEqual(parameters, {'skip': 10, 'limit': 2})
+        self.assertDictEqual(actual, {0: {'_id': 1, 'name': 'a'},
+                                      1: {'_id': 2, 'name': 'b'}})
+
+    def test_create_failed(self):
+        self.session.run = Mock(side_effect=Neo4jError)
+        r = BoltEntityRepository(fake_schema('User', {}))
+
+        created, failed = r.create({0: {'name': 'a'}, 1: {'name': 'b'}})
+
+        self.assertEqual(created, {})
+        self.assertEqual(set(failed.keys()), {0, 1})
+
+    def test_indexes(self):
+        self.session.run = Mock(side_effect=[
+            iter([('NODE', ['User'], ['name']),
+                  ('NODE', ['User'], ['email']),
+                  ('NODE', ['Group'], ['name']),
+                  ('NODE', ['User'], ['name', 'email']),
+                  ('NODE', None, None)]),
+            iter([('NODE', ['User'], ['email'], 'UNIQUENESS'),
+                  ('NODE', ['User'], ['age'], 'NODE_PROPERTY_EXISTENCE')])])
+        r = BoltEntityRepository(fake_schema('User', {}))
+
+        actual = r.indexes()
+
+        self.assertIn('SHOW INDEXES', self.session.run.call_args_list[0][0][0])
+        self.assertIn('SHOW CONSTRAINTS',
+                      self.session.run.call_args_list[1][0][0])
+        self.assertDictEqual(actual, {'name': False, 'email': True})
+
+    def test_create_index(self):
+        r = BoltEntityRepository(fake_schema('User', {}))
+
+        self.assertTrue(r.create_index('name'))
+        self.assertTrue(r.create_index('email', unique=True))
+
+        statements = [c[0][0] for c in self.session.run.call_args_list]
+        self.assertEqual(statements, [
+            'CREATE INDEX FOR (n:`User`) ON (n.`name`)',
+            'CREATE CONSTRAINT FOR (n:`User`) REQUIRE n.`email` IS UNIQUE'])
+
+        self.session.run = Mock(side_effect=Neo4jError)
+        self.assertFalse(r.create_index('name'))
+
+
+class AsyncResult:
+    def __init__(self, records):
+        self.records = records
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for record in self.records:
+            yield record
+
+
+class AsyncBoltRepositoryTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.session = MagicMock()
+        self.session.__aenter__ = AsyncMock(return_value=self.session)
+        self.session.__aexit__ = AsyncMock(return_value=False)
+
+        self.driver = Mock()
+        self.driver.session = Mock(return_value=self.session)
+        self.driver.close = AsyncMock()
+
+        AsyncBoltRepository._async_driver = None
+
+        patcher = patch.object(bolt.AsyncGraphDatabase, 'driver',
+                               return_value=self.driver)
+        self.graph_database_driver = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, AsyncBoltRepository, '_async_driver', None)
+
+    def _run(self, records):
+        self.session.run = AsyncMock(return_value=AsyncResult(records))
+
+    async def test_driver_is_shared_by_all_schemas(self):
+        users = AsyncBoltEntityRepository(fake_schema('User', {}))
+        members = AsyncBoltRelationshipRepository(fake_schema('Members', {}))
+
+        self.assertIs(users.async_driver, members.async_driver)
+        self.assertEqual(self.graph_database_driver.call_count, 1)
+
+        await AsyncBoltRepository.close_async()
+        self.driver.close.assert_awaited_once_with()
+        self.assertIsNone(AsyncBoltRepository._async_driver)
+
+    async def test_where(self):
+        self._run([(2, {'name': 'b'}), (1, {'name': 'a'})])
+        r = AsyncBoltEntityRepository(fake_schema('User', {}))
+
+        actual = await r.where(limit=2, before=3, name='a')
+
+        statement, parameters = self.session.run.call_args[0]
+        self.assertIn('MATCH (n:`User`) WHERE n.`name` = $p0 AND id(n) < '
+                      '$bound', statement)
+        self.assertIn('ORDER BY id(n) DESC', statement)
+        self.assertEqual(parameters, {'p0': 'a', 'bound': 3, 'skip': 0,
+                                      'limit': 2})
+        self.assertDictEqual(actual, {0: {'_id': 1, 'name': 'a'},
+                                      1: {'_id': 2, 'name': 'b'}})
+
+    async def test_count(self):
+        self._run([(42,)])
+        r = AsyncBoltEntityRepository(fake_schema('User', {}))
+
+        self.assertEqual(await r.count(), 42)
+
+    async def test_update(self):
+        self._run([(1, 7, {'name': 'b'})])
+        r = AsyncBoltEntityRepository(fake_schema('User', {}))
+
+        updated, failed = await r.update({0: {'_id': 3, 'name': 'a'},
+                                          1: {'_id': 7, 'name': 'b'}})
+
+        statement = self.session.run.call_args[0][0]
+        self.assertIn('SET n += row.properties', statement)
+        self.assertDictEqual(updated, {1: {'_id': 7, 'name': 'b'}})
+        self.assertEqual(set(failed.keys()), {0})
+
+    async def test_create_failed_ordered(self):
+        self.session.run = AsyncMock(side_effect=Neo4jError)
+        r = AsyncBoltEntityRepository(fake_schema('User', {}))
+        r.batch_size = 1
+
+        created, failed = await r.create({0: {'name': 'a'}, 1: {'name': 'b'}},
+                                         ordered=True)
+
+        self.assertEqual(self.session.run.await_count, 1)
+        self.assertEqual(created, {})
+        self.assertIn('Not attempted', failed[1])
+
+    async def test_delete_where(self):
+        self.session.run = AsyncMock(side_effect=[
+            AsyncResult([(2,)]), AsyncResult([(1,)]), AsyncResult([(5,)])])
+        r = AsyncBoltEntityRepository(fake_schema('User', {}))
+
+        count, deleted, failed = await r.delete_where(chunk_size=2, name='a')
+
+        statements = [c[0][0] for c in self.session.run.call_args_list]
+        self.assertIn('NOT (n)--() WITH n LIMIT $chunk', statements[0])
+        self.assertIn('AND (n)--() RETURN id(n)', statements[2])
+        self.assertEqual(count, 3)
+        self.assertIsNone(deleted)
+        self.assertEqual(list(failed.keys()), [5])
+
+    async def test_match(self):
+        self._run([(1, {}, 2, 3)])
+        r = AsyncBoltRelationshipRepository(fake_schema('Members', {}))
+
+        actual = await r.match(origin=2)
+
+        parameters = self.session.run.call_args[0][1]
+        self.assertEqual(parameters['p0'], 2)
+        self.assertDictEqual(actual, {0: {'_id': 1, '_origin': 2,
+                                          '_target': 3}})
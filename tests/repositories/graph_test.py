@@ -22,6 +22,13 @@ def fake_node(**properties):
     return node
 
 
+def fake_schema(label, model):
+    class Meta:
+        identity = '_id'
+
+    return type(label, (), {'model': model, 'Meta': Meta})
+
+
 def fake_relationship(link=None):
     rel = Mock()
     rel.properties = link.properties if link else {}
@@ -42,17 +49,19 @@ class GraphEntityRepositoryTest(TestCase):
         self.data = (fake_node() for _ in range(20))
 
         graph = Mock()
-        graph.find = Mock(
-            side_effect=lambda label, limit: (fake_node() for _ in range(limit is None and 4 or min(4, limit))))
-        graph.node = Mock(side_effect=lambda i: fake_node())
-        graph.pull = Mock()
-        graph.push = Mock()
-        graph.create = Mock(side_effect=lambda *e: (fake_node() for _ in range(len(e))))
-        graph.delete = Mock(side_effect=lambda *e: e)
-
-        self.r = GraphEntityRepository(self.label, self.schema)
+
+        self.r = GraphEntityRepository(fake_schema(self.label, self.schema))
         self.r._g = graph
 
+    def _execute_reads(self, statement, parameters):
+        # Simulate a label holding 4 nodes.
+        n = max(0, 4 - parameters['skip'])
+
+        if 'limit' in parameters:
+            n = min(n, parameters['limit'])
+
+        return [(f.random_int(), fake_node().properties) for _ in range(n)]
+
     @parameterized.expand([
         (0, None, 4),
         (2, None, 2),
@@ -61,27 +70,103 @@ class GraphEntityRepositoryTest(TestCase):
         (2, 10, 2),
     ])
     def test_all(self, skip, limit, expected_length):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
+
         actual = self.r.all(skip, limit)
 
-        self.r._g.find.assert_called_once_with(self.label, limit=limit and skip + limit or None)
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('MATCH (n:`test`)', statement)
+        self.assertIn('ORDER BY id(n) SKIP $skip', statement)
+        self.assertEqual(parameters['skip'], skip)
+
+        if limit is None:
+            self.assertNotIn('LIMIT', statement)
+        else:
+            self.assertIn('LIMIT $limit', statement)
+            self.assertEqual(parameters['limit'], limit)
 
-        actual = list(actual)
+        self.assertIsInstance(actual, dict)
         self.assertEqual(len(actual), expected_length)
 
+    @parameterized.expand([
+        (None, 'RETURN id(n), properties(n) ORDER BY'),
+        ({'test2', 'test1', '_id'}, 'RETURN id(n), n {.`test1`, .`test2`} '
+                                    'ORDER BY'),
+        ({'_id'}, 'RETURN id(n), {} ORDER BY'),
+    ])
+    def test_all_projected(self, fields, expected):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
+
+        self.r.all(fields=fields)
+
+        statement = self.r._g.cypher.execute.call_args[0][0]
+        self.assertIn(expected, statement)
+
+    def test_all_projected_missing_field(self):
+        # Projecting a property a node doesn't have yields null.
+        self.r._g.cypher.execute = Mock(
+            return_value=[(1, {'test1': 10, 'test2': None})])
+
+        actual = self.r.all(fields={'test1', 'test2'})
+
+        self.assertEqual(actual, {0: {'_id': 1, 'test1': 10}})
+
+    def test_where_after(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
+
+        self.r.where(test1=10, after=100, limit=2)
+
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('WHERE n.`test1` = $p0 AND id(n) > $bound '
+                      'RETURN id(n), properties(n) ORDER BY id(n) SKIP',
+                      statement)
+        self.assertEqual(parameters['bound'], 100)
+
+    def test_all_before(self):
+        self.r._g.cypher.execute = Mock(
+            return_value=[(9, {}), (8, {}), (7, {})])
+
+        actual = self.r.all(before=10, limit=3)
+
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('WHERE id(n) < $bound', statement)
+        self.assertIn('ORDER BY id(n) DESC', statement)
+        self.assertEqual([e['_id'] for e in actual.values()], [7, 8, 9])
+
+    def test_count(self):
+        self.r._g.cypher.execute = Mock(return_value=[(42,)])
+
+        actual = self.r.count(test1=10)
+
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertEqual(statement, 'MATCH (n:`test`) WHERE n.`test1` = $p0 '
+                                    'RETURN count(n)')
+        self.assertEqual(parameters, {'p0': 10})
+        self.assertEqual(actual, 42)
+
     def test_find(self):
-        identities = [1, 2, 3]
+        identities = [3, 1, 2]
+        self.r._g.cypher.execute = Mock(
+            return_value=[(i, {'test1': i}) for i in sorted(identities)])
+
         actual = self.r.find(identities)
 
-        self.assertEqual(self.r._g.node.call_count, len(identities))
-        self.assertTrue(self.r._g.pull.called)
-        self.assertEqual(len(actual), len(identities))
+        self.assertEqual(self.r._g.cypher.execute.call_count, 1)
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('MATCH (n:`test`) WHERE id(n) IN $ids', statement)
+        self.assertEqual(parameters['ids'], identities)
+
+        self.assertDictEqual(actual, {0: {'_id': 3, 'test1': 3},
+                                      1: {'_id': 1, 'test1': 1},
+                                      2: {'_id': 2, 'test1': 2}})
 
     def test_find_nonexistent_nodes(self):
         identities = [1, 2, 3]
-        self.r._g.pull = Mock(side_effect=py2neo.GraphError)
+        self.r._g.cypher.execute = Mock(return_value=[(2, {'test1': 2})])
 
-        with self.assertRaises(errors.NotFoundError):
-            self.r.find(identities)
+        actual = self.r.find(identities)
+
+        self.assertDictEqual(actual, {1: {'_id': 2, 'test1': 2}})
 
     @parameterized.expand([
         (0, None, 4),
@@ -91,60 +176,353 @@ class GraphEntityRepositoryTest(TestCase):
         (2, 10, 2),
     ])
     def test_where(self, skip, limit, expected_length):
-        self.r._g.find = Mock(
-            side_effect=lambda p, q, r, limit=None: (fake_node() for _ in range(limit is None and 4 or min(limit, 4))))
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
 
         actual = self.r.where(test1=10, skip=skip, limit=limit)
 
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('WHERE n.`test1` = $p0', statement)
+        self.assertEqual(parameters['p0'], 10)
+
         self.assertIsInstance(actual, dict)
         self.assertEqual(len(actual), expected_length)
 
     def test_where_identity(self):
+        self.r._g.cypher.execute = Mock(
+            return_value=[(10, fake_node().properties)])
+
         actual = self.r.where(_id=10)
 
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('WHERE id(n) = $p0', statement)
+
         self.assertIsInstance(actual, dict)
         self.assertEqual(len(actual), 1)
+        self.assertEqual(actual[0]['_id'], 10)
+
+    def test_where_multiple_keys(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
+
+        actual = self.r.where(test2='test', test1=10, _id=3)
+
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('WHERE id(n) = $p0 AND n.`test1` = $p1 '
+                      'AND n.`test2` = $p2', statement)
+        self.assertEqual(parameters['p0'], 3)
+        self.assertEqual(parameters['p1'], 10)
+        self.assertEqual(parameters['p2'], 'test')
+
+        self.assertIsInstance(actual, dict)
 
-    def test_where_raises_error_with_multiple_keys(self):
-        with self.assertRaises(ValueError):
-            self.r.where(test1=10, test2='test')
+    def test_where_produces_stable_statements(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
+
+        self.r.where(test1=10, test2='a')
+        first = self.r._g.cypher.execute.call_args[0][0]
+        self.r.where(test2='b', test1=20)
+        second = self.r._g.cypher.execute.call_args[0][0]
+
+        self.assertEqual(first, second)
+
+    def test_where_escapes_fields(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_reads)
+
+        self.r.where(**{'a` = 1 OR `b': 10})
+
+        statement = self.r._g.cypher.execute.call_args[0][0]
+        self.assertIn('n.`a`` = 1 OR ``b` = $p0', statement)
+
+    def test_indexes(self):
+        self.r._g.cypher.execute = Mock(return_value=[
+            ('INDEX ON :test(test1)', 'node_label_property'),
+            ('INDEX ON :test(test2)', 'node_unique_property'),
+            ('INDEX ON :other(test1)', 'node_label_property'),
+            ('INDEX ON :test(test1, test2)', 'node_label_property'),
+        ])
+
+        actual = self.r.indexes()
+
+        self.assertDictEqual(actual, {'test1': False, 'test2': True})
+
+    def test_reconcile_indexes(self):
+        self.r.schema.model = {
+            'test1': {'type': 'integer', 'index': True},
+            'test2': {'type': 'string', 'unique': True},
+            'test3': {'type': 'string', 'unique': True},
+        }
+        self.r.indexes = Mock(return_value={'test1': False, 'test4': False})
+        self.r._g.cypher.execute = Mock(
+            side_effect=lambda s, p: self.fail_if_contains(s, 'test3'))
+
+        created, missing, undeclared = self.r.reconcile_indexes()
+
+        self.assertDictEqual(created, {'test2': True})
+        self.assertDictEqual(missing, {'test3': True})
+        self.assertDictEqual(undeclared, {'test4': False})
+        self.assertIn('CREATE CONSTRAINT ON (n:`test`) '
+                      'ASSERT n.`test2` IS UNIQUE',
+                      self.r._g.cypher.execute.call_args_list[0][0][0])
+
+    def test_reconcile_indexes_without_creating(self):
+        self.r.schema.model = {'test1': {'type': 'integer', 'index': True}}
+        self.r.indexes = Mock(return_value={})
+        self.r._g.cypher.execute = Mock()
+
+        created, missing, undeclared = self.r.reconcile_indexes(create=False)
+
+        self.assertFalse(self.r._g.cypher.execute.called)
+        self.assertDictEqual(created, {})
+        self.assertDictEqual(missing, {'test1': False})
+
+    @staticmethod
+    def fail_if_contains(statement, field):
+        if field in statement:
+            raise py2neo.GraphError
+
+    def _execute_writes(self, statement, parameters):
+        # Echo rows back as records (row.i, id(n), properties(n)),
+        # except for the ones whose identity is negative (not found).
+        return [(row['i'], row['id'] or f.random_int(), row['properties'])
+                for row in parameters['rows']
+                if row['id'] is None or row['id'] >= 0]
 
     def test_create(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_writes)
         data = {0: fake_node().properties}
 
         actual_created, actual_failed = self.r.create(data)
 
-        self.assertTrue(self.r._g.create.called)
+        self.assertTrue(self.r._g.cypher.execute.called)
+        statement = self.r._g.cypher.execute.call_args[0][0]
+        self.assertIn('UNWIND $rows AS row', statement)
+        self.assertIn('CREATE (n:`test`)', statement)
 
         self.assertIsInstance(actual_created, dict)
         self.assertIsInstance(actual_failed, dict)
         self.assertEqual(len(actual_created), 1)
         self.assertEqual(len(actual_failed), 0)
+        self.assertIn('_id', actual_created[0])
+
+    @parameterized.expand([
+        (10, 3, 4),
+        (10, 10, 1),
+        (10, 1000, 1),
+    ])
+    def test_create_in_batches(self, n, batch_size, expected_calls):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_writes)
+        self.r.batch_size = batch_size
+        data = {i: fake_node().properties for i in range(n)}
+
+        actual_created, actual_failed = self.r.create(data)
+
+        self.assertEqual(self.r._g.cypher.execute.call_count, expected_calls)
+        self.assertEqual(set(actual_created.keys()), set(range(n)))
+        self.assertEqual(len(actual_failed), 0)
+
+    def test_create_failed_batch(self):
+        self.r._g.cypher.execute = Mock(side_effect=py2neo.GraphError)
+        self.r.batch_size = 2
+        data = {i: fake_node().properties for i in range(3)}
+
+        actual_created, actual_failed = self.r.create(data)
+
+        self.assertEqual(len(actual_created), 0)
+        self.assertEqual(set(actual_failed.keys()), {0, 1, 2})
+
+        with self.assertRaises(py2neo.GraphError):
+            self.r.create(data, raise_errors=True)
+
+    @parameterized.expand([
+        (True, 1, {0, 1, 2, 3}),
+        (False, 2, {0, 1}),
+    ])
+    def test_create_ordered(self, ordered, expected_calls, expected_failed):
+        def execute(statement, parameters):
+            if parameters['rows'][0]['i'] == 0:
+                raise py2neo.GraphError()
+            return self._execute_writes(statement, parameters)
+
+        self.r._g.cypher.execute = Mock(side_effect=execute)
+        self.r.batch_size = 2
+        data = {i: fake_node().properties for i in range(4)}
+
+        actual_created, actual_failed = self.r.create(data, ordered=ordered)
+
+        self.assertEqual(self.r._g.cypher.execute.call_count, expected_calls)
+        self.assertEqual(set(actual_failed.keys()), expected_failed)
+        self.assertEqual(set(actual_created.keys()),
+                         set(range(4)) - expected_failed)
 
     def test_update(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_writes)
         n = fake_node()
         data = {0: n.properties}
         data[0]['_id'] = n._id
 
         actual_updated, actual_failed = self.r.update(data)
 
-        self.assertTrue(self.r._g.push.called)
+        statement = self.r._g.cypher.execute.call_args[0][0]
+        self.assertIn('WHERE id(n) = row.id', statement)
+        self.assertIn('SET n += row.properties', statement)
 
         self.assertIsInstance(actual_updated, dict)
         self.assertIsInstance(actual_failed, dict)
         self.assertEqual(len(actual_updated), 1)
         self.assertEqual(len(actual_failed), 0)
+        self.assertEqual(actual_updated[0]['_id'], n._id)
+
+    def test_update_nonexistent_nodes(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_writes)
+        data = {0: {'_id': 1, 'test1': 1},
+                1: {'_id': -1, 'test1': 2},
+                2: {'_id': 2, 'test1': 3}}
+
+        actual_updated, actual_failed = self.r.update(data)
+
+        self.assertEqual(set(actual_updated.keys()), {0, 2})
+        self.assertEqual(set(actual_failed.keys()), {1})
+
+        with self.assertRaises(errors.NotFoundError):
+            self.r.update(data, raise_errors=True)
+
+    def test_stream(self):
+        self.r._g.cypher.execute = Mock(side_effect=[
+            [(1, {'test1': 1}), (4, {'test1': 1})], [(7, {'test1': 1})]])
+
+        chunks = list(self.r.stream(chunk_size=2, test1=1))
+
+        self.assertEqual(chunks, [{0: {'_id': 1, 'test1': 1},
+                                   1: {'_id': 4, 'test1': 1}},
+                                  {2: {'_id': 7, 'test1': 1}}])
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertIn('id(n) > $bound', statement)
+        self.assertEqual(parameters['bound'], 4)
+        self.assertEqual(parameters['limit'], 2)
+
+    def test_stream_limit(self):
+        self.r._g.cypher.execute = Mock(side_effect=[
+            [(1, {}), (4, {})], [(7, {})]])
+
+        chunks = list(self.r.stream(chunk_size=2, limit=3))
+
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(self.r._g.cypher.execute.call_args[0][1]['limit'], 1)
+
+    def test_delete_where_in_chunks(self):
+        self.r._g.cypher.execute = Mock(
+            side_effect=[[(2,)], [(2,)], [(1,)], []])
+
+        count, deleted, failed = self.r.delete_where(chunk_size=2, test1=1)
+
+        calls = self.r._g.cypher.execute.call_args_list
+        statement, parameters = calls[0][0]
+        self.assertEqual(len(calls), 4)
+        self.assertIn('WHERE n.`test1` = $p0 AND NOT (n)--() '
+                      'WITH n LIMIT $chunk DELETE n RETURN count(*)',
+                      statement)
+        self.assertNotIn('DETACH', statement)
+        self.assertEqual(parameters, {'p0': 1, 'chunk': 2})
+        self.assertEqual(count, 5)
+        self.assertIsNone(deleted)
+        self.assertDictEqual(failed, {})
+
+    def test_delete_where_returning(self):
+        self.r._g.cypher.execute = Mock(side_effect=[
+            [(1, {'test1': 1}), (2, {'test1': 1})], [], [(3,)]])
+
+        count, deleted, failed = self.r.delete_where(
+            chunk_size=2, returning=True, test1=1)
+
+        calls = self.r._g.cypher.execute.call_args_list
+        self.assertIn('WITH n, id(n) AS id, properties(n) AS properties '
+                      'DELETE n RETURN id, properties', calls[0][0][0])
+        self.assertIn('WHERE n.`test1` = $p0 AND (n)--() RETURN id(n)',
+                      calls[2][0][0])
+        self.assertEqual(count, 2)
+        self.assertEqual(deleted, {0: {'_id': 1, 'test1': 1},
+                                   1: {'_id': 2, 'test1': 1}})
+        self.assertEqual(list(failed.keys()), [3])
+        self.assertIn('relationships', failed[3])
+
+    def test_upsert(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_writes)
+        data = {0: {'name': 'a', 'test1': 1}, 1: {'name': 'b', 'test1': 2}}
+
+        upserted, failed = self.r.upsert(data, key='name')
+
+        statement, parameters = self.r._g.cypher.execute.call_args[0]
+        self.assertEqual(self.r._g.cypher.execute.call_count, 1)
+        self.assertIn('MERGE (n:`test` {`name`: row.key}) '
+                      'SET n += row.properties', statement)
+        self.assertEqual([row['key'] for row in parameters['rows']],
+                         ['a', 'b'])
+        self.assertEqual(set(upserted.keys()), {0, 1})
+        self.assertEqual(failed, {})
+
+    def test_upsert_on_identity_updates(self):
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_writes)
+
+        self.r.upsert({0: {'_id': 1, 'test1': 1}})
+
+        statement = self.r._g.cypher.execute.call_args[0][0]
+        self.assertIn('WHERE id(n) = row.id', statement)
+        self.assertNotIn('MERGE', statement)
+
+    def _execute_deletes(self, kept=()):
+        def execute(statement, parameters):
+            if 'rows' not in parameters:
+                return [(i,) for i in parameters['ids'] if i in kept]
+
+            return self._execute_writes(statement, parameters)
+
+        return execute
 
     def test_delete(self):
-        entities = [{'_id': d._id} for d in self.data]
+        self.r._g.cypher.execute = Mock(side_effect=self._execute_deletes())
+        entities = {i: {'_id': d._id} for i, d in enumerate(self.data)}
+        entities[3]['_id'] = -1
+
         actual_deleted, actual_failed = self.r.delete(entities)
 
-        self.assertTrue(self.r._g.delete.called)
+        statement = self.r._g.cypher.execute.call_args[0][0]
+        self.assertIn('MATCH (n:`test`) WHERE id(n) = row.id '
+                      'AND NOT (n)--()', statement)
+        self.assertIn('DELETE n', statement)
+        self.assertNotIn('DETACH', statement)
 
         self.assertIsInstance(actual_deleted, dict)
         self.assertIsInstance(actual_failed, dict)
-        self.assertEqual(len(actual_deleted), len(entities))
-        self.assertEqual(len(actual_failed), 0)
+        self.assertEqual(len(actual_deleted), len(entities) - 1)
+        self.assertEqual(set(actual_failed.keys()), {3})
+
+    def test_delete_kept(self):
+        self.r._g.cypher.execute = Mock(
+            side_effect=self._execute_deletes(kept={20}))
+        entities = {0: {'_id': 10}, 1: {'_id': 20}, 2: {'_id': 30}}
+
+        actual_deleted, actual_failed = self.r.delete(entities)
+
+        calls = self.r._g.cypher.execute.call_args_list
+        statement, parameters = calls[0][0]
+        self.assertIn('WHERE id(n) IN $ids AND (n)--() RETURN id(n)',
+                      statement)
+        self.assertEqual(parameters, {'ids': [10, 20, 30]})
+        self.assertEqual([row['id'] for row in calls[1][0][1]['rows']],
+                         [10, 30])
+
+        self.assertEqual(set(actual_deleted.keys()), {0, 2})
+        self.assertEqual(list(actual_failed.keys()), [1])
+        self.assertIn('relationships', actual_failed[1])
+
+    def test_delete_kept_raises(self):
+        self.r._g.cypher.execute = Mock(
+            side_effect=self._execute_deletes(kept={20}))
+
+        with self.assertRaises(errors.BadRequestError):
+            self.r.delete({0: {'_id': 10}, 1: {'_id': 20}},
+                          raise_errors=True)
+
+        self.assertEqual(self.r._g.cypher.execute.call_count, 1)
 
 
 class GraphRelationshipRepositoryTest(TestCase):
@@ -154,48 +532,137 @@ class GraphRelationshipRepositoryTest(TestCase):
         g = Mock()
         g.node = Mock(side_effect=lambda i: fake_node(id=i))
         g.relationship = Mock(side_effect=lambda i: fake_relationship())
-        g.match = Mock(
-            side_effect=lambda o, l, t, limit: (fake_relationship() for _ in range(limit and min(4, limit) or 4)))
         g.create = Mock(side_effect=lambda *r: r)
 
         self.g = g
 
+    def _execute_reads(self, statement, parameters):
+        n = max(0, 4 - parameters['skip'])
+
+        if 'limit' in parameters:
+            n = min(n, parameters['limit'])
+
+        return [(f.random_int(), {'test': f.name()},
+                 f.random_int(), f.random_int())
+                for _ in range(n)]
+
     @parameterized.expand([
         (0, None, 4),
         (2, None, 2),
         (2, 2, 2),
     ])
     def test_all(self, skip, limit, expected_length):
-        r = GraphRelationshipRepository('test', {})
+        r = GraphRelationshipRepository(fake_schema('test', self.schema))
         r._g = self.g
+        self.g.cypher.execute = Mock(side_effect=self._execute_reads)
 
         actual = r.all(skip, limit)
 
-        self.assertTrue(self.g.match.called)
+        statement, parameters = self.g.cypher.execute.call_args[0]
+        self.assertIn('MATCH (a)-[r:`TEST`]->(b)', statement)
+        self.assertIn('ORDER BY id(r) SKIP $skip', statement)
+        self.assertNotIn('WHERE', statement)
+
         self.assertEqual(len(actual), expected_length)
         self.assertIsInstance(actual[0], dict)
+        self.assertIn('_origin', actual[0])
+        self.assertIn('_target', actual[0])
+
+    def test_all_projected_missing_field(self):
+        r = GraphRelationshipRepository(fake_schema('test', self.schema))
+        r._g = self.g
+        self.g.cypher.execute = Mock(return_value=[(1, {'test': None}, 2, 3)])
+
+        actual = r.all(fields={'test', '_origin', '_target'})
+
+        self.assertEqual(actual, {0: {'_id': 1, '_origin': 2, '_target': 3}})
 
     @parameterized.expand([
         (None, None),
         (1, None),
         (None, 2),
         (1, 2),
+        (0, 0),
     ])
     def test_match(self, origin, target):
-        r = GraphRelationshipRepository('test', {})
+        r = GraphRelationshipRepository(fake_schema('test', self.schema))
         r._g = self.g
+        self.g.cypher.execute = Mock(side_effect=self._execute_reads)
 
         actual = r.match(origin, target)
 
-        self.assertTrue(self.g.match.called)
-        self.assertTrue('TEST', self.g.match.call_args[0][1])
+        statement, parameters = self.g.cypher.execute.call_args[0]
 
         if origin is None:
-            self.assertIsNone(self.g.match.call_args[0][0])
+            self.assertNotIn('id(a) =', statement)
         else:
-            self.assertIsNotNone(self.g.match.call_args[0][0])
+            self.assertIn('id(a) = $p0', statement)
+            self.assertEqual(parameters['p0'], origin)
 
         if target is None:
-            self.assertIsNone(self.g.match.call_args[0][2])
+            self.assertNotIn('id(b) =', statement)
         else:
-            self.assertIsNotNone(self.g.match.call_args[0][2])
+            self.assertIn('id(b) = $p%i' % (origin is not None), statement)
+            self.assertIn(target, parameters.values())
+
+    def test_where(self):
+        r = GraphRelationshipRepository(fake_schema('test', self.schema))
+        r._g = self.g
+        self.g.cypher.execute = Mock(return_value=[(1, {'test': 'a'}, 2, 3)])
+
+        actual = r.where(test='a', _origin=2, _id=1)
+
+        statement, parameters = self.g.cypher.execute.call_args[0]
+        self.assertIn('MATCH (a)-[r:`TEST`]->(b) WHERE id(r) = $p0 '
+                      'AND id(a) = $p1 AND r.`test` = $p2', statement)
+        self.assertDictEqual(actual, {0: {'_id': 1, 'test': 'a',
+                                          '_origin': 2, '_target': 3}})
+
+    def _execute_writes(self, statement, parameters):
+        # Nodes with negative identities do not exist.
+        return [(row['i'], row['id'] or f.random_int(), row['properties'],
+                 row['o'], row['t'])
+                for row in parameters['rows']
+                if row['o'] >= 0 and row['t'] >= 0]
+
+    def test_create(self):
+        r = GraphRelationshipRepository(fake_schema('test', self.schema))
+        r._g = self.g
+        self.g.cypher.execute = Mock(side_effect=self._execute_writes)
+        data = {0: {'_origin': 1, '_target': 2, 'test': 'a'},
+                1: {'_origin': -1, '_target': 2, 'test': 'b'},
+                2: {'_origin': 3, '_target': 4}}
+
+        created, failed = r.create(data)
+
+        self.assertEqual(self.g.cypher.execute.call_count, 1)
+        statement, parameters = self.g.cypher.execute.call_args[0]
+        self.assertIn('MATCH (a), (b) WHERE id(a) = row.o AND id(b) = row.t',
+                      statement)
+        self.assertIn('CREATE (a)-[r:`TEST`]->(b)', statement)
+        self.assertDictEqual(parameters['rows'][0],
+                             {'i': 0, 'id': None, 'o': 1, 't': 2,
+                              'properties': {'test': 'a'}})
+
+        self.assertEqual(set(created.keys()), {0, 2})
+        self.assertEqual(created[0]['_origin'], 1)
+        self.assertEqual(created[0]['_target'], 2)
+        self.assertEqual(created[0]['test'], 'a')
+        self.assertEqual(set(failed.keys()), {1})
+
+        with self.assertRaises(errors.NotFoundError):
+            r.create(data, raise_errors=True)
+
+    def test_update(self):
+        r = GraphRelationshipRepository(fake_schema('test', self.schema))
+        r._g = self.g
+        self.g.cypher.execute = Mock(side_effect=self._execute_writes)
+        data = {0: {'_id': 5, '_origin': 1, '_target': 2, 'test': 'a'}}
+
+        updated, failed = r.update(data)
+
+        statement = self.g.cypher.execute.call_args[0][0]
+        self.assertIn('WHERE id(r) = row.id SET r += row.properties',
+                      statement)
+        self.assertEqual(updated[0]['_id'], 5)
+        self.assertEqual(failed, {})
@@ -0,0 +1,342 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from grapher.repositories import mongodb
+from grapher.repositories.mongodb import (MongodbEntityRepository,
+                                          MongodbRelationshipRepository,
+                                          MongodbRepository)
+from tests.repositories.graph_test import fake_schema
+
+
+class MongodbRepositoryTest(TestCase):
+    def setUp(self):
+        MongodbRepository._clients.clear()
+
+        patcher = patch.object(mongodb, 'MongoClient',
+                               side_effect=lambda **options: Mock())
+        self.mongo_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(MongodbRepository._clients.clear)
+
+    def test_client_is_shared_by_all_schemas(self):
+        users = MongodbEntityRepository(fake_schema('User', {}))
+        grants = MongodbRelationshipRepository(fake_schema('Grants', {}))
+
+        self.assertIs(users.mongodb_client, grants.mongodb_client)
+        self.assertEqual(self.mongo_client.call_count, 1)
+
+    def test_client_for_each_connection_string(self):
+        users = MongodbEntityRepository(fake_schema('User', {}))
+        logs = MongodbEntityRepository(fake_schema('Log', {}))
+        logs.connection_string = dict(users.connection_string,
+                                      host='logs.local')
+
+        self.assertIsNot(users.mongodb_client, logs.mongodb_client)
+        self.assertEqual(self.mongo_client.call_count, 2)
+
+    def test_client_pool_settings(self):
+        r = MongodbEntityRepository(fake_schema('User', {}))
+        r.connection_string = {
+            'name': 'default', 'host': 'localhost', 'port': 27017,
+            'maxPoolSize': 20, 'minPoolSize': 5, 'waitQueueTimeoutMS': 1000,
+            'maxIdleTimeMS': None, 'compressors': 'zstd'}
+
+        r.mongodb_client
+
+        self.mongo_client.assert_called_once_with(
+            host='localhost', port=27017, maxPoolSize=20, minPoolSize=5,
+            waitQueueTimeoutMS=1000, compressors='zstd')
+
+    def test_close(self):
+        client = MongodbEntityRepository(fake_schema('User', {})).mongodb_client
+        MongodbRepository.close()
+
+        self.assertTrue(client.close.called)
+        self.assertDictEqual(MongodbRepository._clients, {})
+
+
+class MongodbRelationshipRepositoryTest(TestCase):
+    def setUp(self):
+        self.collection = Mock()
+        self.collection.find = Mock(return_value=iter([]))
+
+        self.r = MongodbRelationshipRepository(
+            fake_schema('ClientGrants', {'year': {'type': 'integer'}}))
+        self.r._database = {'ClientGrants': self.collection}
+
+    def test_match(self):
+        self.collection.find = Mock(return_value=iter([
+            {'_id': ObjectId(), '_origin': 'a', '_target': 'b', 'year': 1}]))
+
+        actual = self.r.match(origin='a', skip=2, limit=10, fields={'year'})
+
+        query = self.collection.find.call_args[0][0]
+        kwargs = self.collection.find.call_args[1]
+        self.assertDictEqual(query, {'_origin': 'a'})
+        self.assertEqual(kwargs['skip'], 2)
+        self.assertEqual(kwargs['limit'], 10)
+        self.assertDictEqual(kwargs['projection'], {
+            'year': True, '_id': True, '_origin': True, '_target': True})
+
+        self.assertEqual(len(actual), 1)
+        self.assertIsInstance(actual[0]['_id'], str)
+
+    def test_first_page_is_sorted_by_identity(self):
+        self.r.all(limit=10)
+
+        query, kwargs = self.collection.find.call_args
+        self.assertDictEqual(query[0], {})
+        self.assertEqual(kwargs['sort'], [('_id', 1)])
+
+    def test_page_before_cursor(self):
+        identities = [ObjectId() for _ in range(2)]
+        self.collection.find = Mock(return_value=iter(
+            [{'_id': i} for i in reversed(identities)]))
+
+        actual = self.r.all(limit=2, before=str(ObjectId()))
+
+        kwargs = self.collection.find.call_args[1]
+        self.assertEqual(kwargs['sort'], [('_id', -1)])
+        self.assertEqual([actual[0]['_id'], actual[1]['_id']],
+                         [str(i) for i in identities])
+
+    def test_create(self):
+        def insert_many(documents, ordered=True):
+            for d in documents:
+                d['_id'] = ObjectId()
+
+        self.collection.insert_many = Mock(side_effect=insert_many)
+        data = {3: {'_origin': 'a', '_target': 'b'},
+                5: {'_origin': 'a', '_target': 'c'}}
+
+        created, failed = self.r.create(data)
+
+        self.assertEqual(set(created.keys()), {3, 5})
+        self.assertEqual(failed, {})
+
+    def test_create_failures_are_mapped_to_request_indices(self):
+        error = BulkWriteError({'writeErrors': [
+            {'index': 1, 'errmsg': 'duplicate key'}]})
+        self.collection.insert_many = Mock(side_effect=error)
+        data = {3: {'_origin': 'a', '_target': 'b'},
+                5: {'_origin': 'a', '_target': 'c'},
+                7: {'_origin': 'a', '_target': 'd'}}
+
+        for d in data.values():
+            d['_id'] = ObjectId()
+
+        created, failed = self.r.create(data)
+
+        self.assertEqual(set(created.keys()), {3})
+        self.assertEqual(set(failed.keys()), {5, 7})
+        self.assertEqual(failed[5], 'duplicate key')
+
+        with self.assertRaises(BulkWriteError):
+            self.r.create(data, raise_errors=True)
+
+    def test_unordered_create_fails_only_reported_entries(self):
+        error = BulkWriteError({'writeErrors': [
+            {'index': 0, 'errmsg': 'duplicate key'},
+            {'index': 2, 'errmsg': 'duplicate key'}]})
+        self.collection.insert_many = Mock(side_effect=error)
+        data = {3: {'_origin': 'a', '_target': 'b', '_id': ObjectId()},
+                5: {'_origin': 'a', '_target': 'c', '_id': ObjectId()},
+                7: {'_origin': 'a', '_target': 'd', '_id': ObjectId()}}
+
+        created, failed = self.r.create(data, ordered=False)
+
+        self.assertFalse(self.collection.insert_many.call_args[1]['ordered'])
+        self.assertEqual(set(created.keys()), {5})
+        self.assertDictEqual(failed, {3: 'duplicate key', 7: 'duplicate key'})
+
+    def test_update(self):
+        identity = ObjectId()
+        self.collection.bulk_write = Mock(
+            return_value=Mock(bulk_api_result={'nMatched': 1}))
+        self.collection.find = Mock(return_value=[
+            {'_id': identity, '_origin': 'a', '_target': 'b', 'year': 2,
+             'month': 5}])
+        data = {4: {'_id': str(identity), '_origin': 'a', '_target': 'b',
+                    'year': 2}}
+
+        updated, failed = self.r.update(data, ordered=False)
+
+        operations = self.collection.bulk_write.call_args[0][0]
+        self.assertFalse(self.collection.bulk_write.call_args[1]['ordered'])
+        self.assertDictEqual(operations[0]._filter, {'_id': identity})
+        self.assertDictEqual(operations[0]._doc, {'$set': {
+            '_origin': 'a', '_target': 'b', 'year': 2}})
+        self.assertEqual(self.collection.find.call_args[0][0],
+                         {'_id': {'$in': [identity]}})
+        self.assertEqual(set(updated.keys()), {4})
+        self.assertDictEqual(failed, {})
+
+    def test_update_returns_fields_not_sent(self):
+        identity = ObjectId()
+        self.collection.bulk_write = Mock(
+            return_value=Mock(bulk_api_result={'nMatched': 1}))
+        self.collection.find = Mock(return_value=[
+            {'_id': identity, '_origin': 'a', '_target': 'b', 'year': 2}])
+
+        updated, failed = self.r.update({0: {'_id': str(identity),
+                                             'year': 2}})
+
+        self.assertDictEqual(updated, {0: {
+            '_id': str(identity), '_origin': 'a', '_target': 'b',
+            'year': 2}})
+        self.assertDictEqual(failed, {})
+
+    def test_update_fails_entities_not_found(self):
+        found, missing = ObjectId(), ObjectId()
+        self.collection.bulk_write = Mock(
+            return_value=Mock(bulk_api_result={'nMatched': 1}))
+        self.collection.find = Mock(return_value=[{'_id': found, 'year': 2}])
+        data = {0: {'_id': str(missing), 'year': 1},
+                1: {'_id': str(found), 'year': 2}}
+
+        updated, failed = self.r.update(data)
+
+        self.assertEqual(self.collection.find.call_args[0][0],
+                         {'_id': {'$in': [missing, found]}})
+        self.assertEqual(set(updated.keys()), {1})
+        self.assertEqual(set(failed.keys()), {0})
+        self.assertIn(str(missing), failed[0])
+
+    def test_upsert(self):
+        created, matched = ObjectId(), ObjectId()
+        self.collection.bulk_write = Mock(return_value=Mock(bulk_api_result={
+            'nMatched': 1, 'upserted': [{'index': 0, '_id': created}]}))
+        self.collection.find = Mock(return_value=[
+            {'_id': created, 'code': 'a', 'year': 1},
+            {'_id': matched, 'code': 'b', 'year': 2, 'month': 5}])
+        data = {3: {'code': 'a', 'year': 1}, 5: {'code': 'b', 'year': 2}}
+
+        upserted, failed = self.r.upsert(data, key='code')
+
+        operations = self.collection.bulk_write.call_args[0][0]
+        self.assertDictEqual(operations[1]._filter, {'code': 'b'})
+        self.assertTrue(operations[1]._upsert)
+        self.assertEqual(self.collection.find.call_count, 1)
+        self.assertEqual(self.collection.find.call_args[0][0],
+                         {'$or': [{'_id': {'$in': [created]}},
+                                  {'code': {'$in': ['b']}}]})
+        self.assertEqual(upserted[3]['_id'], str(created))
+        self.assertEqual(upserted[5]['_id'], str(matched))
+        # Fields stored, but not sent, are returned as well.
+        self.assertEqual(upserted[5]['month'], 5)
+        self.assertDictEqual(failed, {})
+
+    def test_upsert_on_identity(self):
+        identity = ObjectId()
+        self.collection.bulk_write = Mock(
+            return_value=Mock(bulk_api_result={'nMatched': 1}))
+        self.collection.find = Mock(return_value=[
+            {'_id': identity, 'year': 2, 'month': 5}])
+
+        upserted, failed = self.r.upsert({0: {'_id': str(identity),
+                                              'year': 2}})
+
+        self.assertEqual(self.collection.find.call_args[0][0],
+                         {'_id': {'$in': [identity]}})
+        self.assertDictEqual(upserted, {0: {'_id': str(identity),
+                                            'year': 2, 'month': 5}})
+        self.assertDictEqual(failed, {})
+
+    def test_stream(self):
+        identities = [ObjectId() for _ in range(3)]
+        self.collection.find = Mock(return_value=iter(
+            [{'_id': i, 'year': 2} for i in identities]))
+
+        chunks = list(self.r.stream(chunk_size=2, fields=['year'], year=2))
+
+        self.assertEqual(self.collection.find.call_args[0][0], {'year': 2})
+        self.assertEqual(self.collection.find.call_args[1]['batch_size'], 2)
+        self.assertEqual([list(c.keys()) for c in chunks], [[0, 1], [2]])
+        self.assertEqual(chunks[1][2]['_id'], str(identities[2]))
+
+    def test_delete_where(self):
+        self.collection.delete_many = Mock(return_value=Mock(deleted_count=3))
+
+        count, deleted, failed = self.r.delete_where(year=2)
+
+        self.collection.delete_many.assert_called_once_with({'year': 2})
+        self.assertEqual(count, 3)
+        self.assertIsNone(deleted)
+
+    def test_delete_where_returning(self):
+        identities = [ObjectId() for _ in range(3)]
+        documents = [{'_id': i, 'year': 2} for i in identities]
+        self.collection.find = Mock(side_effect=[documents[:2],
+                                                 documents[2:]])
+        self.collection.delete_many = Mock(
+            side_effect=[Mock(deleted_count=2), Mock(deleted_count=1)])
+
+        count, deleted, failed = self.r.delete_where(
+            chunk_size=2, returning=True, year=2)
+
+        self.assertEqual(self.collection.find.call_args[1], {'limit': 2})
+        self.assertEqual(self.collection.delete_many.call_args[0][0],
+                         {'_id': {'$in': [identities[2]]}})
+        self.assertEqual(count, 3)
+        self.assertEqual(deleted[2]['_id'], str(identities[2]))
+
+    def test_delete_failures_are_mapped_to_request_indices(self):
+        error = BulkWriteError({'writeErrors': [
+            {'index': 1, 'errmsg': 'interrupted'}]})
+        self.collection.bulk_write = Mock(side_effect=error)
+        identities = [ObjectId() for _ in range(3)]
+        self.collection.distinct = Mock(return_value=identities)
+        data = {2: {'_id': str(identities[0])},
+                6: {'_id': str(identities[1])},
+                9: {'_id': str(identities[2])}}
+
+        deleted, failed = self.r.delete(data, ordered=False)
+        self.assertEqual(set(deleted.keys()), {2, 9})
+        self.assertDictEqual(failed, {6: 'interrupted'})
+
+        deleted, failed = self.r.delete(data)
+        self.assertEqual(set(deleted.keys()), {2})
+        self.assertEqual(set(failed.keys()), {6, 9})
+
+    def test_delete_fails_entities_not_found(self):
+        found, missing = ObjectId(), ObjectId()
+        self.collection.bulk_write = Mock(
+            return_value=Mock(bulk_api_result={'nRemoved': 1}))
+        self.collection.distinct = Mock(return_value=[found])
+        data = {0: {'_id': str(missing)}, 1: {'_id': str(found)}}
+
+        deleted, failed = self.r.delete(data)
+
+        self.assertEqual(self.collection.distinct.call_args[0][1],
+                         {'_id': {'$in': [missing, found]}})
+        operations = self.collection.bulk_write.call_args[0][0]
+        self.assertEqual([o._filter for o in operations], [{'_id': found}])
+        self.assertEqual(set(deleted.keys()), {1})
+        self.assertEqual(set(failed.keys()), {0})
+        self.assertIn(str(missing), failed[0])
+
+    def test_delete_nothing_found(self):
+        self.collection.distinct = Mock(return_value=[])
+
+        deleted, failed = self.r.delete({0: {'_id': str(ObjectId())}})
+
+        self.assertFalse(self.collection.bulk_write.called)
+        self.assertDictEqual(deleted, {})
+        self.assertEqual(set(failed.keys()), {0})
+
+    def test_reconcile_indexes(self):
+        self.collection.index_information = Mock(return_value={
+            '_id_': {'key': [('_id', 1)]},
+            '_origin_1__target_1': {'key': [('_origin', 1), ('_target', 1)]},
+        })
+        self.collection.create_index = Mock()
+
+        created, missing, undeclared = self.r.reconcile_indexes()
+
+        self.collection.create_index.assert_called_once_with(
+            [('_target', 1), ('_origin', 1)], unique=False)
+        self.assertDictEqual(created, {'_target,_origin': False})
+        self.assertDictEqual(missing, {})
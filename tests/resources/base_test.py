@@ -1,7 +1,13 @@
-from unittest import TestCase
+import json
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+from flask import Flask
 from nose_parameterized import parameterized
 
-from grapher.resources import Resource
+from grapher import settings
+from grapher.resources import (AsyncSchematicResource, Resource,
+                               SchematicResource)
 
 
 class ResourceTest(TestCase):
@@ -65,3 +71,429 @@ class ResourceTest(TestCase):
 
         actual = User().options()
         self.assertDictEqual(actual, expected)
+
+
+class SchematicResourceTest(TestCase):
+    def setUp(self):
+        class Meta:
+            identity = '_id'
+
+        self.schema = Mock()
+        self.schema.__name__ = 'Test'
+        self.schema.Meta = Meta
+        self.schema.model = {'_id': {'type': 'string'},
+                             'name': {'type': 'string'}}
+        self.schema.manager.version_tag = 'epoch.0'
+        self.schema.manager.query_or_all = Mock(
+            return_value={0: {'_id': 'a', 'name': 'x'}})
+
+        self.app = Flask('test')
+        self.r = SchematicResource(self.schema)
+        self.r.etags = True
+
+    def test_get_without_etags(self):
+        r = SchematicResource(self.schema)
+
+        with self.app.test_request_context('/test?limit=10'):
+            etag = self.r.get()[2]['ETag']
+
+        with self.app.test_request_context(
+                '/test?limit=10', headers={'If-None-Match': etag}):
+            _, status, headers = r.get()
+
+        self.assertEqual(status, 200)
+        self.assertNotIn('ETag', headers)
+        self.assertEqual(self.schema.manager.query_or_all.call_count, 2)
+
+    def test_get_sends_etag(self):
+        self.r.cache_control = 'max-age=10'
+
+        with self.app.test_request_context('/test?limit=10'):
+            body, status, headers = self.r.get()
+
+        self.assertEqual(status, 200)
+        self.assertRegex(headers['ETag'], r'^W/"[0-9a-f]{40}"$')
+        self.assertEqual(headers['Cache-Control'], 'max-age=10')
+
+    def test_get_not_modified(self):
+        with self.app.test_request_context('/test?limit=10'):
+            etag = self.r.get()[2]['ETag']
+
+        with self.app.test_request_context(
+                '/test?limit=10', headers={'If-None-Match': etag}):
+            _, status, headers = self.r.get()
+
+        self.assertEqual(status, 304)
+        self.assertEqual(headers['ETag'], etag)
+        self.assertEqual(self.schema.manager.query_or_all.call_count, 1)
+
+    @parameterized.expand([
+        ('/test?limit=20', 'epoch.0'),
+        ('/test?limit=10', 'epoch.1'),
+    ])
+    def test_get_modified(self, url, version_tag):
+        with self.app.test_request_context('/test?limit=10'):
+            etag = self.r.get()[2]['ETag']
+
+        self.schema.manager.version_tag = version_tag
+
+        with self.app.test_request_context(
+                url, headers={'If-None-Match': etag}):
+            _, status, headers = self.r.get()
+
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['ETag'], etag)
+
+    def test_patch_writes_submitted_fields(self):
+        self.schema.manager.identify = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {1: {'name': 'z'}}))
+        self.schema.manager.update = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {}))
+
+        with self.app.test_request_context(
+                '/test', method='PATCH',
+                json=[{'_id': 'a', 'name': 'y'}, {'name': 'z'}]):
+            _, status = self.r.patch()
+
+        self.assertEqual(status, 207)
+        self.assertFalse(self.schema.manager.fetch.called)
+        self.assertEqual(self.schema.manager.update.call_args[0][0],
+                         {0: {'_id': 'a', 'name': 'y'}})
+
+    def test_patch_merges_fetched_entities_on_cross_field_rules(self):
+        self.schema.model = {'_id': {'type': 'string'},
+                             'name': {'type': 'string', 'required': True,
+                                      'dependencies': 'age'},
+                             'age': {'type': 'integer'}}
+        self.r = SchematicResource(self.schema)
+        self.schema.manager.fetch = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'x', 'age': 1}}, {}))
+        self.schema.manager.update = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y', 'age': 1}}, {}))
+
+        with self.app.test_request_context(
+                '/test', method='PATCH', json=[{'_id': 'a', 'name': 'y'}]):
+            _, status = self.r.patch()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.schema.manager.update.call_args[0][0],
+                         {0: {'_id': 'a', 'name': 'y', 'age': 1}})
+
+    def test_put_writes_without_fetching(self):
+        self.schema.manager.identify = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {}))
+        self.schema.manager.update = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {}))
+
+        with self.app.test_request_context(
+                '/test', method='PUT', json=[{'_id': 'a', 'name': 'y'}]):
+            _, status = self.r.put()
+
+        self.assertEqual(status, 200)
+        self.assertFalse(self.schema.manager.fetch.called)
+        self.assertFalse(self.schema.manager.upsert.called)
+        self.assertEqual(self.schema.manager.update.call_args[0][0],
+                         {0: {'_id': 'a', 'name': 'y'}})
+
+    def test_put_upserts(self):
+        self.schema.model['name']['unique'] = True
+        self.r.upsert_on = 'name'
+        self.schema.manager.identify = Mock(
+            return_value=({0: {'name': 'y'}}, {1: {'_id': 'a'}}))
+        self.schema.manager.upsert = Mock(
+            return_value=({0: {'_id': 'b', 'name': 'y'}}, {}))
+
+        with self.app.test_request_context(
+                '/test', method='PUT', json=[{'name': 'y'}, {'_id': 'a'}]):
+            _, status = self.r.put()
+
+        self.assertEqual(status, 207)
+        self.schema.manager.identify.assert_called_once_with(
+            {0: {'name': 'y'}, 1: {'_id': 'a'}}, key='name')
+        self.assertEqual(self.schema.manager.upsert.call_args,
+                         (({0: {'name': 'y'}},),
+                          {'key': 'name', 'ordered': None}))
+
+    def test_upsert_on_must_be_unique(self):
+        class Resource(SchematicResource):
+            upsert_on = 'name'
+
+        with self.assertRaises(ValueError):
+            Resource(self.schema)
+
+    @parameterized.expand([
+        ('', False, None),
+        ('&returning=true', True, {'0': {'_id': 'a'}}),
+    ])
+    def test_delete_by_query(self, args, returning, expected):
+        self.schema.manager.delete_where = Mock(
+            return_value=(1, {0: {'_id': 'a'}} if returning else None, {}))
+
+        with self.app.test_request_context(
+                '/test?query={"name":"x"}' + args, method='DELETE'):
+            body, status = self.r.delete()
+
+        self.assertEqual(status, 200)
+        self.schema.manager.delete_where.assert_called_once_with(
+            {'name': 'x'}, returning=returning)
+        self.assertFalse(self.schema.manager.query.called)
+        self.assertEqual(body.json['count'], 1)
+        self.assertEqual(body.json.get('deleted'), expected)
+
+    def test_delete_by_query_reports_entities_kept(self):
+        self.schema.manager.delete_where = Mock(
+            return_value=(1, None, {7: 'still has relationships'}))
+
+        with self.app.test_request_context(
+                '/test?query={"name":"x"}', method='DELETE'):
+            body, status = self.r.delete()
+
+        self.assertEqual(body.json, {'count': 1, 'failed': {
+            '7': 'still has relationships'}})
+
+    def test_delete_page(self):
+        self.schema.manager.query = Mock(return_value={0: {'_id': 'a'}})
+        self.schema.manager.delete = Mock(
+            return_value=({0: {'_id': 'a'}}, {}))
+
+        with self.app.test_request_context(
+                '/test?query={"name":"x"}&limit=1', method='DELETE'):
+            body, status = self.r.delete()
+
+        self.assertFalse(self.schema.manager.delete_where.called)
+        self.assertEqual(body.json, {'count': 1})
+
+    def test_get_item(self):
+        self.schema.manager.find = Mock(return_value={0: {'_id': 'a',
+                                                          'name': 'x'}})
+
+        with self.app.test_request_context('/test/a'):
+            body, status, headers = self.r.get(identity='a')
+
+        self.assertEqual(status, 200)
+        self.schema.manager.find.assert_called_once_with(['a'])
+        self.assertFalse(self.schema.manager.query_or_all.called)
+        self.assertEqual(body.json['content'], {'_id': 'a', 'name': 'x'})
+        self.assertIn('ETag', headers)
+
+    def test_get_item_not_found(self):
+        self.schema.manager.find = Mock(return_value={})
+
+        with self.app.test_request_context('/test/a'):
+            body, status = self.r.get(identity='a')
+
+        self.assertEqual(status, 404)
+        self.assertIn('NOT_FOUND', body.json['errors'])
+
+    def test_get_ids(self):
+        self.schema.model['_id']['type'] = 'integer'
+        self.schema.manager.find = Mock(return_value={1: {'_id': 2}})
+
+        with self.app.test_request_context('/test?ids=1,2,'):
+            body, status, _ = self.r.get()
+
+        self.schema.manager.find.assert_called_once_with([1, 2])
+        self.assertEqual(body.json['content'], {'1': {'_id': 2}})
+        self.assertEqual(body.json['missing'], [1])
+
+    def test_get_invalid_identity(self):
+        self.schema.model['_id']['type'] = 'integer'
+
+        with self.app.test_request_context('/test/a'):
+            body, status = self.r.get(identity='a')
+
+        self.assertEqual(status, 400)
+        self.assertIn('INVALID_IDENTITY', body.json['errors'])
+
+    def test_put_item(self):
+        self.schema.manager.identify = Mock(
+            side_effect=lambda entries, key=None: (entries, {}))
+        self.schema.manager.update = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {}))
+
+        with self.app.test_request_context('/test/a', method='PUT',
+                                           json={'name': 'y'}):
+            _, status = self.r.put(identity='a')
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.schema.manager.update.call_args[0][0],
+                         {0: {'_id': 'a', 'name': 'y'}})
+
+    def test_put_item_with_many_entries(self):
+        with self.app.test_request_context('/test/a', method='PUT',
+                                           json=[{'name': 'y'},
+                                                 {'name': 'z'}]):
+            body, status = self.r.put(identity='a')
+
+        self.assertEqual(status, 400)
+        self.assertIn('SINGLE_ENTRY_EXPECTED', body.json['errors'])
+
+    def test_delete_ids(self):
+        self.schema.manager.delete = Mock(
+            return_value=({0: {'_id': 'a'}}, {1: 'not found'}))
+
+        with self.app.test_request_context('/test?ids=a,b',
+                                           method='DELETE'):
+            body, status = self.r.delete()
+
+        self.assertEqual(self.schema.manager.delete.call_args[0][0],
+                         {0: {'_id': 'a'}, 1: {'_id': 'b'}})
+        self.assertEqual(body.json, {'count': 1,
+                                     'failed': {'1': 'not found'}})
+
+    @parameterized.expand([
+        ('/test?stream=1', {}),
+        ('/test', {'Accept': 'application/x-ndjson'}),
+    ])
+    def test_get_streams(self, url, headers):
+        self.schema.manager.stream = Mock(return_value=iter([
+            {0: {'_id': 'a', 'name': 'x', 'secret': 1}},
+            {1: {'_id': 'b', 'name': 'y'}}]))
+
+        with self.app.test_request_context(url, headers=headers):
+            response = self.r.get()
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertFalse(self.schema.manager.query_or_all.called)
+        self.assertEqual(self.schema.manager.stream.call_args[1]['query'], {})
+        self.assertEqual([json.loads(line) for line in body.splitlines()],
+                         [{'_id': 'a', 'name': 'x'}, {'_id': 'b', 'name': 'y'}])
+
+    def test_post_ingests_ndjson_in_chunks(self):
+        self.schema.manager.repository.ordered_writes = True
+        self.schema.manager.create = Mock(side_effect=[
+            ({0: {'_id': 'a', 'name': 'x'}}, {}),
+            ({2: {'_id': 'b', 'name': 'y'}}, {3: 'duplicate'})])
+        body = '{"name":"x"}\n{"name":1}\n{"name":"y"}\n{"name":"z"}\n' \
+               '{"name":"w"}\n'
+
+        with patch.dict(settings.effective.STREAMING_INGEST, chunk_size=2), \
+                self.app.test_request_context(
+                    '/test', method='POST', data=body,
+                    content_type='application/x-ndjson'):
+            body, status = self.r.post()
+
+        self.assertEqual(status, 207)
+        self.assertEqual(
+            [c[0][0] for c in self.schema.manager.create.call_args_list],
+            [{0: {'name': 'x'}}, {2: {'name': 'y'}, 3: {'name': 'z'}}])
+        self.assertEqual(body.json['counts'],
+                         {'created': 2, 'rejected': 1, 'failed': 2})
+        self.assertEqual(set(body.json['created']), {'0', '2'})
+        self.assertEqual(set(body.json['rejected']), {'1'})
+        self.assertEqual(set(body.json['failed']), {'3', '4'})
+
+    @parameterized.expand([
+        ('{"name":"x"}\n{"name":"y"}\n{"name":', 207, {'0', '1'}),
+        ('{"name":', 400, set()),
+    ])
+    def test_post_ingest_reports_malformed_body(self, body, status_code,
+                                                created):
+        self.schema.manager.create = Mock(
+            side_effect=lambda entries, ordered: (entries, {}))
+
+        with patch.dict(settings.effective.STREAMING_INGEST, chunk_size=1), \
+                self.app.test_request_context(
+                    '/test', method='POST', data=body,
+                    content_type='application/x-ndjson'):
+            body, status = self.r.post()
+
+        self.assertEqual(status, status_code)
+        self.assertEqual(body.json['counts']['created'], len(created))
+        self.assertEqual(set(body.json.get('created', {})), created)
+        self.assertIn('INVALID_DATA', body.json['errors'])
+
+    def test_post_ingest_summarizes_large_loads(self):
+        self.schema.manager.create = Mock(
+            side_effect=lambda entries, ordered: (entries, {}))
+
+        with patch.dict(settings.effective.STREAMING_INGEST, chunk_size=2,
+                        details=3), \
+                self.app.test_request_context(
+                    '/test?stream=1', method='POST',
+                    json=[{'name': str(i)} for i in range(5)]):
+            body, status = self.r.post()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.schema.manager.create.call_count, 3)
+        self.assertEqual(body.json, {'counts': {'created': 5, 'rejected': 0,
+                                                'failed': 0}})
+
+
+class AsyncSchematicResourceTest(IsolatedAsyncioTestCase):
+    def setUp(self):
+        class Meta:
+            identity = '_id'
+
+        self.schema = Mock()
+        self.schema.__name__ = 'Test'
+        self.schema.Meta = Meta
+        self.schema.model = {'_id': {'type': 'string'},
+                             'name': {'type': 'string', 'unique': True}}
+
+        self.app = Flask('test')
+        self.r = AsyncSchematicResource(self.schema)
+
+    async def test_post(self):
+        self.schema.manager.create = AsyncMock(
+            return_value=({0: {'_id': 'a', 'name': 'x'}}, {}))
+
+        with self.app.test_request_context(
+                '/test', method='POST', json=[{'name': 'x'}, {'name': 1}]):
+            body, status = await self.r.post()
+
+        self.assertEqual(status, 207)
+        self.assertEqual(set(body.json['created']), {'0'})
+        self.assertEqual(set(body.json['rejected']), {'1'})
+
+    async def test_put_upserts(self):
+        self.r.upsert_on = 'name'
+        self.schema.manager.identify = Mock(
+            return_value=({0: {'name': 'y'}}, {}))
+        self.schema.manager.upsert = AsyncMock(
+            return_value=({0: {'_id': 'b', 'name': 'y'}}, {}))
+
+        with self.app.test_request_context(
+                '/test', method='PUT', json=[{'name': 'y'}]):
+            body, status = await self.r.put()
+
+        self.assertEqual(status, 200)
+        self.schema.manager.upsert.assert_awaited_once_with(
+            {0: {'name': 'y'}}, key='name', ordered=None)
+
+    async def test_patch_writes_submitted_fields(self):
+        self.schema.manager.identify = Mock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {}))
+        self.schema.manager.update = AsyncMock(
+            return_value=({0: {'_id': 'a', 'name': 'y'}}, {}))
+
+        with self.app.test_request_context(
+                '/test/a', method='PATCH', json={'name': 'y'}):
+            body, status = await self.r.patch(identity='a')
+
+        self.assertEqual(status, 200)
+        self.assertFalse(self.schema.manager.fetch.called)
+        self.schema.manager.update.assert_awaited_once_with(
+            {0: {'_id': 'a', 'name': 'y'}}, ordered=None)
+
+    @parameterized.expand([
+        ('/test?query={"name":"x"}', None, False),
+        ('/test?query={"name":"x"}&limit=1', None, True),
+        ('/test/a', 'a', True),
+    ])
+    async def test_delete(self, url, identity, by_identity):
+        self.schema.manager.query = AsyncMock(return_value={0: {'_id': 'a'}})
+        self.schema.manager.delete = AsyncMock(
+            return_value=({0: {'_id': 'a'}}, {}))
+        self.schema.manager.delete_where = AsyncMock(
+            return_value=(1, None, {}))
+
+        with self.app.test_request_context(url, method='DELETE'):
+            body, status = await self.r.delete(identity=identity)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body.json['count'], 1)
+        self.assertEqual(self.schema.manager.delete.called, by_identity)
+        self.assertEqual(self.schema.manager.delete_where.called,
+                         not by_identity)
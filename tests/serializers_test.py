@@ -1,7 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 from nose_parameterized import parameterized
-from grapher import serializers, errors
+from grapher import serializers, errors, settings
 
 
 class SerializerTest(TestCase):
@@ -81,6 +82,7 @@ class DynamicSerializerTest(TestCase):
         r.args = Mock()
         r.args.get = Mock(return_value=None)
 
+        self.addCleanup(setattr, serializers, 'request', serializers.request)
         serializers.request = r
 
     @parameterized.expand([
@@ -97,15 +99,106 @@ class DynamicSerializerTest(TestCase):
 
         self.assertEqual(actual, expected)
 
-    def test_projected_fields_store_result(self):
-        s = serializers.DynamicSerializer('test', {'name': {'type': 'string'}})
-        fields = s.projected_fields
-        fields_a_second_time = s.projected_fields
+    def test_projected_fields_are_computed_per_request(self):
+        s = serializers.DynamicSerializer({'name': {'type': 'string'},
+                                           'age': {'type': 'integer'}})
 
-        self.assertIs(fields, fields_a_second_time)
+        serializers.request.args.get.return_value = 'name'
+        self.assertEqual(s.projected_fields, {'name'})
+
+        serializers.request.args.get.return_value = 'age'
+        self.assertEqual(s.projected_fields, {'age'})
+
+        serializers.request.args.get.return_value = None
+        self.assertEqual(s.projected_fields, {'name', 'age'})
 
     def test_projected_fields_raises_bad_request(self):
         serializers.request.args.get.return_value = 'name,age,_id,products,test,test2'
 
         with self.assertRaises(errors.BadRequestError):
             serializers.DynamicSerializer('test', {}).projected_fields
+
+
+class IncrementalValidationTest(TestCase):
+    @parameterized.expand([
+        ({'name': {'type': 'string', 'required': True}}, True),
+        ({'name': {'type': 'string', 'dependencies': 'age'},
+          'age': {'type': 'integer'}}, False),
+        ({'name': {'type': 'string', 'excludes': 'alias'},
+          'alias': {'type': 'string'}}, False),
+    ])
+    def test_validates_incrementally(self, model, expected):
+        self.assertEqual(
+            serializers.Serializer(model).validates_incrementally, expected)
+
+    def test_validate_update(self):
+        s = serializers.Serializer({'_id': {'type': 'string'},
+                                    'name': {'type': 'string',
+                                             'required': True},
+                                    'age': {'type': 'integer'}})
+        entries = {0: {'_id': 'a', 'age': 1}, 1: {'_id': 'b', 'age': 'x'}}
+
+        accepted, rejected = s.validate(entries, update=True)
+
+        self.assertEqual(list(accepted.keys()), [0])
+        self.assertEqual(rejected, {1: {'age': ['must be of integer type']}})
+
+
+class ParallelValidationTest(TestCase):
+    model = {'name': {'type': 'string', 'required': True, 'minlength': 2}}
+
+    def setUp(self):
+        self.entries = {i: {'name': 'a' * (i % 3)} for i in range(7)}
+        self.s = serializers.Serializer(self.model)
+
+        self.executor = ThreadPoolExecutor(2)
+        self.executor.submit = Mock(side_effect=self.executor.submit)
+        self.addCleanup(self.executor.shutdown)
+
+        patcher = patch.object(serializers.Serializer, 'pool',
+                               return_value=self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_large_batches_are_validated_in_parallel(self):
+        expected = self.s.validate(self.entries)
+
+        with patch.dict(settings.effective.PARALLEL_VALIDATION,
+                        threshold=3, chunk_size=2):
+            accepted, rejected = self.s.validate(self.entries)
+
+        self.assertEqual(self.executor.submit.call_count, 4)
+        self.assertEqual((accepted, rejected), expected)
+        self.assertEqual(list(accepted.keys()), [2, 5])
+        self.assertIs(accepted[2], self.entries[2])
+        self.assertEqual(rejected[0], {'name': ['min length is 2']})
+
+    def test_small_batches_are_validated_in_process(self):
+        with patch.dict(settings.effective.PARALLEL_VALIDATION,
+                        threshold=7, chunk_size=2):
+            self.s.validate(self.entries)
+
+        self.assertFalse(self.executor.submit.called)
+
+    def test_pool_processes_are_not_forked(self):
+        patch.stopall()
+        self.addCleanup(setattr, serializers.Serializer, '_pool', None)
+
+        with patch.object(serializers, 'ProcessPoolExecutor') as executor:
+            serializers.Serializer._pool = None
+            serializers.Serializer.pool()
+
+        context = executor.call_args[1]['mp_context']
+        self.assertIn(context.get_start_method(), ('forkserver', 'spawn'))
+
+    def test_validate_in_parallel_with_processes(self):
+        patch.stopall()
+
+        accepted, rejected = serializers.Serializer(self.model) \
+            .validate_in_parallel(self.entries, chunk_size=3)
+
+        serializers.Serializer.pool().shutdown()
+        serializers.Serializer._pool = None
+
+        self.assertEqual(set(accepted.keys()), {2, 5})
+        self.assertEqual(set(rejected.keys()), {0, 1, 3, 4, 6})
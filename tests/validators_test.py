@@ -20,3 +20,62 @@ class GraphValidatorTest(TestCase):
         actual = v.validate(document)
 
         self.assertEqual(actual, expected, (schema, document))
+
+
+class CompiledValidatorTest(TestCase):
+    model = {
+        '_id': {'type': 'integer', 'identity': True},
+        'name': {'type': 'string', 'required': True, 'minlength': 3,
+                 'maxlength': 5, 'empty': False},
+        'tags': {'type': 'list', 'minlength': 2,
+                 'schema': {'type': 'string', 'minlength': 2}},
+        'code': {'type': ['integer', 'string']},
+        'score': {'type': 'float', 'nullable': True},
+    }
+
+    def test_compile(self):
+        v = validators.CompiledValidator.compile(self.model)
+
+        self.assertIsInstance(v, validators.CompiledValidator)
+
+    @parameterized.expand([
+        ({'name': {'type': 'string', 'regex': '^a'}},),
+        ({'tags': {'type': 'dict', 'schema': {'a': {'type': 'string'}}}},),
+        ({'name': {'type': 'string', 'default': 'a'}},),
+    ])
+    def test_compile_falls_back_to_cerberus(self, model):
+        v = validators.CompiledValidator.compile(model)
+
+        self.assertIsInstance(v, validators.GrapherValidator)
+
+    @parameterized.expand([
+        ({'name': 'abc'},),
+        ({},),
+        ({'name': '', 'unknown': 1},),
+        ({'name': 'ab', '_id': '1'},),
+        ({'name': None, 'score': None},),
+        ({'name': 'abc', 'tags': ['a', 1, 'abc']},),
+        ({'name': 'abc', 'tags': ['a']},),
+        ({'name': 'abc', 'tags': [None], 'code': 1.5},),
+        ({'name': 'abcdef', 'tags': 'ab', 'score': True},),
+    ])
+    def test_errors_match_cerberus(self, document):
+        compiled = validators.CompiledValidator.compile(self.model)
+        cerberus = validators.GrapherValidator(self.model)
+
+        self.assertEqual(compiled.validate(document),
+                         cerberus.validate(document))
+        self.assertEqual(compiled.errors, cerberus.errors)
+
+    @parameterized.expand([
+        ({'_id': 1, 'score': 1.5},),
+        ({'_id': 1, 'name': ''},),
+        ({'_id': 1, 'tags': ['a']},),
+    ])
+    def test_update_errors_match_cerberus(self, document):
+        compiled = validators.CompiledValidator.compile(self.model)
+        cerberus = validators.GrapherValidator(self.model)
+
+        self.assertEqual(compiled.validate(document, update=True),
+                         cerberus.validate(document, update=True))
+        self.assertEqual(compiled.errors, cerberus.errors)